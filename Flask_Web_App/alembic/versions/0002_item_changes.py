@@ -0,0 +1,29 @@
+"""item change log
+
+Revision ID: 0002_item_changes
+Revises: 0001_initial
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_item_changes'
+down_revision: Union[str, None] = '0001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('item_changes',
+        sa.Column('version', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('fields', sa.Text()),
+        sa.Column('changed_at', sa.Float()),
+    )
+    op.create_index('ix_item_changes_item_id', 'item_changes', ['item_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_item_changes_item_id', table_name='item_changes')
+    op.drop_table('item_changes')
@@ -0,0 +1,25 @@
+"""data generation counters
+
+Revision ID: 0003_data_generations
+Revises: 0002_item_changes
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_data_generations'
+down_revision: Union[str, None] = '0002_item_changes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    table = op.create_table('data_generations',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('generation', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    )
+    op.bulk_insert(table, [{'name': n, 'generation': 0} for n in ('users', 'phases', 'settings', 'items')])
+
+def downgrade() -> None:
+    op.drop_table('data_generations')
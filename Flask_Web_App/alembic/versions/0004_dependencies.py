@@ -0,0 +1,69 @@
+"""dependency edge and pending name tables
+
+Revision ID: 0004_dependencies
+Revises: 0003_data_generations
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_dependencies'
+down_revision: Union[str, None] = '0003_data_generations'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    edges = op.create_table('dependencies',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('predecessor_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('successor_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('type', sa.String(length=2), nullable=False, server_default='FS'),
+        sa.Column('lag', sa.Integer(), nullable=False, server_default=sa.text('0')),
+        sa.UniqueConstraint('predecessor_id', 'successor_id', name='uq_dependencies_pair'),
+    )
+    op.create_index('ix_dependencies_predecessor_id', 'dependencies', ['predecessor_id'])
+    op.create_index('ix_dependencies_successor_id', 'dependencies', ['successor_id'])
+    pending = op.create_table('pending_dependencies',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('successor_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('name', sa.String(length=300), nullable=False),
+        sa.UniqueConstraint('successor_id', 'name', name='uq_pending_dependencies_pair'),
+    )
+    op.create_index('ix_pending_dependencies_successor_id', 'pending_dependencies', ['successor_id'])
+    op.create_index('ix_pending_dependencies_name', 'pending_dependencies', ['name'])
+
+    # Backfill from the free-text depends_on names: prefer the owner's item of
+    # that name, else the lowest id; self links are dropped and unknown names
+    # wait in pending_dependencies.
+    conn = op.get_bind()
+    items = sa.table('items', sa.column('id', sa.Integer), sa.column('user_id', sa.String),
+                     sa.column('name', sa.String), sa.column('depends_on', sa.String))
+    rows = conn.execute(sa.select(items.c.id, items.c.user_id, items.c.name, items.c.depends_on)
+                        .order_by(items.c.id)).fetchall()
+    by_name = {}
+    for item_id, user_id, name, _ in rows:
+        by_name.setdefault(name, []).append((item_id, user_id))
+    links, waiting = [], []
+    for item_id, user_id, _, depends_on in rows:
+        preds = set()
+        for name in dict.fromkeys(n.strip() for n in (depends_on or '').split(',') if n.strip()):
+            candidates = [c for c in by_name.get(name, ()) if c[0] != item_id]
+            if candidates:
+                preds.add(next((c for c in candidates if c[1] == user_id), candidates[0])[0])
+            else:
+                waiting.append({'successor_id': item_id, 'name': name})
+        links.extend({'predecessor_id': p, 'successor_id': item_id, 'type': 'FS', 'lag': 0} for p in sorted(preds))
+    if links:
+        op.bulk_insert(edges, links)
+    if waiting:
+        op.bulk_insert(pending, waiting)
+
+def downgrade() -> None:
+    op.drop_index('ix_pending_dependencies_name', table_name='pending_dependencies')
+    op.drop_index('ix_pending_dependencies_successor_id', table_name='pending_dependencies')
+    op.drop_table('pending_dependencies')
+    op.drop_index('ix_dependencies_successor_id', table_name='dependencies')
+    op.drop_index('ix_dependencies_predecessor_id', table_name='dependencies')
+    op.drop_table('dependencies')
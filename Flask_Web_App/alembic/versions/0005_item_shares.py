@@ -0,0 +1,37 @@
+"""item_shares join table for shared_with
+
+Revision ID: 0005_item_shares
+Revises: 0004_dependencies
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_item_shares'
+down_revision: Union[str, None] = '0004_dependencies'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    shares = op.create_table('item_shares',
+        sa.Column('item_id', sa.Integer(), sa.ForeignKey('items.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('user_id', sa.String(length=64), primary_key=True),
+    )
+    op.create_index('ix_item_shares_user_id', 'item_shares', ['user_id'])
+
+    conn = op.get_bind()
+    items = sa.table('items', sa.column('id', sa.Integer), sa.column('shared_with', sa.Text))
+    rows = conn.execute(sa.select(items.c.id, items.c.shared_with)
+                        .where(items.c.shared_with.isnot(None), items.c.shared_with != '')).fetchall()
+    links = []
+    for item_id, shared_with in rows:
+        users = dict.fromkeys(u.strip() for u in shared_with.split(',') if u.strip())
+        links.extend({'item_id': item_id, 'user_id': u} for u in users)
+    if links:
+        op.bulk_insert(shares, links)
+
+def downgrade() -> None:
+    op.drop_index('ix_item_shares_user_id', table_name='item_shares')
+    op.drop_table('item_shares')
@@ -0,0 +1,68 @@
+"""typed date/number columns and composite indexes on items
+
+Revision ID: 0006_item_typed_columns
+Revises: 0005_item_shares
+Create Date: 2026-10-17
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_item_typed_columns'
+down_revision: Union[str, None] = '0005_item_shares'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def _derive(start, duration, percent_complete, milestone, external_milestone):
+    try:
+        start_date = date.fromisoformat(str(start).strip()) if start else None
+    except ValueError:
+        start_date = None
+    try:
+        duration_days = int(str(duration).strip()) if duration not in (None, '') else None
+    except ValueError:
+        duration_days = None
+    try:
+        percent = float(percent_complete) if percent_complete not in (None, '') else None
+    except ValueError:
+        percent = None
+    finish_date = None
+    if start_date is not None:
+        days = 0 if (milestone or external_milestone) else max(duration_days or 0, 0)
+        finish_date = start_date + timedelta(days=days)
+    return {'start_date': start_date, 'duration_days': duration_days, 'percent': percent, 'finish_date': finish_date}
+
+def upgrade() -> None:
+    with op.batch_alter_table('items') as batch:
+        batch.add_column(sa.Column('start_date', sa.Date()))
+        batch.add_column(sa.Column('duration_days', sa.Integer()))
+        batch.add_column(sa.Column('percent', sa.Float()))
+        batch.add_column(sa.Column('finish_date', sa.Date()))
+    op.create_index('ix_items_user_phase', 'items', ['user_id', 'phase'])
+    op.create_index('ix_items_phase_start', 'items', ['phase', 'start_date'])
+    op.create_index('ix_items_start_date', 'items', ['start_date'])
+    op.create_index('ix_items_status', 'items', ['status'])
+
+    conn = op.get_bind()
+    items = sa.table('items', sa.column('id', sa.Integer), sa.column('start', sa.String),
+                     sa.column('duration', sa.String), sa.column('percent_complete', sa.String),
+                     sa.column('milestone', sa.String), sa.column('external_milestone', sa.Boolean),
+                     sa.column('start_date', sa.Date), sa.column('duration_days', sa.Integer),
+                     sa.column('percent', sa.Float), sa.column('finish_date', sa.Date))
+    rows = conn.execute(sa.select(items.c.id, items.c.start, items.c.duration, items.c.percent_complete,
+                                  items.c.milestone, items.c.external_milestone)).fetchall()
+    for row in rows:
+        conn.execute(items.update().where(items.c.id == row[0]).values(**_derive(*row[1:])))
+
+def downgrade() -> None:
+    op.drop_index('ix_items_status', table_name='items')
+    op.drop_index('ix_items_start_date', table_name='items')
+    op.drop_index('ix_items_phase_start', table_name='items')
+    op.drop_index('ix_items_user_phase', table_name='items')
+    with op.batch_alter_table('items') as batch:
+        batch.drop_column('finish_date')
+        batch.drop_column('percent')
+        batch.drop_column('duration_days')
+        batch.drop_column('start_date')
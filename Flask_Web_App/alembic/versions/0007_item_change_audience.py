@@ -0,0 +1,25 @@
+"""item_changes.audience for per-user change feeds
+
+Revision ID: 0007_item_change_audience
+Revises: 0006_item_typed_columns
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_item_change_audience'
+down_revision: Union[str, None] = '0006_item_typed_columns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Rows logged before this have no audience and only reach admins; clients
+    # resuming from them get a reset once the log is pruned past them anyway
+    with op.batch_alter_table('item_changes') as batch:
+        batch.add_column(sa.Column('audience', sa.Text(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table('item_changes') as batch:
+        batch.drop_column('audience')
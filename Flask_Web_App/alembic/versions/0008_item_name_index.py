@@ -0,0 +1,20 @@
+"""index items.name for dependency name resolution
+
+Revision ID: 0008_item_name_index
+Revises: 0007_item_change_audience
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_item_name_index'
+down_revision: Union[str, None] = '0007_item_change_audience'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_index('ix_items_name', 'items', ['name'])
+
+def downgrade() -> None:
+    op.drop_index('ix_items_name', table_name='items')
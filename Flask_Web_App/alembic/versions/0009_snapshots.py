@@ -0,0 +1,30 @@
+"""project export snapshots
+
+Revision ID: 0009_snapshots
+Revises: 0008_item_name_index
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_snapshots'
+down_revision: Union[str, None] = '0008_item_name_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.String(length=64)),
+        sa.Column('base_id', sa.Integer(), sa.ForeignKey('snapshots.id')),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('attachments', sa.Text()),
+        sa.Column('complete', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.Float()),
+    )
+
+def downgrade() -> None:
+    op.drop_table('snapshots')
@@ -0,0 +1,21 @@
+"""index lower(users.username) for case-insensitive login lookups
+
+Revision ID: 0010_username_lower_index
+Revises: 0009_snapshots
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_username_lower_index'
+down_revision: Union[str, None] = '0009_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')])
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username_lower', table_name='users')
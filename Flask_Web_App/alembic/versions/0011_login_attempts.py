@@ -0,0 +1,27 @@
+"""shared failed-login buckets
+
+Revision ID: 0011_login_attempts
+Revises: 0010_username_lower_index
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_login_attempts'
+down_revision: Union[str, None] = '0010_username_lower_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    op.create_table('login_attempts',
+        sa.Column('key', sa.String(length=255), primary_key=True),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated', sa.Float(), nullable=False),
+    )
+    op.create_index('ix_login_attempts_updated', 'login_attempts', ['updated'])
+
+def downgrade() -> None:
+    op.drop_index('ix_login_attempts_updated', table_name='login_attempts')
+    op.drop_table('login_attempts')
@@ -0,0 +1,26 @@
+"""users.auth_version session stamp
+
+Revision ID: 0012_user_auth_version
+Revises: 0011_login_attempts
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0012_user_auth_version'
+down_revision: Union[str, None] = '0011_login_attempts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch:
+        batch.add_column(sa.Column('auth_version', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch:
+        batch.drop_column('auth_version')
+    if op.get_bind().dialect.name == 'sqlite':
+        # Batch mode rebuilt the table, which drops the expression index from 0010
+        op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')])
@@ -0,0 +1,402 @@
+import base64, binascii, json
+from datetime import date
+from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from db import db, ItemDB, ItemShareDB, DependencyDB, SettingDB, DEPENDENCY_TYPES, ITEM_STATUSES
+from item_cache import item_to_task, current_version
+from scheduling import parse_date, propagate, task_span, link_bound, CycleError
+from item_import import import_items, rows_for_upload, ImportFormatError
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH = 1000
+QUERY_CHUNK = 500  # ids per IN (...) clause
+MAX_IMPORT_BYTES = 20 * 1024 * 1024  # /items/import upload size
+# Sortable columns; every sort is keyed on (column, id) so pages never overlap.
+# Plain columns (no COALESCE) so ordering and the keyset predicate use the indexes.
+SORT_COLUMNS = {
+    'id': ItemDB.id,
+    'name': ItemDB.name,
+    'start': ItemDB.start_date,
+    'phase': ItemDB.phase,
+    'status': ItemDB.status,
+    'responsible': ItemDB.responsible,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+@api_bp.errorhandler(ApiError)
+def _api_error(e):
+    return jsonify({'error': str(e), **e.extra}), e.status
+
+
+def encode_cursor(sort, row_id, value):
+    raw = json.dumps({'s': sort, 'id': row_id, 'v': value}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """``(last id, last sort value)`` of a cursor issued for ``sort``; the value is typed like its column."""
+    column = SORT_COLUMNS[sort.lstrip('-')]
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if data['s'] != sort or type(data['id']) is not int:
+            raise ValueError
+        value = data['v']
+        if value is not None:
+            if isinstance(column.type, db.Date):
+                value = date.fromisoformat(value)
+            elif type(value) is not column.type.python_type:
+                raise ValueError
+        return data['id'], value
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ApiError('Invalid cursor for this sort')
+
+
+def _cursor_value(column, rec):
+    value = getattr(rec, column.key)
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _after(column, value, last_id, descending):
+    """Rows strictly after ``(value, last_id)`` in ``column`` order (NULLs first ascending, last descending)."""
+    if not descending:
+        if value is None:
+            return or_(column.isnot(None), and_(column.is_(None), ItemDB.id > last_id))
+        return or_(column > value, and_(column == value, ItemDB.id > last_id))
+    if value is None:
+        return and_(column.is_(None), ItemDB.id < last_id)
+    return or_(column < value, column.is_(None), and_(column == value, ItemDB.id < last_id))
+
+
+def _date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ApiError(f'{name} must be a YYYY-MM-DD date')
+    return parsed
+
+
+def visible_items(query, user_id, is_admin):
+    """Restrict ``query`` to the items ``user_id`` owns or that are shared with them."""
+    if is_admin:
+        return query
+    # Both sides are index lookups (items.user_id, item_shares.user_id)
+    shared = db.select(ItemShareDB.item_id).where(ItemShareDB.user_id == user_id)
+    return query.filter(or_(ItemDB.user_id == user_id, ItemDB.id.in_(shared)))
+
+
+def filtered_items(args, user_id, is_admin):
+    """ItemDB query for the ``phase``/``status``/``responsible``/``start_from``/``start_to`` filters in ``args``."""
+    query = visible_items(ItemDB.query, user_id, is_admin)
+    for field in ('phase', 'status', 'responsible'):
+        value = args.get(field)
+        if value:
+            query = query.filter(getattr(ItemDB, field) == value)
+    start_from, start_to = _date_arg(args, 'start_from'), _date_arg(args, 'start_to')
+    if start_from:
+        query = query.filter(ItemDB.start_date >= start_from)
+    if start_to:
+        query = query.filter(ItemDB.start_date <= start_to)
+    return query
+
+
+@api_bp.route('/items')
+@login_required
+def list_items():
+    """Keyset paginated items: ``?phase=&status=&responsible=&start_from=&start_to=&sort=&cursor=&limit=``.
+
+    ``sort`` is one of SORT_COLUMNS, ``-`` prefixed for descending. The reply's
+    ``next_cursor`` (null on the last page) resumes right after the last row,
+    so each page is one index range scan regardless of how deep it is.
+    """
+    sort = request.args.get('sort', 'id')
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_COLUMNS:
+        raise ApiError(f"Unknown sort '{field}'")
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = filtered_items(request.args, current_user.get_id(), getattr(current_user, 'is_admin', False))
+    column = SORT_COLUMNS[field]
+    cursor = request.args.get('cursor')
+    if cursor:
+        last_id, last_value = decode_cursor(cursor, sort)
+        if field == 'id':
+            query = query.filter(ItemDB.id < last_id if descending else ItemDB.id > last_id)
+        else:
+            query = query.filter(_after(column, last_value, last_id, descending))
+    if field == 'id':
+        order = [ItemDB.id.desc() if descending else ItemDB.id.asc()]
+    elif descending:
+        order = [column.desc().nulls_last(), ItemDB.id.desc()]
+    else:
+        order = [column.asc().nulls_first(), ItemDB.id.asc()]
+    # One extra row tells us whether another page exists
+    rows = query.order_by(*order).limit(limit + 1).all()
+    page, more = rows[:limit], len(rows) > limit
+    next_cursor = encode_cursor(sort, page[-1].id, _cursor_value(column, page[-1])) if more else None
+    return jsonify({
+        'items': [dict(item_to_task(r)) for r in page],
+        'next_cursor': next_cursor,
+        'limit': limit,
+    })
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), QUERY_CHUNK):
+        yield ids[i:i + QUERY_CHUNK]
+
+
+def _open_editing():
+    setting = db.session.get(SettingDB, 'open_editing')
+    return bool(setting and setting.value in ('1', 'true', 'True'))
+
+
+def _patch_item(rec, patch):
+    """Apply one validated ``start``/``duration``/``percent_complete``/``status`` patch to ``rec``."""
+    start = patch.get('start')
+    if start:
+        if parse_date(start) is None:
+            raise ApiError('Invalid start date', id=rec.id)
+        rec.start = start
+    if patch.get('duration') is not None:
+        try:
+            duration = int(patch['duration'])
+        except (TypeError, ValueError):
+            raise ApiError('Invalid duration', id=rec.id)
+        if duration < 0:
+            raise ApiError('Duration cannot be negative', id=rec.id)
+        rec.duration = duration
+    status = patch.get('status')
+    if status:
+        if status not in ITEM_STATUSES:
+            raise ApiError(f"status must be one of {', '.join(ITEM_STATUSES)}", id=rec.id)
+        # Same rules as the Kanban drop: the end columns pin the progress
+        rec.status = status
+        if status == 'Completed':
+            rec.percent_complete = 100
+        elif status == 'Not Started':
+            rec.percent_complete = 0
+    if patch.get('percent_complete') is not None:
+        try:
+            percent = max(0, min(100, float(patch['percent_complete'])))
+        except (TypeError, ValueError):
+            raise ApiError('Invalid percent_complete', id=rec.id)
+        rec.percent_complete = percent
+        if percent >= 100:
+            rec.status = 'Completed'
+        elif percent > 0 and rec.status == 'Not Started':
+            rec.status = 'In Progress'
+
+
+def _patch_links(item_id, links, preds):
+    """Retype the links into ``item_id``: ``[{"predecessor": id, "type": "SS", "lag": 2}, ...]``.
+
+    Which links exist still follows the item's ``depends_on`` names; a patch
+    only sets their type and lag (days). ``preds`` (see ``_link_graph``) is
+    updated to match.
+    """
+    if not isinstance(links, list):
+        raise ApiError('links must be a list', id=item_id)
+    edges = {e.predecessor_id: e for e in DependencyDB.query.filter_by(successor_id=item_id)}
+    for link in links:
+        try:
+            pred = int(link['predecessor'])
+        except (TypeError, KeyError, ValueError):
+            raise ApiError('Every link needs an integer predecessor', id=item_id)
+        edge = edges.get(pred)
+        if edge is None:
+            raise ApiError('No such dependency', 404, id=item_id, predecessor=pred)
+        kind = link.get('type', edge.type)
+        if kind not in DEPENDENCY_TYPES:
+            raise ApiError(f"type must be one of {', '.join(DEPENDENCY_TYPES)}", id=item_id, predecessor=pred)
+        lag = link.get('lag', edge.lag)
+        if isinstance(lag, bool) or not isinstance(lag, (int, str)):
+            raise ApiError('lag must be a whole number of days', id=item_id, predecessor=pred)
+        try:
+            lag = int(lag)
+        except ValueError:
+            raise ApiError('lag must be a whole number of days', id=item_id, predecessor=pred)
+        edge.type, edge.lag = kind, lag
+    preds[item_id] = [(p, e.type, e.lag) for p, e in edges.items()]
+
+
+def _link_graph(ids):
+    """Items downstream of ``ids`` plus every typed link into them.
+
+    Returns ``(succs, preds)``: id -> successor ids and id -> ``[(pred id, type, lag)]``.
+    """
+    succs, preds = {}, {}
+    seen, frontier = set(ids), list(ids)
+    while frontier:
+        found = []
+        for chunk in _chunks(frontier):
+            for p, succ in db.session.query(DependencyDB.predecessor_id, DependencyDB.successor_id) \
+                    .filter(DependencyDB.predecessor_id.in_(chunk)):
+                succs.setdefault(p, []).append(succ)
+                if succ not in seen:
+                    seen.add(succ)
+                    found.append(succ)
+        frontier = found
+    for chunk in _chunks(seen):
+        for p, succ, kind, lag in db.session.query(DependencyDB.predecessor_id, DependencyDB.successor_id,
+                                                   DependencyDB.type, DependencyDB.lag) \
+                .filter(DependencyDB.successor_id.in_(chunk)):
+            preds.setdefault(succ, []).append((p, kind or 'FS', lag or 0))
+    return succs, preds
+
+
+@api_bp.route('/items/batch', methods=['POST'])
+@login_required
+def batch_update():
+    """Apply many field patches in one transaction.
+
+    Body: ``{"patches": [{"id": 1, "start": "2025-01-02", "duration": 3,
+    "percent_complete": 50, "status": "In Progress", "links": [{"predecessor":
+    2, "type": "SS", "lag": 1}]}, ...]}`` (any subset of fields per patch;
+    ``links`` sets the type and lag of existing dependencies, see
+    ``_patch_links``). Items given a ``start`` stay where they are put and
+    their dependents are pushed later as in ``/update_task_fields``; then each
+    of them is checked against its predecessors' final dates. Any error (bad
+    value 400, not found 404, not allowed 403, including a push onto another
+    user's item, dependency violation or cycle 409) rolls the whole batch back.
+    """
+    data = request.get_json(force=True, silent=True)
+    patches = data.get('patches') if isinstance(data, dict) else data
+    if not isinstance(patches, list) or not patches:
+        raise ApiError('Expected a non-empty list of patches')
+    if len(patches) > MAX_BATCH:
+        raise ApiError(f'At most {MAX_BATCH} patches per batch')
+    by_id = {}
+    for patch in patches:
+        try:
+            item_id = int(patch['id'])
+        except (TypeError, KeyError, ValueError):
+            raise ApiError('Every patch needs an integer id')
+        by_id.setdefault(item_id, {}).update(patch)
+
+    user_id = current_user.get_id()
+    is_admin = getattr(current_user, 'is_admin', False)
+    open_editing = _open_editing()
+
+    def allowed(rec):
+        return is_admin or (open_editing and (not rec.user_id or rec.user_id == user_id))
+
+    succs, preds = _link_graph(by_id)
+    ids = set(by_id) | set(preds) | {p for links in preds.values() for p, _, _ in links}
+    recs = {}
+    for chunk in _chunks(ids):
+        recs.update((r.id, r) for r in ItemDB.query.filter(ItemDB.id.in_(chunk)))
+    try:
+        for item_id, patch in by_id.items():
+            rec = recs.get(item_id)
+            if rec is None:
+                raise ApiError('Task not found', 404, id=item_id)
+            if not allowed(rec):
+                raise ApiError('Not authorized', 403, id=item_id)
+            _patch_item(rec, patch)
+            if 'links' in patch:
+                _patch_links(item_id, patch['links'], preds)
+
+        view = {i: item_to_task(r) for i, r in recs.items()}
+        # An explicit start pins the item; other patched items may still be pushed later
+        pinned = [i for i, patch in by_id.items() if patch.get('start')]
+        try:
+            moves = propagate([(view[i], {}) for i in pinned],
+                              lambda t: [view[s] for s in succs.get(t['id'], ()) if s in view],
+                              lambda t: [(view[p], kind, lag) for p, kind, lag in preds.get(t['id'], ()) if p in view],
+                              sources=[view[i] for i in by_id if i not in pinned])
+        except CycleError:
+            raise ApiError('Dependency cycle', 409)
+        # Pushed dependents must be editable by the caller too
+        blocked = sorted(t['id'] for t, _ in moves if not allowed(recs[t['id']]))
+        if blocked:
+            raise ApiError('Dependents owned by another user', 403, blocked=blocked)
+        shifted = []
+        for t, new_start in moves:
+            rec = recs[t['id']]
+            rec.start = new_start.isoformat()
+            view[rec.id] = item_to_task(rec)
+            shifted.append({'id': rec.id, 'start': rec.start})
+
+        # Pinned items cannot move, so check them against their predecessors' final dates
+        for item_id in pinned:
+            this_start, this_finish = task_span(view[item_id])
+            if this_start is None:
+                continue
+            for p, kind, lag in preds.get(item_id, ()):
+                pred_start, pred_finish = task_span(view[p]) if p in view else (None, None)
+                if pred_start is None:
+                    continue
+                bound = link_bound(kind, lag, pred_start, pred_finish, this_finish - this_start)
+                if this_start < bound:
+                    raise ApiError('Dependency violation', 409, id=item_id,
+                                   dependency_end=date.fromordinal(bound).isoformat())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return jsonify({
+        'success': True,
+        'items': [{'id': i, 'start': recs[i].start, 'duration': recs[i].duration,
+                   'percent_complete': recs[i].percent_complete, 'status': recs[i].status} for i in by_id],
+        'shifted': shifted,
+        'version': current_version(),
+    })
+
+
+@api_bp.route('/items/import', methods=['POST'])
+@login_required
+def import_upload():
+    """Bulk create items from an uploaded ``file`` (.csv or .xlsx, header row first).
+
+    Valid rows are inserted in one transaction, owned by the uploader; the
+    reply lists the rows that were skipped: ``{inserted, errors: [{row,
+    error}], truncated}``. Uploads over MAX_IMPORT_BYTES get a 413 and files
+    over item_import.MAX_ROWS rows a 400.
+    """
+    if not getattr(current_user, 'is_admin', False) and not _open_editing():
+        raise ApiError('Editing restricted', 403)
+    too_large = ApiError(f'Upload larger than {MAX_IMPORT_BYTES // (1024 * 1024)} MB', 413)
+    if (request.content_length or 0) > MAX_IMPORT_BYTES:
+        raise too_large
+    # Also caps chunked uploads, which carry no Content-Length
+    request.max_content_length = MAX_IMPORT_BYTES
+    try:
+        upload = request.files.get('file')
+    except RequestEntityTooLarge:
+        raise too_large
+    if upload is None or not upload.filename:
+        raise ApiError('No file uploaded')
+    try:
+        result = import_items(rows_for_upload(upload.filename, upload.stream), current_user.get_id())
+        db.session.commit()
+    except ImportFormatError as e:
+        db.session.rollback()
+        raise ApiError(str(e))
+    except Exception:
+        db.session.rollback()
+        raise
+    return jsonify({
+        'inserted': result.inserted,
+        'errors': [{'row': row, 'error': message} for row, message in result.errors],
+        'truncated': result.truncated,
+    })
@@ -1,88 +1,131 @@
 """Flask application main module (repaired header)."""
 
 # --- Proper Imports & Initialization (reconstructed after corruption) ---
-import os, io, json, csv, time, uuid, secrets, zipfile, re
-from datetime import datetime, timedelta
+import os, io, json, csv, time, uuid, secrets, zipfile, re, shutil, tempfile
+from datetime import date, datetime, timedelta
 from functools import wraps
 
 from flask import (
     Flask, render_template, request, redirect, url_for, jsonify,
-    send_file, send_from_directory, make_response, abort, Response, flash
+    send_file, send_from_directory, make_response, abort, Response, flash, stream_with_context, session
 )
 from flask_login import (
     LoginManager, UserMixin, login_user, logout_user,
     login_required, current_user
 )
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from flask.json.provider import DefaultJSONProvider
 
 import matplotlib
 matplotlib.use('Agg')  # headless environments
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from gantt_render import render_gantt_png, render_gantt_export, RENDER_VERSION
+from render_cache import RenderCache, render_key, tasks_fingerprint, GANTT_FIELDS
+from render_pool import RenderPool, RenderBusy, RenderTimeout, BrokenProcessPool
+from zip_stream import stream_zip
+from snapshots import (
+    base_snapshot, changed_item_ids, manifest_of, file_state, hashed_chunks,
+    read_bundle, restore_chain, publish_files, SnapshotError,
+)
+from scheduling import schedule_tasks, propagate, link_bound, task_span, CycleError
 from resources_bp import resources_bp
 from auth_bp import auth_bp
+from api_bp import api_bp, filtered_items, ApiError
+from events_bp import events_bp
+from user_directory import directory as user_directory, user_dict, User, sign_in, revoke_sessions
+from login_limiter import limiter, limiter_key
+from password_hashing import hasher, rehash_if_needed, HashBusy
+from reset_tokens import (
+    RESET_EXPIRY_SECONDS, issue_reset_token, find_user_by_reset_token, clear_reset_token, maybe_sweep,
+)
 
 from db import (
-    db, UserDB, PhaseDB, ItemDB, TaskDB, SettingDB, ContactDB, AssetDB,
-    ensure_admin_user, migrate_tasks_to_items
+    db, UserDB, PhaseDB, ItemDB, TaskDB, SettingDB, ContactDB, AssetDB, SnapshotDB,
+    ensure_admin_user, ensure_data_generations, migrate_tasks_to_items, migrate_user_columns,
+    migrate_item_change_columns,
 )
+from item_sync import migrate_dependency_edges, migrate_item_shares
+from item_cache import ItemCache, changed_since, maybe_prune_change_log
+from task_record import TaskRecord
+from cache_sync import CacheSync
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+class _JSONProvider(DefaultJSONProvider):
+    # Cached tasks are slotted TaskRecords; serialize them like the dicts they replace
+    @staticmethod
+    def default(o):
+        if isinstance(o, TaskRecord):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+app.json = _JSONProvider(app)
+
 db.init_app(app)
 
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
-class User(UserMixin):
-    def __init__(self, id, username, password_hash, is_admin=False):
-        self.id = id
-        self.username = username
-        self.password_hash = password_hash
-        self.is_admin = is_admin
-
 @login_manager.user_loader
-def load_user(user_id):  # pragma: no cover - simple loader
-    with app.app_context():
-        u = UserDB.query.get(user_id)
-        if u:
-            return User(u.id, u.username, u.password_hash, u.is_admin)
-        return None
+def load_user(user_id):
+    # Served from the user directory cache: no query unless the entry expired or users changed
+    return user_directory.principal(user_id, session.get('auth_version', 0))
 
 with app.app_context():
+    # item_shares is derived from items.shared_with, so it needs a backfill when create_all adds it
+    had_shares = db.inspect(db.engine).has_table('item_shares')
     db.create_all()
     try:
         migrate_tasks_to_items(db.session)
+        migrate_user_columns(db.session)
+        migrate_item_change_columns(db.session)
+        migrate_dependency_edges(db.session)
+        if not had_shares:
+            migrate_item_shares(db.session)
         ensure_admin_user(db.session)
+        ensure_data_generations(db.session)
     except Exception as e:  # pragma: no cover
         print('[WARN] Initialization issue:', e)
 
 # In-memory caches (populated by loaders defined later in file)
-users = []
-tasks = []
+users = []  # full list for the admin pages, see all_users()
+_users_state = {'stale': True}
+item_cache = ItemCache()
+tasks = item_cache.tasks  # same list object; refreshed in place by load_tasks()
 phases = []
 settings = {}
+# Reloads the caches above only when some process wrote to their tables
+cache_sync = CacheSync()
+
+@app.before_request
+def sync_caches():
+    if request.endpoint == 'static':
+        return
+    try:
+        cache_sync.sync()
+    except Exception as e:
+        print('[ERROR] cache sync:', e)
+    maybe_prune_change_log()
 
 # Register resources blueprint
 app.register_blueprint(resources_bp)
 app.register_blueprint(auth_bp)
+app.register_blueprint(api_bp)
+app.register_blueprint(events_bp)
 
 # --- Items CRUD Page (clean, relocated) ---
 @app.route('/items', methods=['GET', 'POST'])
 @login_required
 def items_page():
     """Items CRUD page (user-scoped view) with multi-PDF support."""
-    load_tasks(); load_phases(); load_settings()
     try:
         pdf_files = [f for f in os.listdir(os.path.join(BASE_DIR, 'static', 'uploads')) if f.lower().endswith('.pdf')]
     except Exception:
         pdf_files = []
-    user_tasks = [t for t in tasks if t.get('user_id') == current_user.get_id() or current_user.get_id() in t.get('shared_with', [])]
+    user_tasks = tasks.visible_to(current_user.get_id())
     alert_message = None
     if request.method == 'POST':
         form = request.form
@@ -103,13 +146,7 @@ def items_page():
         document_links_raw = form.get('document_links', '').strip()
         links_list = [l.strip() for l in document_links_raw.split(',') if l.strip()]
         share_with_raw = form.get('share_with', '').strip()
-        share_with_ids = []
-        if share_with_raw:
-            load_users()
-            for uname in [u.strip() for u in share_with_raw.split(',') if u.strip()]:
-                urec = next((u for u in users if u['username'] == uname), None)
-                if urec:
-                    share_with_ids.append(urec['id'])
+        share_with_ids = user_directory.ids_for_usernames(u.strip() for u in share_with_raw.split(',') if u.strip())
         external_flag = form.get('external_item') or form.get('external_task')
         external_item_flag = True if external_flag == 'on' else False
         external_milestone = True if form.get('external_milestone') == 'on' else False
@@ -126,7 +163,7 @@ def items_page():
                     attachment_filenames.append(safe_name)
         # Dependency enforcement
         if depends_on:
-            dep_task = next((t for t in tasks if t['name'] == depends_on and t.get('user_id') == current_user.get_id()), None)
+            dep_task = tasks.first_by_name(depends_on, user_id=current_user.get_id())
             if dep_task and dep_task.get('start') and dep_task.get('duration'):
                 try:
                     dep_start = datetime.strptime(dep_task['start'], '%Y-%m-%d')
@@ -217,7 +254,6 @@ def items_page():
 # Re-define register route (was earlier in file) if corrupted by edits
 @app.route('/register', methods=['GET', 'POST'])
 def register():
-    load_users()
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
         password = request.form.get('password', '')
@@ -228,13 +264,11 @@ def register():
         if perrs:
             flash('Password must contain: ' + ', '.join(perrs))
             return render_template('register.html')
-        if any(u['username'].lower() == username.lower() for u in users):
+        if user_directory.by_username(username):
             flash('Username already exists.')
             return render_template('register.html')
-        user_id = str(uuid.uuid4())
-        password_hash = generate_password_hash(password)
-        users.append({'id': user_id, 'username': username, 'password_hash': password_hash, 'is_admin': False})
-        save_users()
+        db.session.add(UserDB(id=str(uuid.uuid4()), username=username, password_hash=hasher.hash(password)))
+        db.session.commit()
         flash('Registration successful. Please log in.')
         return redirect(url_for('login'))
     return render_template('register.html')
@@ -245,8 +279,7 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated:
             return redirect(url_for('login'))
-        user = next((u for u in users if str(u['id']) == str(current_user.get_id())), None)
-        if not user or not user.get('is_admin', False):
+        if not getattr(current_user, 'is_admin', False):
             flash('Admin access required.')
             return redirect(url_for('tasks_page'))
         return f(*args, **kwargs)
@@ -257,22 +290,19 @@ def admin_required(f):
 @login_required
 @admin_required
 def admin_dashboard():
-    load_users()
-    load_tasks()
-    return render_template('admin.html', users=users, tasks=tasks)
+    return render_template('admin.html', users=all_users(), tasks=tasks)
 
 # --- Promote user to admin ---
 @app.route('/admin/promote/<user_id>')
 @login_required
 @admin_required
 def promote_user(user_id):
-    load_users()
-    for u in users:
-        if str(u['id']) == str(user_id):
-            u['is_admin'] = True
-            save_users()
-            flash(f"User {u['username']} promoted to admin.")
-            break
+    rec = db.session.get(UserDB, str(user_id))
+    if rec:
+        rec.is_admin = True
+        revoke_sessions(rec)
+        db.session.commit()
+        flash(f"User {rec.username} promoted to admin.")
     return redirect(url_for('admin_dashboard'))
 
 # --- Delete user ---
@@ -280,74 +310,66 @@ def promote_user(user_id):
 @login_required
 @admin_required
 def delete_user(user_id):
-    load_users()
-    global users
-    users = [u for u in users if str(u['id']) != str(user_id)]
-    save_users()
+    rec = db.session.get(UserDB, str(user_id))
+    if rec:
+        db.session.delete(rec)
+        db.session.commit()
     flash('User deleted.')
     return redirect(url_for('admin_dashboard'))
 
-FAILED_LOGINS = {}
-LOGIN_RATE_LIMIT_WINDOW = 600  # seconds
-LOGIN_RATE_LIMIT_MAX = 5
-
-def _login_rate_limited(key):
-    now = time.time()
-    attempts = [t for t in FAILED_LOGINS.get(key, []) if now - t < LOGIN_RATE_LIMIT_WINDOW]
-    FAILED_LOGINS[key] = attempts
-    if len(attempts) >= LOGIN_RATE_LIMIT_MAX:
-        return True, int(LOGIN_RATE_LIMIT_WINDOW - (now - attempts[0]))
-    return False, 0
-
-def _record_failed_login(key):
-    FAILED_LOGINS.setdefault(key, []).append(time.time())
+@app.errorhandler(HashBusy)
+def password_hashing_busy(e):
+    # Auth bursts are shed here instead of tying up every web worker
+    resp = Response('Too many sign-ins right now, retry shortly', status=503, mimetype='text/plain')
+    resp.headers['Retry-After'] = '2'
+    return resp
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
-    load_users()
     if request.method == 'POST':
         username = request.form.get('username','').strip()
         password = request.form.get('password','')
-        key = (request.remote_addr or 'unknown') + '|' + username.lower()
-        limited, wait = _login_rate_limited(key)
+        key = limiter_key(request.remote_addr, username)
+        limited, wait = limiter.attempt(key)
         if limited:
             flash(f'Too many login attempts. Try again in ~{wait} seconds.')
             return render_template('login.html')
-        user = next((u for u in users if u['username'].lower() == username.lower()), None)
-        if user and password and check_password_hash(user['password_hash'], password):
-            # On success clear attempts
-            FAILED_LOGINS.pop(key, None)
-            login_user(User(user['id'], user['username'], user['password_hash'], user.get('is_admin', False)))
+        user = user_directory.by_username(username)
+        try:
+            verified = user is not None and hasher.verify(user['password_hash'], password)
+        except HashBusy:
+            # The password was never checked, so this attempt must not count against the key
+            limiter.refund(key)
+            raise
+        if verified:
+            limiter.refund(key)
+            # The principal comes from the cache; only an upgrade needs the row
+            if hasher.needs_rehash(user['password_hash']):
+                rec = db.session.get(UserDB, user['id'])
+                if rehash_if_needed(rec, password):
+                    db.session.commit()
+                # Rehashes do not move the users generation, so refresh this worker's copy
+                user = user_directory.refresh(rec)
+            sign_in(user)
             return redirect(url_for('tasks_page'))
-        _record_failed_login(key)
         flash('Invalid username or password.')
     return render_template('login.html')
 
 # ---------------- Password Reset (Self-Service Token) ---------------- #
-RESET_EXPIRY_SECONDS = 3600  # 1 hour
-
-def _find_user_by_reset_token(token):
-    for u in users:
-        if u.get('reset_token') == token:
-            return u
-    return None
-
 @app.route('/forgot', methods=['GET', 'POST'])
 def forgot_password():
-    load_users()
     token_display = None
     if request.method == 'POST':
         username = request.form.get('username','').strip()
         if not username:
             flash('Username required.')
             return render_template('forgot_password.html', token_display=None)
-        user = next((u for u in users if u['username'].lower() == username.lower()), None)
+        maybe_sweep()
+        user = user_directory.by_username(username)
         # Always respond generically to prevent user enumeration
         if user:
-            user['reset_token'] = secrets.token_urlsafe(32)
-            user['reset_expires'] = time.time() + RESET_EXPIRY_SECONDS
-            save_users()
-            token_display = user['reset_token']  # Since no email system, show token for manual use
+            token_display = issue_reset_token(db.session.get(UserDB, user['id']))  # Since no email system, show token for manual use
+            db.session.commit()
             flash('If the account exists, a reset token was generated.')
         else:
             flash('If the account exists, a reset token was generated.')
@@ -356,9 +378,9 @@ def forgot_password():
 
 @app.route('/reset/<token>', methods=['GET','POST'])
 def reset_password(token):
-    load_users()
-    user = _find_user_by_reset_token(token)
-    if not user or user.get('reset_expires',0) < time.time():
+    maybe_sweep()
+    user = find_user_by_reset_token(token)
+    if not user:
         flash('Invalid or expired reset token.')
         return render_template('reset_password.html', invalid=True)
     if request.method == 'POST':
@@ -371,11 +393,10 @@ def reset_password(token):
         if errs:
             flash('Password must contain: ' + ', '.join(errs))
             return render_template('reset_password.html', token=token, invalid=False)
-        user['password_hash'] = generate_password_hash(pw1)
-        # Invalidate token
-        user.pop('reset_token', None)
-        user.pop('reset_expires', None)
-        save_users()
+        user.password_hash = hasher.hash(pw1)
+        clear_reset_token(user)
+        revoke_sessions(user)
+        db.session.commit()
         flash('Password reset successful. Please log in.')
         return redirect(url_for('login'))
     return render_template('reset_password.html', token=token, invalid=False)
@@ -412,6 +433,63 @@ def save_phases():
     except Exception as e:
         print('[ERROR] save_phases DB:', e)
 
+def load_users():
+    try:
+        with app.app_context():
+            users[:] = [user_dict(u) for u in UserDB.query.all()]
+        _users_state['stale'] = False
+    except Exception as e:
+        print('[ERROR] load_users DB:', e)
+
+def all_users():
+    """The full ``users`` list, reloaded only when stale; just the admin listings need every account."""
+    if _users_state['stale']:
+        load_users()
+    return users
+
+def _users_changed():
+    # A users write from some worker: drop cached lookups, reload the list lazily
+    user_directory.invalidate()
+    _users_state['stale'] = True
+
+def _parse_setting(value):
+    if value in ('1', 'true', 'True'):
+        return True
+    if value in ('0', 'false', 'False', None):
+        return False
+    return value
+
+def load_settings():
+    try:
+        with app.app_context():
+            fresh = {s.key: _parse_setting(s.value) for s in SettingDB.query.all()}
+            settings.clear()
+            settings.update(fresh)
+    except Exception as e:
+        print('[ERROR] load_settings DB:', e)
+
+def save_settings(*keys):
+    # Write only ``keys``: the rest of this worker's dict may predate other workers' writes
+    try:
+        with app.app_context():
+            for k in keys:
+                v = settings[k]
+                value = ('1' if v else '0') if isinstance(v, bool) else str(v)
+                rec = db.session.get(SettingDB, k)
+                if rec is None:
+                    db.session.add(SettingDB(key=k, value=value))
+                else:
+                    rec.value = value
+            db.session.commit()
+    except Exception as e:
+        print('[ERROR] save_settings DB:', e)
+
+def can_edit():
+    # Admins always edit; everyone else only while open editing is switched on
+    if getattr(current_user, 'is_admin', False):
+        return True
+    return bool(settings.get('open_editing', False))
+
 @app.route('/create_phase', methods=['POST'])
 @login_required
 def create_phase():
@@ -528,7 +606,6 @@ def migrate_legacy_json():
 # --- iCalendar Export Route ---
 @app.route('/calendar_export_ics')
 def calendar_export_ics():
-    load_tasks()
     ics = [
         'BEGIN:VCALENDAR',
         'VERSION:2.0',
@@ -574,7 +651,6 @@ def get_project_timeline_data(tasks):
 @app.route('/timeline')
 @login_required
 def timeline_page():
-    load_tasks()
     timeline_items = get_project_timeline_data(tasks)
     return render_template('timeline.html', tasks=tasks, timeline_items=timeline_items)
 
@@ -582,14 +658,13 @@ def timeline_page():
 @login_required
 @admin_required
 def control_panel_page():
-    load_users()
     # Provide users (excluding password hashes) to template
     safe_users = [
         {
             'id': u['id'],
             'username': u['username'],
             'is_admin': u.get('is_admin', False)
-        } for u in users
+        } for u in all_users()
     ]
     return render_template('control_panel.html', users=safe_users)
 
@@ -597,7 +672,6 @@ def control_panel_page():
 @login_required
 @admin_required
 def settings_json():
-    load_settings()
     return jsonify({'open_editing': settings.get('open_editing', False)})
 
 @app.route('/set_open_editing', methods=['POST'])
@@ -606,124 +680,112 @@ def settings_json():
 def set_open_editing():
     data = request.get_json(force=True, silent=True) or {}
     val = bool(data.get('open_editing', False))
-    load_settings()
     settings['open_editing'] = val
-    save_settings()
+    save_settings('open_editing')
     return jsonify({'success': True, 'open_editing': settings['open_editing']})
 
 # --- User management API (admin only) ---
+def _other_admin_exists(user_id):
+    return UserDB.query.filter(UserDB.is_admin.is_(True), UserDB.id != user_id).first() is not None
+
 @app.route('/admin/users_json')
 @login_required
 @admin_required
 def admin_users_json():
-    load_users()
     return jsonify([
         {
             'id': u['id'],
             'username': u['username'],
             'is_admin': u.get('is_admin', False)
-        } for u in users
+        } for u in all_users()
     ])
 
 @app.route('/admin/create_user', methods=['POST'])
 @login_required
 @admin_required
 def admin_create_user():
-    load_users()
     data = request.get_json(force=True, silent=True) or {}
     username = (data.get('username') or '').strip()
     password = (data.get('password') or '').strip()
     is_admin = bool(data.get('is_admin', False))
     if not username or not password:
         return jsonify({'success': False, 'error': 'Username and password required'}), 400
-    if any(u['username'].lower() == username.lower() for u in users):
+    if user_directory.by_username(username):
         return jsonify({'success': False, 'error': 'Username already exists'}), 409
-    new_user = {
-        'id': str(uuid.uuid4()),
-        'username': username,
-        'password_hash': generate_password_hash(password),
-        'is_admin': is_admin
-    }
-    users.append(new_user)
-    save_users()
-    return jsonify({'success': True, 'user': {'id': new_user['id'], 'username': new_user['username'], 'is_admin': new_user['is_admin']}})
+    rec = UserDB(id=str(uuid.uuid4()), username=username, password_hash=hasher.hash(password), is_admin=is_admin)
+    db.session.add(rec)
+    db.session.commit()
+    return jsonify({'success': True, 'user': {'id': rec.id, 'username': rec.username, 'is_admin': rec.is_admin}})
 
 @app.route('/admin/set_admin', methods=['POST'])
 @login_required
 @admin_required
 def admin_set_admin():
-    load_users()
     data = request.get_json(force=True, silent=True) or {}
     user_id = data.get('user_id')
     is_admin = bool(data.get('is_admin'))
     if not user_id:
         return jsonify({'success': False, 'error': 'user_id required'}), 400
-    target = next((u for u in users if str(u['id']) == str(user_id)), None)
+    target = db.session.get(UserDB, str(user_id))
     if not target:
         return jsonify({'success': False, 'error': 'User not found'}), 404
     # Prevent demoting last admin
-    if not is_admin:
-        other_admins = [u for u in users if u.get('is_admin', False) and str(u['id']) != str(user_id)]
-        if not other_admins:
-            return jsonify({'success': False, 'error': 'Cannot remove the last admin'}), 400
-    target['is_admin'] = is_admin
-    save_users()
+    if not is_admin and not _other_admin_exists(target.id):
+        return jsonify({'success': False, 'error': 'Cannot remove the last admin'}), 400
+    if target.is_admin != is_admin:
+        target.is_admin = is_admin
+        revoke_sessions(target)
+    db.session.commit()
     return jsonify({'success': True})
 
 @app.route('/admin/reset_password', methods=['POST'])
 @login_required
 @admin_required
 def admin_reset_password():
-    load_users()
     data = request.get_json(force=True, silent=True) or {}
     user_id = data.get('user_id')
     new_password = (data.get('new_password') or '').strip()
     if not user_id or not new_password:
         return jsonify({'success': False, 'error': 'user_id and new_password required'}), 400
-    target = next((u for u in users if str(u['id']) == str(user_id)), None)
+    target = db.session.get(UserDB, str(user_id))
     if not target:
         return jsonify({'success': False, 'error': 'User not found'}), 404
-    target['password_hash'] = generate_password_hash(new_password)
-    save_users()
+    target.password_hash = hasher.hash(new_password)
+    revoke_sessions(target)
+    db.session.commit()
     return jsonify({'success': True})
 
 @app.route('/admin/delete_user', methods=['POST'])
 @login_required
 @admin_required
 def admin_delete_user():
-    load_users()
     data = request.get_json(force=True, silent=True) or {}
     user_id = data.get('user_id')
     if not user_id:
         return jsonify({'success': False, 'error': 'user_id required'}), 400
-    target = next((u for u in users if str(u['id']) == str(user_id)), None)
+    target = db.session.get(UserDB, str(user_id))
     if not target:
         return jsonify({'success': False, 'error': 'User not found'}), 404
     # Prevent deleting last admin
-    if target.get('is_admin', False):
-        other_admins = [u for u in users if u.get('is_admin', False) and str(u['id']) != str(user_id)]
-        if not other_admins:
-            return jsonify({'success': False, 'error': 'Cannot delete the last admin'}), 400
-    # Remove user
-    remaining = [u for u in users if str(u['id']) != str(user_id)]
+    if target.is_admin and not _other_admin_exists(target.id):
+        return jsonify({'success': False, 'error': 'Cannot delete the last admin'}), 400
     # Reassign tasks belonging to deleted user? For now just leave tasks with orphaned user_id
     # Could optionally scrub or transfer ownership.
-    users.clear()
-    users.extend(remaining)
-    save_users()
+    db.session.delete(target)
+    db.session.commit()
     return jsonify({'success': True})
 
 # --- Calendar View Route ---
 @app.route('/calendar')
 @login_required
 def calendar_view():
-    return render_template('calendar.html')
+    return render_template('calendar.html', data_version=item_cache.version)
 
 # --- Kanban View Route ---
 @app.route('/kanban')
 @login_required
 def kanban_view():
-    return render_template('kanban.html', tasks=tasks)
+    return render_template('kanban.html', tasks=tasks, data_version=item_cache.version)
 
 
 # --- Tasks JSON for Calendar & API ---
@@ -745,7 +807,6 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 PDF_FILENAME = 'uploaded.pdf'  # legacy single-PDF fallback
 
 TASKS_FILE = None  # legacy removed
-tasks = []
 next_task_id = 1
 
 # --- Delete Task ---
@@ -780,8 +841,8 @@ def delete_task():
                 fpath = os.path.join(UPLOAD_FOLDER, fname)
                 if os.path.exists(fpath):
                     os.remove(fpath)
-            tasks.pop(idx)
-            save_tasks()
+            save_tasks([], deleted=[tasks[idx]['id']])
+            load_tasks()
             return jsonify({'success': True, 'legacy': True})
         else:
             return jsonify({'success': False, 'error': 'Missing task identifier'}), 400
@@ -792,48 +853,27 @@ def delete_task():
 
 # --- Persistent Storage Helpers ---
 def load_tasks():
-    global tasks, next_task_id
+    """Sync the in-memory tasks with the DB; only changed rows are re-read."""
+    global next_task_id
     try:
         with app.app_context():
-            db_tasks = ItemDB.query.order_by(ItemDB.id.asc()).all()
-            tasks.clear()
-            max_id = 0
-            for t in db_tasks:
-                task_dict = {
-                    'id': t.id,
-                    'user_id': t.user_id,
-                    'name': t.name,
-                    'phase': t.phase,
-                    'start': t.start or '',
-                    'duration': t.duration or '',
-                    'responsible': t.responsible or '',
-                    'status': t.status or 'Not Started',
-                    'percent_complete': t.percent_complete or '0',
-                    'milestone': t.milestone or '',
-                    'parent': t.parent,
-                    'depends_on': t.depends_on or '',
-                    'resources': t.resources or '',
-                    'notes': t.notes or '',
-                    'pdf_page': t.pdf_page or '',
-                    'pdf_file': getattr(t, 'pdf_file', '') or '',
-                    'external_item': getattr(t, 'external_item', False),
-                    'external_task': getattr(t, 'external_item', False),  # legacy alias
-                    'external_milestone': t.external_milestone,
-                    'document_links': [d for d in (t.document_links.split(',') if t.document_links else []) if d],
-                    'attachments': [a for a in (t.attachments.split(',') if t.attachments else []) if a],
-                    'shared_with': [s for s in (t.shared_with.split(',') if t.shared_with else []) if s],
-                }
-                max_id = max(max_id, t.id)
-                tasks.append(task_dict)
-            next_task_id = max_id + 1
+            item_cache.refresh()
+            next_task_id = item_cache.max_id + 1
     except Exception as e:
         print('[ERROR] load_tasks DB:', e)
 
-def save_tasks():
+def save_tasks(changed, deleted=()):
+    # Write only the given task dicts (and delete ``deleted`` ids). Mirroring the
+    # whole cached list would overwrite rows other workers changed since it loaded.
     try:
         with app.app_context():
-            existing = {t.id: t for t in ItemDB.query.all()}
-            for t in tasks:
+            changed = list(changed)
+            ids = [t['id'] for t in changed if t.get('id') is not None] + list(deleted)
+            existing = {t.id: t for t in ItemDB.query.filter(ItemDB.id.in_(ids))} if ids else {}
+            for item_id in deleted:
+                if item_id in existing:
+                    db.session.delete(existing[item_id])
+            for t in changed:
                 rec = existing.get(t['id'])
                 doc_links = ','.join(t.get('document_links', []))
                 attach = ','.join(t.get('attachments', []))
@@ -888,6 +928,11 @@ def save_tasks():
     except Exception as e:
         print('[ERROR] save_tasks DB:', e)
 
+cache_sync.register('users', _users_changed)
+cache_sync.register('phases', load_phases)
+cache_sync.register('settings', load_settings)
+cache_sync.register('items', load_tasks)
+
 # --- Delete Attachment from Task ---
 @app.route('/delete_attachment', methods=['POST'])
 def delete_attachment():
@@ -905,7 +950,7 @@ def delete_attachment():
             fpath = os.path.join(UPLOAD_FOLDER, filename)
             if os.path.exists(fpath):
                 os.remove(fpath)
-            save_tasks()
+            save_tasks([task])
             return jsonify({'success': True})
         else:
             return jsonify({'success': False, 'error': 'Attachment not found'}), 404
@@ -920,69 +965,135 @@ def calendar_export():
 # --- Project Export as ZIP (JSON + Attachments) ---
 import zipfile
 
+def project_json_chunks(rows):
+    """``json.dumps(rows, indent=2)`` produced one row at a time."""
+    first = True
+    for row in rows:
+        yield (b'[\n  ' if first else b',\n  ') + json.dumps(row, indent=2).replace('\n', '\n  ').encode('utf-8')
+        first = False
+    yield b'[]' if first else b'\n]'
+
+def _snapshot_rows(base, version):
+    """``(rows, deleted ids)`` to export: every task, or only those written between snapshot ``base`` and ``version``."""
+    if base is None:
+        return list(tasks), []
+    rows, deleted = [], []
+    for item_id in changed_item_ids(base.version, version):
+        t = tasks.get(item_id)
+        if t is None:
+            deleted.append(item_id)
+        else:
+            rows.append(t)
+    return rows, deleted
+
+def _new_snapshot(base, kind, complete=False):
+    snap = SnapshotDB(user_id=current_user.get_id(),
+                      base_id=base.id if base else None, version=item_cache.version or 0,
+                      kind=kind, complete=complete)
+    db.session.add(snap)
+    db.session.commit()
+    return snap
+
+def _referenced_attachments():
+    """Attachment names referenced by any task, in first-use order."""
+    return list(dict.fromkeys(f for t in tasks for f in t.get('attachments', []) if f))
+
+def _bundle_entries(snap_id, version, base, rows, deleted, attachments):
+    """ZIP entries for snapshot ``snap_id``; ``rows``, ``deleted`` and ``attachments`` were all taken at ``version``."""
+    previous = manifest_of(base)
+    manifest, files, seen = {}, [], set(attachments)
+    # On a diff only attachments whose size or mtime moved since the base
+    # export are read (and hashed as they stream)
+    for fname in attachments:
+        fpath = os.path.join(UPLOAD_FOLDER, fname)
+        if not os.path.exists(fpath):
+            continue
+        known = previous.get(fname)
+        if known and tuple(known[1:]) == file_state(fpath):
+            manifest[fname] = known
+        else:
+            files.append((fname, fpath))
+    yield 'project.json', project_json_chunks(rows)
+    for fname, fpath in files:
+        yield os.path.join('attachments', fname), hashed_chunks(fpath, fname, manifest), os.path.getmtime(fpath)
+    yield 'snapshot.json', json.dumps({
+        'snapshot': snap_id, 'base': base.id if base else None, 'version': version,
+        'deleted': deleted, 'removed_attachments': sorted(set(previous) - seen),
+    }, indent=2).encode('utf-8')
+    snap = db.session.get(SnapshotDB, snap_id)
+    snap.attachments = json.dumps(manifest)
+    snap.complete = True
+    db.session.commit()
+
 @app.route('/download_project_zip')
+@login_required
 def download_project_zip():
-    # Prepare in-memory zip
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Add project.json
-        project_json = json.dumps(tasks, indent=2).encode('utf-8')
-        zf.writestr('project.json', project_json)
-        # Add all unique attachments referenced in tasks
-        added = set()
-        for t in tasks:
-            for fname in t.get('attachments', []):
-                if fname and fname not in added:
-                    fpath = os.path.join(UPLOAD_FOLDER, fname)
-                    if os.path.exists(fpath):
-                        zf.write(fpath, arcname=os.path.join('attachments', fname))
-                        added.add(fname)
-    buf.seek(0)
-    return send_file(buf, as_attachment=True, download_name='project_bundle.zip', mimetype='application/zip')
+    """Stream project.json plus the attachments as a ZIP; nothing is buffered whole.
+
+    PDFs, images and other compressed formats are stored, the rest deflated
+    (see zip_stream.compression_for). Each bundle is recorded as a snapshot
+    (id in ``X-Snapshot-Id`` and snapshot.json); ``?since=<snapshot>`` only
+    carries what changed after it (see snapshots.py).
+    """
+    try:
+        base = base_snapshot(request.args.get('since'))
+    except SnapshotError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    snap = _new_snapshot(base, 'zip')
+    # Copied now: the task cache may move on while the bundle streams
+    rows, deleted = _snapshot_rows(base, snap.version)
+    rows = [dict(t) for t in rows]
+    attachments = _referenced_attachments()
+    name = 'project_bundle.zip' if base is None else f'project_since_{base.id}.zip'
+    entries = _bundle_entries(snap.id, snap.version, base, rows, deleted, attachments)
+    return Response(stream_with_context(stream_zip(entries)),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={name}', 'X-Snapshot-Id': str(snap.id)})
     ics_str = '\r\n'.join(ics)
     return Response(ics_str, mimetype='text/calendar', headers={
         'Content-Disposition': 'attachment; filename=project.ics'
     })
 
 # --- Critical Path Calculation ---
-def compute_critical_path(tasks):
-    # Build task dict by name
-    task_dict = {t['name']: t for t in tasks}
-    # Build adjacency and reverse adjacency (for dependencies)
-    adj = {t['name']: [] for t in tasks}
-    rev_adj = {t['name']: [] for t in tasks}
-    for t in tasks:
-        @app.route('/migrate_legacy_json')
-        @login_required
-        def migrate_legacy_json():
-            return jsonify({'success': False, 'error': 'Legacy JSON migration disabled; database is authoritative.'}), 410
-        # Add phase as a top-level row (no date, no duration)
-        all_tasks.append({
-            'name': phase,
-            'start': None,
-            'duration': 0,
-            'is_milestone': False,
-            'is_phase': True,
-            'external_task': False,
-            'external_milestone': False
-        })
-        # Find top-level tasks (no parent)
-        top_level = [t for t in phase_tasks if not t.get('parent') or t.get('parent') in ('', None, 'None')]
-        for t in top_level:
-            collect(t, all_tasks, 1)
-    return all_tasks
+_gantt_schedule = {'version': None, 'rows': None}
+
+def compute_schedule():
+    """CPM rows aligned with ``tasks`` (None on a dependency cycle), cached per items version."""
+    if _gantt_schedule['version'] is None or _gantt_schedule['version'] != item_cache.version:
+        pos = {t.get('id'): i for i, t in enumerate(tasks)}
+        edges = [(pos[p], i, kind, lag)
+                 for i, t in enumerate(tasks)
+                 for p, kind, lag in item_cache.predecessors(t.get('id')) if p in pos]
+        try:
+            _gantt_schedule['rows'] = schedule_tasks(tasks, edges=edges)
+        except CycleError as e:
+            print('[WARN] critical path skipped:', e)
+            _gantt_schedule['rows'] = None
+        _gantt_schedule['version'] = item_cache.version
+    return _gantt_schedule['rows']
+
+def _task_dependents(t):
+    found = (tasks.get(i) for i in item_cache.successors(t.get('id')))
+    return [d for d in found if d is not None]
+
+def _task_predecessors(t):
+    """Typed ``(task, kind, lag)`` links into ``t`` from the dependencies table."""
+    links = ((tasks.get(p), kind, lag) for p, kind, lag in item_cache.predecessors(t.get('id')))
+    return [link for link in links if link[0] is not None]
+
+def shift_dependents(changes):
+    """``propagate`` over the cached tasks: ``[(task, new_start), ...]`` downstream of ``changes``."""
+    return propagate(changes, _task_dependents, _task_predecessors)
 
 @app.route('/gantt')
 @login_required
 def gantt_page():
-    load_tasks()
-    return render_template('gantt.html', tasks=tasks)
+    return render_template('gantt.html', tasks=tasks, data_version=item_cache.version)
 
 # --- Interactive Gantt (frontend JS-based) ---
 @app.route('/gantt_interactive')
 @login_required
 def gantt_interactive_page():
-    load_tasks()
     return render_template('gantt_interactive.html')
 
 @app.route('/gantt_data')
@@ -991,181 +1102,110 @@ def gantt_data():
     """Return task data formatted for interactive Gantt usage.
     Each task includes computed finish date (start + duration days) and flags.
     Milestones represented with finish == start.
+
+    The full list carries its change version in ``X-Data-Version``. With
+    ``?since=<version>`` only the rows written after that version are returned:
+    ``{version, full: false, tasks, deleted, critical}`` where ``critical`` lists
+    every critical task id (one edit can move the critical path anywhere). When
+    the delta cannot be served (log reset, too many changes) the reply is
+    ``{version, full: true, tasks}`` with every row.
     """
-    load_tasks()
-    out = []
-    for t in tasks:
-        start = t.get('start')
-        duration_raw = t.get('duration', 0)
-        try:
-            duration = int(duration_raw) if str(duration_raw).strip() != '' else 0
-        except Exception:
-            duration = 0
-        finish = None
-        if start:
-            try:
-                dt = datetime.strptime(start, '%Y-%m-%d')
-                if t.get('milestone') or t.get('external_milestone'):
-                    finish_dt = dt  # zero-length for milestone
-                else:
-                    finish_dt = dt + timedelta(days=duration if duration > 0 else 0)
-                finish = finish_dt.strftime('%Y-%m-%d')
-            except Exception:
-                finish = start
-        try:
-            pc_val = float(t.get('percent_complete', 0))
-        except Exception:
-            pc_val = 0.0
-        out.append({
-            'id': t.get('id'),
-            'name': t.get('name'),
-            'phase': t.get('phase') or 'No Phase',
-            'start': start,
-            'finish': finish,
-            'duration': duration,
-            'percent_complete': pc_val,
-            'status': t.get('status'),
-            'milestone': bool(t.get('milestone')) or bool(t.get('external_milestone')),
-            'external_task': bool(t.get('external_item') or t.get('external_task')),
-            'external_milestone': bool(t.get('external_milestone')),
-            'depends_on': t.get('depends_on'),
-            'parent': t.get('parent'),
-            'responsible': t.get('responsible'),
-            'notes': t.get('notes'),
-            'resources': t.get('resources'),
-        })
-    return jsonify(out)
+    body = gantt_data_body()
+    since = request.args.get('since', type=int)
+    if since is None:
+        resp = Response(body, mimetype='application/json')
+        resp.headers['X-Data-Version'] = str(_gantt_data['version'])
+        return resp
+    version = _gantt_data['version']
+    changed = changed_since(since, version)
+    if changed is None:
+        return jsonify({'version': version, 'full': True, 'tasks': list(_gantt_data['rows'].values())})
+    rows = _gantt_data['rows']
+    return jsonify({
+        'version': version,
+        'full': False,
+        'tasks': [rows[i] for i in changed if i in rows],
+        'deleted': [i for i in changed if i not in rows],
+        'critical': _gantt_data['critical'],
+    })
+
+_gantt_data = {'version': None, 'body': None, 'rows': {}, 'critical': []}
+
+def gantt_data_body():
+    """JSON for ``/gantt_data``, rebuilt only when items changed.
+
+    Rows come precomputed from the item cache (finish derived on write); only
+    the graph wide fields (predecessors, critical path) are attached here.
+    """
+    if _gantt_data['version'] is None or _gantt_data['version'] != item_cache.version:
+        rows = {}
+        schedule = compute_schedule() or [None] * len(tasks)
+        for t, cpm in zip(tasks, schedule):
+            row = item_cache.gantt_row(t.get('id'))
+            if row is None:
+                continue  # not persisted yet
+            row = dict(row)
+            row['predecessors'] = [{'id': p, 'type': kind, 'lag': lag} for p, kind, lag in item_cache.predecessors(row['id'])]
+            row['critical'] = bool(cpm and cpm.critical)
+            row['total_float'] = cpm.total_float if cpm else None
+            rows[row['id']] = row
+        _gantt_data['rows'] = rows
+        _gantt_data['critical'] = [i for i, row in rows.items() if row['critical']]
+        _gantt_data['body'] = json.dumps(list(rows.values()))
+        _gantt_data['version'] = item_cache.version
+    return _gantt_data['body']
+
+# Rendered charts keyed by content; evicted entries spill to the instance folder
+render_cache = RenderCache(directory=os.path.join(app.instance_path, 'render_cache'))
+# Out-of-process matplotlib; GANTT_RENDER_WORKERS=0 renders inline
+render_pool = RenderPool.from_env()
+# Big charts render at full quality unless dense mode is asked for (?dense=1 or this default)
+GANTT_DENSE_DEFAULT = os.environ.get('GANTT_DENSE_RENDER', '0') in ('1', 'true', 'True')
+_gantt_fingerprint = {'version': None, 'digest': None}
+
+def gantt_fingerprint():
+    """Digest of the Gantt relevant task fields, recomputed only when items changed."""
+    if _gantt_fingerprint['version'] is None or _gantt_fingerprint['version'] != item_cache.version:
+        _gantt_fingerprint['digest'] = tasks_fingerprint(tasks)
+        _gantt_fingerprint['version'] = item_cache.version
+    return _gantt_fingerprint['digest']
+
+def _cached_response(key, data, mimetype, download_name=None):
+    resp = Response(data, mimetype=mimetype)
+    if download_name:
+        resp.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    resp.set_etag(key)
+    resp.cache_control.no_cache = True  # always revalidate; unchanged charts get a 304
+    return resp.make_conditional(request)
+
+def _gantt_payload():
+    """Plain dicts holding only the drawn fields; cheap to pickle to a render worker."""
+    return [{f: t.get(f) for f in GANTT_FIELDS} for t in tasks]
+
+def _render_error_response(e):
+    # A broken pool (a worker died) is replaced on the next render, so it is retryable too
+    if isinstance(e, (RenderBusy, BrokenProcessPool)):
+        resp = Response('Chart renderer busy, retry shortly', status=503, mimetype='text/plain')
+        resp.headers['Retry-After'] = '2'
+        return resp
+    return Response('Chart rendering timed out', status=504, mimetype='text/plain')
 
 @app.route('/gantt.png')
 def gantt_chart():
-    print("[DEBUG] Entered gantt_chart route")
     try:
-        print("[DEBUG] Tasks before rendering Gantt chart:", json.dumps(tasks, indent=2, ensure_ascii=False))
-        from flask import request as flask_request
         # Filtering: allow hiding external tasks/milestones
-        hide_external = flask_request.args.get('hide_external', '0') in ('1', 'true', 'True')
-        base_tasks = tasks
-        if hide_external:
-            base_tasks = [t for t in tasks if not (t.get('external_item') or t.get('external_task')) and not t.get('external_milestone')]
-        parsed = parse_tasks_for_gantt(base_tasks)
-        critical = compute_critical_path(tasks)
-        fig, ax = plt.subplots(figsize=(24, 12))
-        plt.rcParams.update({'font.size': 20})
+        hide_external = request.args.get('hide_external', '0') in ('1', 'true', 'True')
         # Get color scheme from query params or use defaults
-        primary_color = flask_request.args.get('primary', '#4287f5')
-        secondary_color = flask_request.args.get('secondary', '#FF8200')
-        if not parsed:
-            ax.text(0.5, 0.5, 'No tasks to display', ha='center', va='center', fontsize=16, color='gray', transform=ax.transAxes)
-            ax.set_xlabel('Date')
-            fig.tight_layout()
-        else:
-            names = [t['name'] for t in parsed]
-            # For phases, no start/duration; for tasks/sub-tasks, as before
-            starts = [mdates.date2num(t['start']) if t.get('start') else None for t in parsed]
-            durations = [int(t['duration']) if not isinstance(t['duration'], int) else t['duration'] for t in parsed]
-            y_pos = list(range(len(parsed)))
-            for i, t in enumerate(parsed):
-                if t.get('is_phase'):
-                    # Draw phase as a label only
-                    ax.text(0, i, t['name'], va='center', ha='left', fontsize=18, fontweight='bold', color='black', bbox=dict(facecolor='#f0f0f0', edgecolor='gray', boxstyle='round,pad=0.2'))
-                elif t.get('is_milestone'):
-                    # External milestones forced red
-                    milestone_color = 'red' if t.get('external_milestone') else secondary_color
-                    ax.scatter(starts[i] + durations[i], i, marker='D', s=140, color=milestone_color, edgecolor='black', zorder=6,
-                               label='Milestone' if i == 0 else "")
-                else:
-                    # Find the original task to get percent_complete
-                    task_name = t['name'].lstrip()
-                    orig_task = next((task for task in tasks if task['name'] == task_name), None)
-                    try:
-                        percent = float(orig_task.get('percent_complete', 0)) if orig_task else 0
-                    except Exception:
-                        percent = 0
-                    percent = max(0, min(percent, 100))
-                    dur = int(t['duration']) if not isinstance(t['duration'], int) else t['duration']
-                    done_dur = dur * percent / 100.0
-                    # External tasks always red full bar
-                    if t.get('external_item') or t.get('external_task'):
-                        ax.barh(i, dur, left=starts[i], height=0.45, align='center', color='red', edgecolor='black', hatch='///')
-                    else:
-                        # Draw completed (primary color) part
-                        if done_dur > 0:
-                            ax.barh(i, done_dur, left=starts[i], height=0.4, align='center', color=primary_color, edgecolor='black')
-                        # Draw remaining (secondary color) part
-                        if done_dur < dur:
-                            ax.barh(i, dur - done_dur, left=starts[i] + done_dur, height=0.4, align='center', color=secondary_color, edgecolor='black')
-            ax.set_yticks(y_pos)
-            ax.set_yticklabels(names)
-            ax.set_xlabel('Date')
-            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-            fig.autofmt_xdate()
-            ax.invert_yaxis()
-            # Draw parent-child arrows
-            name_to_info = {t['name'].lstrip(): (i, starts[i], durations[i]) for i, t in enumerate(parsed) if not t.get('is_phase')}
-            for t in tasks:
-                parent = t.get('parent')
-                if parent and parent not in ('', None, 'None'):
-                    child_name = t['name']
-                    for i, pt in enumerate(parsed):
-                        if pt['name'].lstrip() == child_name:
-                            child_idx = i
-                            break
-                    else:
-                        continue
-                    for j, pt in enumerate(parsed):
-                        if pt['name'].lstrip() == parent:
-                            parent_idx = j
-                            break
-                    else:
-                        continue
-                    parent_y = parent_idx
-                    child_y = child_idx
-                    parent_end = starts[parent_idx] + durations[parent_idx]
-                    child_start = starts[child_idx]
-                    ax.annotate('', xy=(child_start, child_y), xytext=(parent_end, parent_y),
-                                arrowprops=dict(arrowstyle='->', color='blue', lw=1.5, shrinkA=5, shrinkB=5))
-            # Draw dependency arrows (depends_on)
-            for t in tasks:
-                dep = t.get('depends_on')
-                if dep and dep not in ('', None, 'None'):
-                    child_name = t['name']
-                    dep_name = dep
-                    for i, pt in enumerate(parsed):
-                        if pt['name'].lstrip() == child_name:
-                            child_idx = i
-                            break
-                    else:
-                        continue
-                    for j, pt in enumerate(parsed):
-                        if pt['name'].lstrip() == dep_name:
-                            dep_idx = j
-                            break
-                    else:
-                        continue
-                    dep_y = dep_idx
-                    child_y = child_idx
-                    dep_end = starts[dep_idx] + durations[dep_idx]
-                    child_start = starts[child_idx]
-                    ax.annotate('', xy=(child_start, child_y), xytext=(dep_end, dep_y),
-                                arrowprops=dict(arrowstyle='->', color='red', lw=1.5, linestyle='dashed', shrinkA=5, shrinkB=5))
-            fig.tight_layout()
-            # Legend creation
-            import matplotlib.patches as mpatches
-            legend_items = []
-            legend_items.append(mpatches.Patch(color=primary_color, label='Completed Portion'))
-            legend_items.append(mpatches.Patch(color=secondary_color, label='Remaining Portion'))
-            legend_items.append(mpatches.Patch(facecolor='red', edgecolor='black', hatch='///', label='External Task'))
-            legend_items.append(plt.Line2D([0],[0], marker='D', color='w', markerfacecolor=secondary_color, markeredgecolor='black', markersize=12, label='Milestone'))
-            legend_items.append(plt.Line2D([0],[0], marker='D', color='w', markerfacecolor='red', markeredgecolor='black', markersize=12, label='External Milestone'))
-            legend_items.append(plt.Line2D([0],[0], color='blue', lw=2, label='Parent → Child'))
-            legend_items.append(plt.Line2D([0],[0], color='red', lw=2, linestyle='dashed', label='Dependency'))
-            ax.legend(handles=legend_items, loc='upper left', bbox_to_anchor=(1.01, 1), frameon=True, title='Legend')
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        return Response(buf.getvalue(), mimetype='image/png')
+        primary_color = request.args.get('primary', '#4287f5')
+        secondary_color = request.args.get('secondary', '#FF8200')
+        dense = request.args.get('dense', '1' if GANTT_DENSE_DEFAULT else '0') in ('1', 'true', 'True')
+        key = render_key('gantt.png', RENDER_VERSION, gantt_fingerprint(), hide_external, primary_color,
+                         secondary_color, dense)
+        data = render_cache.get_or_render(key, lambda: render_pool.run(
+            render_gantt_png, _gantt_payload(), primary_color, secondary_color, hide_external, dense))
+        return _cached_response(key, data, 'image/png')
+    except (RenderBusy, RenderTimeout, BrokenProcessPool) as e:
+        return _render_error_response(e)
     except Exception as e:
         print("[ERROR] Exception in gantt_chart:", str(e))
         import traceback
@@ -1174,83 +1214,55 @@ def gantt_chart():
 
 @app.route('/gantt_export/<fmt>')
 def gantt_export(fmt):
-    parsed = parse_tasks_for_gantt(tasks)
-    fig, ax = plt.subplots(figsize=(8, 4))
-    if not parsed:
-        ax.text(0.5, 0.5, 'No tasks to display', ha='center', va='center', fontsize=16, color='gray', transform=ax.transAxes)
-        ax.set_xlabel('Date')
-        fig.tight_layout()
-    else:
-        names = [t['name'] for t in parsed]
-        starts = [mdates.date2num(t['start']) for t in parsed]
-        durations = [t['duration'] for t in parsed]
-        y_pos = list(range(len(parsed)))
-        for i, t in enumerate(parsed):
-            ax.barh(i, t['duration'], left=starts[i], height=0.4, align='center', color='#FF8200', edgecolor='black')
-        ax.set_yticks(y_pos)
-        ax.set_yticklabels(names)
-        ax.set_xlabel('Date')
-        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        fig.autofmt_xdate()
-        ax.invert_yaxis()
-        # Draw parent-child arrows
-        name_to_info = {t['name'].lstrip(): (i, starts[i], durations[i]) for i, t in enumerate(parsed)}
-        for tsk in tasks:
-            parent = tsk.get('parent')
-            if parent:
-                child_name = tsk['name']
-                for i, pt in enumerate(parsed):
-                    if pt['name'].lstrip() == child_name:
-                        child_idx = i
-                        break
-                else:
-                    continue
-                for j, pt in enumerate(parsed):
-                    if pt['name'].lstrip() == parent:
-                        parent_idx = j
-                        break
-                else:
-                    continue
-                parent_y = parent_idx
-                child_y = child_idx
-                parent_end = starts[parent_idx] + durations[parent_idx]
-                child_start = starts[child_idx]
-                ax.annotate('', xy=(child_start, child_y), xytext=(parent_end, parent_y),
-                            arrowprops=dict(arrowstyle='->', color='blue', lw=1.5, shrinkA=5, shrinkB=5))
-        fig.tight_layout()
-    buf = io.BytesIO()
-    if fmt == 'pdf':
-        plt.savefig(buf, format='pdf')
-        plt.close(fig)
-        buf.seek(0)
-        return send_file(buf, as_attachment=True, download_name='project_timeline.pdf', mimetype='application/pdf')
-    else:
-        plt.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        return send_file(buf, as_attachment=True, download_name='project_timeline.png', mimetype='image/png')
+    fmt = 'pdf' if fmt == 'pdf' else 'png'
+    key = render_key('gantt_export', RENDER_VERSION, gantt_fingerprint(), fmt)
+    try:
+        data = render_cache.get_or_render(key, lambda: render_pool.run(render_gantt_export, _gantt_payload(), fmt))
+    except (RenderBusy, RenderTimeout, BrokenProcessPool) as e:
+        return _render_error_response(e)
+    mimetype = 'application/pdf' if fmt == 'pdf' else 'image/png'
+    return _cached_response(key, data, mimetype, download_name=f'project_timeline.{fmt}')
+
+CSV_COLUMNS = ['name', 'responsible', 'start', 'duration', 'depends_on', 'resources', 'notes', 'pdf_page', 'parent', 'external_task', 'external_milestone']
+CSV_CHUNK_BYTES = 64 * 1024
 
 @app.route('/download_csv')
+@login_required
 def download_csv():
-    si = io.StringIO()
-    writer = csv.DictWriter(si, fieldnames=['name', 'responsible', 'start', 'duration', 'depends_on', 'resources', 'notes', 'pdf_page', 'parent', 'external_task', 'external_milestone'])
-    writer.writeheader()
-    for t in tasks:
-        row = {k: t.get(k, '') for k in ['name', 'responsible', 'start', 'duration', 'depends_on', 'resources', 'notes', 'pdf_page', 'parent', 'external_task', 'external_milestone']}
-        writer.writerow(row)
-    output = make_response(si.getvalue())
-    output.headers['Content-Disposition'] = 'attachment; filename=project.csv'
-    output.headers['Content-type'] = 'text/csv'
-    return output
+    """Stream the items the user can see as CSV, straight from the database.
+
+    Takes the ``/api/items`` filters (``phase``, ``status``, ``responsible``,
+    ``start_from``, ``start_to``). Rows are fetched ``yield_per`` batches at a
+    time and sent in ~64KB chunks, so memory stays flat for any project size.
+    """
+    try:
+        query = filtered_items(request.args, current_user.get_id(), getattr(current_user, 'is_admin', False))
+    except ApiError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    columns = [ItemDB.external_item if c == 'external_task' else getattr(ItemDB, c) for c in CSV_COLUMNS]
+    rows = query.with_entities(*columns).order_by(ItemDB.id).execution_options(yield_per=1000)
+
+    @stream_with_context
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            writer.writerow(['' if v is None else v for v in row])
+            if buf.tell() >= CSV_CHUNK_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    # No Content-Length: the server sends it with Transfer-Encoding: chunked
+    return Response(generate(), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=project.csv'})
 
 @app.route('/', methods=['GET', 'POST'])
 @login_required
 def index():
     global tasks
-    load_tasks()
-    load_phases()
-    load_settings()
     # multi-PDF: list all uploaded pdfs
     try:
         pdf_files = [f for f in os.listdir(UPLOAD_FOLDER) if f.lower().endswith('.pdf')]
@@ -1285,8 +1297,9 @@ def index():
                     if f and f.filename.lower().endswith('.json'):
                         try:
                             data = json.load(f)
+                            if isinstance(data, dict):
+                                data = data.get('items')  # /download_project export
                             if isinstance(data, list):
-                                tasks.clear()
                                 for t in data:
                                     for k, default in [
                                         ('name', ''),
@@ -1322,9 +1335,10 @@ def index():
                                             t['document_links'] = [t['document_links']]
                                         else:
                                             t['document_links'] = list(t['document_links']) if t['document_links'] else []
-                                tasks.extend(data)
-                                save_tasks()
+                                save_tasks(data)
                                 flash('Project loaded!')
+                                # A bulk write: reload every row rather than patching the cache
+                                item_cache.invalidate()
                                 load_tasks()
                         except Exception:
                             flash('Invalid project file.')
@@ -1353,13 +1367,7 @@ def index():
         external_task = True if request.form.get('external_task') == 'on' else False
         external_milestone = True if request.form.get('external_milestone') == 'on' else False
         # Share_with usernames -> ids
-        share_with_ids = []
-        if share_with:
-            load_users()
-            for uname in [u.strip() for u in share_with.split(',') if u.strip()]:
-                user = next((u for u in users if u['username'] == uname), None)
-                if user:
-                    share_with_ids.append(user['id'])
+        share_with_ids = user_directory.ids_for_usernames(u.strip() for u in share_with.split(',') if u.strip())
         # Attachments (use 'attachments' field name like tasks tab)
         attachment_filenames = []
         if 'attachments' in request.files:
@@ -1385,7 +1393,7 @@ def index():
         # If depends_on is set, automatically set start date to the day after the dependency ends
         auto_start = start
         if depends_on:
-            dep_task = next((t for t in tasks if t['name'] == depends_on), None)
+            dep_task = tasks.first_by_name(depends_on)
             if dep_task:
                 try:
                     dep_start = datetime.strptime(dep_task['start'], '%Y-%m-%d')
@@ -1404,6 +1412,10 @@ def index():
                     flash('Editing is restricted to admins.')
                     return redirect(url_for('index'))
                 old_task = tasks[int(edit_idx)]
+                is_admin = user_directory.is_admin(current_user.get_id())
+                if not is_admin and old_task.get('user_id') and old_task['user_id'] != current_user.get_id():
+                    flash('Not authorized to edit this task.')
+                    return redirect(url_for('index'))
                 merged_attachments = list(old_task.get('attachments', []))
                 for fname in attachment_filenames:
                     if fname not in merged_attachments:
@@ -1436,7 +1448,7 @@ def index():
                     'external_task': external_task,
                     'external_milestone': external_milestone,
                 }
-                tasks[int(edit_idx)] = new_task
+                stored = old_task
                 changed = True
             else:
                 if not can_edit():
@@ -1466,16 +1478,34 @@ def index():
                     'phase': phase,
                     'shared_with': share_with_ids,
                 }
-                tasks.append(new_task)
+                stored = new_task
                 next_task_id += 1
                 changed = True
         print(f"[DEBUG] changed={changed}, name='{name}', duration='{duration}', auto_start='{auto_start}'")
         if changed:
+            # Cascade the new dates through every level of dependents, not just one
+            # The cache is only written through the DB (save_tasks, then load_tasks)
+            touched = [new_task]
+            try:
+                moves = shift_dependents([(stored, new_task)])
+            except CycleError:
+                moves = []
+                flash('Dependency cycle detected; dependent tasks were not rescheduled.')
+            # Same rule as update_task_fields: only admins may move other users' items
+            if not user_directory.is_admin(current_user.get_id()):
+                blocked = sorted(t['name'] for t, _ in moves
+                                 if t.get('user_id') and t['user_id'] != current_user.get_id())
+                if blocked:
+                    flash('Not saved: dependents owned by another user would move (' + ', '.join(blocked) + ').')
+                    return redirect(url_for('index'))
+            for t, new_start in moves:
+                touched.append(dict(t, start=new_start.strftime('%Y-%m-%d')))
             print("[DEBUG] New task form submitted.")
             print(f"[DEBUG] Form data: {request.form}")
             print(f"[DEBUG] New task: {new_task}")
             print(f"[DEBUG] Task list before save: {tasks}")
-            save_tasks()
+            save_tasks(touched)
+            load_tasks()
         return redirect(url_for('index'))
     # Global phases: show all phases (no longer filtered per-user)
     can_edit_flag = can_edit()
@@ -1509,7 +1539,7 @@ def update_task_status():
             rec.percent_complete = 0
         db.session.commit()
     load_tasks()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'version': item_cache.version})
 
 # --- Update Task Fields (start, duration, percent_complete) for interactive Gantt ---
 @app.route('/update_task_fields', methods=['POST'])
@@ -1532,8 +1562,7 @@ def update_task_fields():
             return jsonify({'success': False, 'error': 'Task not found'}), 404
         # Authorization: admin or owner + can_edit
         owner_id = rec.user_id or ''
-        user_rec = next((u for u in users if str(u['id']) == str(current_user.get_id())), None)
-        is_admin = user_rec.get('is_admin', False) if user_rec else False
+        is_admin = user_directory.is_admin(current_user.get_id())
         if not is_admin:
             if owner_id and owner_id != current_user.get_id():
                 return jsonify({'success': False, 'error': 'Not authorized'}), 403
@@ -1565,33 +1594,101 @@ def update_task_fields():
                     rec.status = 'In Progress'
             except Exception:
                 return jsonify({'success': False, 'error': 'Invalid percent_complete'}), 400
-        # Dependency constraint enforcement
-        if rec.depends_on:
-            dep = TaskDB.query.filter_by(name=rec.depends_on).first()
-            if dep and dep.start:
-                try:
-                    dep_start_dt = datetime.strptime(dep.start, '%Y-%m-%d')
-                    dep_dur = int(dep.duration or 0)
-                    dep_end_dt = dep_start_dt + timedelta(days=dep_dur)
-                    if rec.start:
-                        this_start_dt = datetime.strptime(rec.start, '%Y-%m-%d')
-                        if this_start_dt < dep_end_dt:
-                            return jsonify({'success': False, 'error': 'Dependency violation', 'dependency_end': dep_end_dt.strftime('%Y-%m-%d')}), 409
-                except Exception:
-                    pass
+        # Dependency constraint enforcement over the typed links into this item
+        this_start, this_finish = task_span({'start': rec.start, 'duration': rec.duration})
+        if this_start is not None:
+            for pred, kind, lag in _task_predecessors({'id': rec.id}):
+                pred_start, pred_finish = task_span(pred)
+                if pred_start is None:
+                    continue
+                bound = link_bound(kind, lag, pred_start, pred_finish, this_finish - this_start)
+                if this_start < bound:
+                    return jsonify({'success': False, 'error': 'Dependency violation',
+                                    'dependency_end': date.fromordinal(bound).isoformat()}), 409
+        # Push every downstream task later in the same transaction
+        shifted = []
+        cached = tasks.get(rec.id)
+        if cached is not None:
+            try:
+                moves = shift_dependents([(cached, {'start': rec.start, 'duration': rec.duration})])
+            except CycleError:
+                return jsonify({'success': False, 'error': 'Dependency cycle'}), 409
+            if moves:
+                dependents = {r.id: r for r in ItemDB.query.filter(ItemDB.id.in_([t['id'] for t, _ in moves]))}
+                # The shift may only move items this user could edit directly
+                if not is_admin:
+                    blocked = sorted(i for i, r in dependents.items()
+                                     if r.user_id and r.user_id != current_user.get_id())
+                    if blocked:
+                        db.session.rollback()
+                        return jsonify({'success': False, 'error': 'Dependents owned by another user',
+                                        'blocked': blocked}), 403
+                for t, new_start in moves:
+                    dep_rec = dependents.get(t['id'])
+                    if dep_rec is not None:
+                        dep_rec.start = new_start.isoformat()
+                        shifted.append({'id': dep_rec.id, 'start': dep_rec.start})
         db.session.commit()
         # Refresh in-memory cache
         load_tasks()
         # Find updated task dict
-        updated = next((t for t in tasks if t['id'] == rec.id), None)
-        return jsonify({'success': True, 'start': updated.get('start'), 'duration': updated.get('duration'), 'percent_complete': updated.get('percent_complete')})
+        updated = tasks.get(rec.id)
+        return jsonify({'success': True, 'start': updated.get('start'), 'duration': updated.get('duration'),
+                        'percent_complete': updated.get('percent_complete'), 'shifted': shifted})
 
 @app.route('/download_project')
+@login_required
 def download_project():
-    buf = io.BytesIO()
-    buf.write(json.dumps(tasks, indent=2).encode('utf-8'))
-    buf.seek(0)
-    return send_file(buf, as_attachment=True, download_name='project.json', mimetype='application/json')
+    """All tasks as JSON, recorded as a snapshot (``X-Snapshot-Id``).
+
+    The reply is ``{snapshot, base, version, items, deleted}``, the metadata a
+    ZIP bundle keeps in snapshot.json, so JSON exports chain into a restore
+    too. With ``?since=<snapshot>`` it holds only the tasks written after that
+    export; a full export has ``base`` null and nothing deleted.
+    """
+    try:
+        base = base_snapshot(request.args.get('since'))
+    except SnapshotError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    snap = _new_snapshot(base, 'json', complete=True)
+    rows, deleted = _snapshot_rows(base, snap.version)
+    payload = {'snapshot': snap.id, 'base': base.id if base else None, 'version': snap.version,
+               'items': [dict(t) for t in rows], 'deleted': deleted}
+    name = 'project.json' if base is None else f'project_since_{base.id}.json'
+    buf = io.BytesIO(json.dumps(payload, indent=2).encode('utf-8'))
+    resp = send_file(buf, as_attachment=True, download_name=name, mimetype='application/json')
+    resp.headers['X-Snapshot-Id'] = str(snap.id)
+    return resp
+
+@app.route('/admin/restore', methods=['POST'])
+@login_required
+@admin_required
+def restore_project():
+    """Restore uploaded ``bundles``: a full export followed by the ``?since`` diffs taken on it, in order.
+
+    Attachments are staged next to the uploads and only moved in once the
+    items have committed, so a failed restore leaves the files untouched.
+    """
+    uploads = request.files.getlist('bundles')
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.restore-', dir=UPLOAD_FOLDER)
+    try:
+        try:
+            bundles = [read_bundle(f.filename, f.stream) for f in uploads]
+            snapshot, files = restore_chain(bundles, staging)
+            db.session.commit()
+        except SnapshotError as e:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            print('[ERROR] restore failed:', e)
+            return jsonify({'success': False, 'error': 'Restore failed'}), 500
+        publish_files(files, UPLOAD_FOLDER)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    load_tasks()
+    return jsonify({'success': True, 'snapshot': snapshot, 'items': len(tasks)})
 
 @app.route('/pdf')
 def serve_pdf():
@@ -1,27 +1,16 @@
-import time, secrets, uuid
+import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_login import logout_user, login_required, current_user
 from db import UserDB, db
+from user_directory import directory, sign_in, revoke_sessions
+from login_limiter import limiter, limiter_key
+from password_hashing import hasher, rehash_if_needed, HashBusy
+from reset_tokens import (
+    RESET_EXPIRY_SECONDS, issue_reset_token, find_user_by_reset_token, clear_reset_token, maybe_sweep,
+)
 
 auth_bp = Blueprint('auth', __name__)
 
-FAILED_LOGINS = {}
-LOGIN_RATE_LIMIT_WINDOW = 600
-LOGIN_RATE_LIMIT_MAX = 5
-RESET_EXPIRY_SECONDS = 3600
-
-def _login_rate_limited(key):
-    now = time.time()
-    attempts = [t for t in FAILED_LOGINS.get(key, []) if now - t < LOGIN_RATE_LIMIT_WINDOW]
-    FAILED_LOGINS[key] = attempts
-    if len(attempts) >= LOGIN_RATE_LIMIT_MAX:
-        return True, int(LOGIN_RATE_LIMIT_WINDOW - (now - attempts[0]))
-    return False, 0
-
-def _record_failed_login(key):
-    FAILED_LOGINS.setdefault(key, []).append(time.time())
-
 def password_errors(pw: str):
     req = []
     if len(pw) < 8: req.append('8+ chars')
@@ -33,7 +22,6 @@ def password_errors(pw: str):
 
 @auth_bp.route('/register', methods=['GET','POST'])
 def register():
-    users = _load_users()
     if request.method == 'POST':
         username = request.form.get('username','').strip()
         password = request.form.get('password','')
@@ -44,83 +32,69 @@ def register():
         if perrs:
             flash('Password must contain: ' + ', '.join(perrs))
             return render_template('register.html')
-        if any(u['username'].lower() == username.lower() for u in users):
+        if directory.by_username(username):
             flash('Username already exists.')
             return render_template('register.html')
-        user_id = str(uuid.uuid4())
-        password_hash = generate_password_hash(password)
-        users.append({'id': user_id, 'username': username, 'password_hash': password_hash, 'is_admin': False})
-        _save_users(users)
+        db.session.add(UserDB(id=str(uuid.uuid4()), username=username, password_hash=hasher.hash(password)))
+        db.session.commit()
         flash('Registration successful. Please log in.')
         return redirect(url_for('auth.login'))
     return render_template('register.html')
 
 @auth_bp.route('/login', methods=['GET','POST'])
 def login():
-    users = _load_users()
     if request.method == 'POST':
         username = request.form.get('username','').strip()
         password = request.form.get('password','')
-        key = (request.remote_addr or 'unknown') + '|' + username.lower()
-        limited, wait = _login_rate_limited(key)
+        key = limiter_key(request.remote_addr, username)
+        limited, wait = limiter.attempt(key)
         if limited:
             flash(f'Too many login attempts. Try again in ~{wait} seconds.')
             return render_template('login.html')
-        user = next((u for u in users if u['username'].lower() == username.lower()), None)
-        if user and password and check_password_hash(user['password_hash'], password):
-            FAILED_LOGINS.pop(key, None)
-            login_user(_make_user(user))
+        user = directory.by_username(username)
+        try:
+            verified = user is not None and hasher.verify(user['password_hash'], password)
+        except HashBusy:
+            # The password was never checked, so this attempt must not count against the key
+            limiter.refund(key)
+            raise
+        if verified:
+            limiter.refund(key)
+            # The principal comes from the cache; only an upgrade needs the row
+            if hasher.needs_rehash(user['password_hash']):
+                rec = db.session.get(UserDB, user['id'])
+                if rehash_if_needed(rec, password):
+                    db.session.commit()
+                # Rehashes do not move the users generation, so refresh this worker's copy
+                user = directory.refresh(rec)
+            sign_in(user)
             return redirect(url_for('tasks_page'))
-        _record_failed_login(key)
         flash('Invalid username or password.')
     return render_template('login.html')
 
-def _make_user(u):
-    from flask_login import UserMixin
-    class _U(UserMixin):
-        pass
-    x = _U(); x.id = u['id']; x.username = u['username']; x.password_hash = u['password_hash']; x.is_admin = u.get('is_admin', False); return x
-
-def _load_users():
-    # Users are stored in DB via UserDB; provide simple list structure for legacy compatibility
-    return [ {'id': u.id, 'username': u.username, 'password_hash': u.password_hash, 'is_admin': u.is_admin } for u in UserDB.query.all() ]
-
-def _save_users(users_list):
-    existing = {u.id: u for u in UserDB.query.all()}
-    changed = False
-    for u in users_list:
-        if u['id'] not in existing:
-            db.session.add(UserDB(id=u['id'], username=u['username'], password_hash=u['password_hash'], is_admin=u.get('is_admin', False)))
-            changed = True
-    if changed:
-        db.session.commit()
-
-def _find_user_by_reset_token(token):
-    for u in UserDB.query.all():
-        if u.reset_token == token:
-            return u
-    return None
-
 @auth_bp.route('/forgot', methods=['GET','POST'])
 def forgot_password():
     if request.method == 'POST':
+        maybe_sweep()
         username = request.form.get('username','').strip()
         if username:
-            u = UserDB.query.filter(UserDB.username.ilike(username)).first()
+            found = directory.by_username(username)
+            u = db.session.get(UserDB, found['id']) if found else None
+            token = None
             if u:
-                u.reset_token = secrets.token_urlsafe(32)
-                u.reset_expires = time.time() + RESET_EXPIRY_SECONDS
+                token = issue_reset_token(u)
                 db.session.commit()
                 flash('If the account exists, a reset token was generated.')
             else:
                 flash('If the account exists, a reset token was generated.')
-            return render_template('forgot_password.html', token_display=getattr(u,'reset_token', None), expires_minutes=RESET_EXPIRY_SECONDS//60)
+            return render_template('forgot_password.html', token_display=token, expires_minutes=RESET_EXPIRY_SECONDS//60)
     return render_template('forgot_password.html', token_display=None)
 
 @auth_bp.route('/reset/<token>', methods=['GET','POST'])
 def reset_password(token):
-    u = _find_user_by_reset_token(token)
-    if not u or u.reset_expires < time.time():
+    maybe_sweep()
+    u = find_user_by_reset_token(token)
+    if not u:
         flash('Invalid or expired reset token.')
         return render_template('reset_password.html', invalid=True)
     if request.method == 'POST':
@@ -133,8 +107,9 @@ def reset_password(token):
         if errs:
             flash('Password must contain: ' + ', '.join(errs))
             return render_template('reset_password.html', token=token, invalid=False)
-        u.password_hash = generate_password_hash(pw1)
-        u.reset_token = None; u.reset_expires = None
+        u.password_hash = hasher.hash(pw1)
+        clear_reset_token(u)
+        revoke_sessions(u)
         db.session.commit()
         flash('Password reset successful. Please log in.')
         return redirect(url_for('auth.login'))
@@ -0,0 +1,46 @@
+"""Cross-process coherency for the module level caches in app.py.
+
+Each gunicorn worker keeps its own ``tasks``/``users``/``phases``/``settings``.
+Writes bump a per-namespace counter in ``data_generations`` (see
+``db._bump_generations``) inside the writing transaction, so every worker can
+detect foreign writes with one tiny query and reload only the namespaces that
+actually moved.
+"""
+from db import db, DataGenerationDB
+
+
+def current_generations():
+    """Return ``{namespace: generation}`` for every namespace written so far."""
+    return dict(db.session.query(DataGenerationDB.name, DataGenerationDB.generation).all())
+
+
+class CacheSync:
+    """Registry of per-process cache loaders keyed by namespace."""
+
+    def __init__(self):
+        self._loaders = {}
+        self._seen = {}
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+        self._seen.pop(name, None)
+
+    def invalidate(self, name=None):
+        """Force a reload of one namespace (or all) on the next ``sync()``."""
+        if name is None:
+            self._seen.clear()
+        else:
+            self._seen.pop(name, None)
+
+    def sync(self):
+        """Reload stale namespaces. Returns the list of namespaces reloaded."""
+        generations = current_generations()
+        reloaded = []
+        for name, loader in self._loaders.items():
+            gen = generations.get(name, 0)
+            if self._seen.get(name) == gen:
+                continue
+            loader()
+            self._seen[name] = gen
+            reloaded.append(name)
+        return reloaded
@@ -1,7 +1,9 @@
+import time
 from datetime import datetime, UTC
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash
-from sqlalchemy import inspect
+from sqlalchemy import inspect, event, select
+from sqlalchemy.orm import Session
 
 # SQLAlchemy instance
 db = SQLAlchemy()
@@ -14,6 +16,7 @@ class UserDB(db.Model):
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
     reset_token = db.Column(db.String(128), nullable=True, index=True)
     reset_expires = db.Column(db.Float, nullable=True)
+    auth_version = db.Column(db.Integer, nullable=False, default=0)  # bumped to revoke sessions
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
     # Primary relationship to items
     items = db.relationship('ItemDB', backref='owner', lazy=True)
@@ -23,6 +26,13 @@ class UserDB(db.Model):
     def tasks(self):
         return self.items
 
+# Case-insensitive username lookups (login, registration) filter on lower(username)
+db.Index('ix_users_username_lower', db.func.lower(UserDB.username))
+# Columns added to users after first release (name -> DDL type)
+USER_ADDED_COLUMNS = {
+    'auth_version': 'INTEGER NOT NULL DEFAULT 0',
+}
+
 class PhaseDB(db.Model):
     __tablename__ = 'phases'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -32,8 +42,16 @@ class PhaseDB(db.Model):
 # Primary Item model (renamed from legacy TaskDB)
 class ItemDB(db.Model):
     __tablename__ = 'items'
+    __table_args__ = (
+        db.Index('ix_items_user_phase', 'user_id', 'phase'),
+        db.Index('ix_items_phase_start', 'phase', 'start_date'),
+        db.Index('ix_items_start_date', 'start_date'),
+        db.Index('ix_items_status', 'status'),
+        db.Index('ix_items_name', 'name'),  # depends_on names resolve to ids through it
+    )
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(64), db.ForeignKey('users.id'))
+    # active_history: the change log needs the previous owner/shares as well (see _item_audience)
+    user_id = db.column_property(db.Column(db.String(64), db.ForeignKey('users.id')), active_history=True)
     name = db.Column(db.String(300), nullable=False)
     phase = db.Column(db.String(200))
     start = db.Column(db.String(20))
@@ -53,8 +71,101 @@ class ItemDB(db.Model):
     external_milestone = db.Column(db.Boolean, default=False)
     document_links = db.Column(db.Text)
     attachments = db.Column(db.Text)
-    shared_with = db.Column(db.Text)
+    shared_with = db.column_property(db.Column(db.Text), active_history=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    # Typed mirrors of start/duration/percent_complete, derived on every write
+    # (see item_sync.derive_item_columns) so SQL can range-filter and sort on them
+    start_date = db.Column(db.Date)
+    duration_days = db.Column(db.Integer)
+    percent = db.Column(db.Float)
+    finish_date = db.Column(db.Date)  # start_date + duration; == start_date for milestones
+
+# Columns added after the first release; created on existing databases by migrate_tasks_to_items
+ITEM_ADDED_COLUMNS = {
+    'pdf_file': 'VARCHAR(400)',
+    'start_date': 'DATE',
+    'duration_days': 'INTEGER',
+    'percent': 'FLOAT',
+    'finish_date': 'DATE',
+}
+
+# Dependency link types: finish-to-start, start-to-start, finish-to-finish, start-to-finish
+DEPENDENCY_TYPES = ('FS', 'SS', 'FF', 'SF')
+
+ITEM_STATUSES = ('Not Started', 'In Progress', 'Completed')  # the Kanban columns
+
+# Typed predecessor -> successor links between items. ItemDB.depends_on stays as
+# the editable list of predecessor names; the listeners in item_sync.py keep both in step.
+class DependencyDB(db.Model):
+    __tablename__ = 'dependencies'
+    __table_args__ = (db.UniqueConstraint('predecessor_id', 'successor_id', name='uq_dependencies_pair'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    predecessor_id = db.Column(db.Integer, db.ForeignKey('items.id', ondelete='CASCADE'), nullable=False, index=True)
+    successor_id = db.Column(db.Integer, db.ForeignKey('items.id', ondelete='CASCADE'), nullable=False, index=True)
+    type = db.Column(db.String(2), nullable=False, default='FS')
+    lag = db.Column(db.Integer, nullable=False, default=0)  # days
+
+# depends_on names that matched no item yet, one row per (successor, name), so
+# an item taking that name later finds who was waiting on it by index
+class PendingDependencyDB(db.Model):
+    __tablename__ = 'pending_dependencies'
+    __table_args__ = (db.UniqueConstraint('successor_id', 'name', name='uq_pending_dependencies_pair'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    successor_id = db.Column(db.Integer, db.ForeignKey('items.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(300), nullable=False, index=True)
+
+def share_user_ids(shared_with):
+    """User ids in a ``shared_with`` column value (comma separated)."""
+    return list(dict.fromkeys(u.strip() for u in (shared_with or '').split(',') if u.strip()))
+
+# One row per (item, user) in ItemDB.shared_with, kept in step by item_sync.py,
+# so "shared with me" is an index lookup on user_id rather than a text scan
+class ItemShareDB(db.Model):
+    __tablename__ = 'item_shares'
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.String(64), primary_key=True, index=True)
+
+# Append-only change log for items; the highest version acts as the items data version
+class ItemChangeDB(db.Model):
+    __tablename__ = 'item_changes'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    item_id = db.Column(db.Integer, nullable=False, index=True)
+    op = db.Column(db.String(10), nullable=False)  # insert | update | delete
+    fields = db.Column(db.Text)  # comma separated column names touched by an update
+    changed_at = db.Column(db.Float, default=time.time)
+    # Comma separated ids of the users who could see the item before or after the
+    # change (owner and shares); /events only sends a change to them and admins
+    audience = db.Column(db.Text)
+
+# Columns added to item_changes after first release (name -> DDL type)
+ITEM_CHANGE_ADDED_COLUMNS = {
+    'audience': 'TEXT',
+}
+
+# One row per project export; diffs (``?since=<id>``) are taken against these (see snapshots.py)
+class SnapshotDB(db.Model):
+    __tablename__ = 'snapshots'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.String(64))
+    base_id = db.Column(db.Integer, db.ForeignKey('snapshots.id'))  # None for a full export
+    version = db.Column(db.Integer, nullable=False)  # items change version the export reflects
+    kind = db.Column(db.String(10), nullable=False)  # json | zip
+    attachments = db.Column(db.Text)  # JSON {name: [sha256, size, mtime_ns]}; zip exports only
+    complete = db.Column(db.Boolean, default=False, nullable=False)  # False until a zip finished streaming
+    created_at = db.Column(db.Float, default=time.time)
+
+# Failed-login token buckets shared by every worker (see login_limiter.py)
+class LoginAttemptDB(db.Model):
+    __tablename__ = 'login_attempts'
+    key = db.Column(db.String(255), primary_key=True)  # remote address|lowercased username
+    tokens = db.Column(db.Float, nullable=False)  # attempts left, refilled continuously
+    updated = db.Column(db.Float, nullable=False, index=True)
+
+# Per-namespace write counters polled by every worker (see cache_sync.py)
+class DataGenerationDB(db.Model):
+    __tablename__ = 'data_generations'
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
 
 # Legacy model for migration reading only (do not use after migration)
 class TaskDB(db.Model):
@@ -119,6 +230,83 @@ class AssetDB(db.Model):
     size_bytes = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
 
+def item_audience(user_id, shared_with):
+    """``item_changes.audience`` value for an item owned by ``user_id`` and shared per ``shared_with``."""
+    return ','.join(dict.fromkeys(u for u in [user_id, *share_user_ids(shared_with)] if u))
+
+def _item_audience(obj):
+    # Owner and shares before and after this flush, so unsharing still reaches the old audience
+    state = inspect(obj)
+    users = [obj.user_id, *state.attrs.user_id.history.deleted]
+    for shared_with in [obj.shared_with, *state.attrs.shared_with.history.deleted]:
+        users.extend(share_user_ids(shared_with))
+    return ','.join(dict.fromkeys(u for u in users if u))
+
+# Record every ItemDB insert/update/delete in item_changes as part of the same flush,
+# so any write path (routes, scripts, tests) moves the items version.
+# Typed columns and dependency edges are kept by the listeners in item_sync.py.
+@event.listens_for(Session, 'after_flush')
+def _log_item_changes(session, flush_context):
+    rows = []
+    now = time.time()
+    for obj in session.new:
+        if isinstance(obj, ItemDB):
+            rows.append({'item_id': obj.id, 'op': 'insert', 'fields': None, 'changed_at': now,
+                         'audience': _item_audience(obj)})
+    for obj in session.dirty:
+        if isinstance(obj, ItemDB) and session.is_modified(obj, include_collections=False):
+            state = inspect(obj)
+            changed = [a.key for a in state.attrs if a.history.has_changes()]
+            rows.append({'item_id': obj.id, 'op': 'update', 'fields': ','.join(changed), 'changed_at': now,
+                         'audience': _item_audience(obj)})
+    for obj in session.deleted:
+        if isinstance(obj, ItemDB):
+            rows.append({'item_id': obj.id, 'op': 'delete', 'fields': None, 'changed_at': now,
+                         'audience': _item_audience(obj)})
+    # Editing a link (type, lag) changes its successor's schedule
+    successors = {obj.successor_id for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+                  if isinstance(obj, DependencyDB)}
+    if successors:
+        items = ItemDB.__table__
+        audiences = {i: item_audience(u, sw) for i, u, sw in session.connection().execute(
+            select(items.c.id, items.c.user_id, items.c.shared_with).where(items.c.id.in_(successors)))}
+        rows.extend({'item_id': i, 'op': 'update', 'fields': 'dependencies', 'changed_at': now,
+                     'audience': audiences.get(i)} for i in sorted(successors))
+    if rows:
+        session.connection().execute(ItemChangeDB.__table__.insert(), rows)
+
+# Bump the data generation of every cached namespace touched by a flush
+GENERATION_NAMESPACES = {UserDB: 'users', PhaseDB: 'phases', SettingDB: 'settings', ItemDB: 'items'}
+# The only users columns the cached principals depend on (a password change
+# also bumps auth_version), so reset tokens and rehashes keep the caches warm
+USER_CACHED_FIELDS = ('username', 'is_admin', 'auth_version')
+
+def _moves_generation(session, obj):
+    if obj not in session.dirty:
+        return True
+    if type(obj) is UserDB:
+        state = inspect(obj)
+        return any(state.attrs[f].history.has_changes() for f in USER_CACHED_FIELDS)
+    return session.is_modified(obj, include_collections=False)
+
+@event.listens_for(Session, 'after_flush')
+def _bump_generations(session, flush_context):
+    touched = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = GENERATION_NAMESPACES.get(type(obj))
+        if name and _moves_generation(session, obj):
+            touched.add(name)
+    if touched:
+        bump_generations(session.connection(), touched)
+
+def bump_generations(conn, names):
+    """Move the data generation of each namespace in ``names`` (inside the caller's transaction)."""
+    table = DataGenerationDB.__table__
+    for name in sorted(names):
+        res = conn.execute(table.update().where(table.c.name == name).values(generation=table.c.generation + 1))
+        if not res.rowcount:
+            conn.execute(table.insert().values(name=name, generation=1))
+
 # Utility seed for first admin user if none exists
 
 def ensure_admin_user(db_session):
@@ -127,21 +315,60 @@ def ensure_admin_user(db_session):
         db_session.add(u)
         db_session.commit()
 
+def ensure_data_generations(db_session):
+    # Pre-create counter rows so concurrent first writes only ever UPDATE them
+    existing = {g.name for g in DataGenerationDB.query.all()}
+    for name in GENERATION_NAMESPACES.values():
+        if name not in existing:
+            db_session.add(DataGenerationDB(name=name, generation=0))
+    db_session.commit()
+
+def _add_missing_columns(insp, table, columns):
+    """Add the ``{name: ddl}`` columns ``table`` lacks; returns the names that were missing."""
+    cols = [c['name'] for c in insp.get_columns(table)]
+    missing = [c for c in columns if c not in cols]
+    for col in missing:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.text(f'ALTER TABLE {table} ADD COLUMN {col} {columns[col]}'))
+        except Exception as e:
+            print(f'[WARN] Unable to add {col} column (may already exist):', e)
+    return missing
+
+def migrate_item_change_columns(db_session):
+    """Add later item_changes columns to an existing database (alembic does the same)."""
+    insp = inspect(db.engine)
+    if 'item_changes' in insp.get_table_names():
+        _add_missing_columns(insp, 'item_changes', ITEM_CHANGE_ADDED_COLUMNS)
+
+def migrate_user_columns(db_session):
+    """Add later users columns and indexes to an existing database (alembic does the same)."""
+    insp = inspect(db.engine)
+    if 'users' not in insp.get_table_names():
+        return
+    _add_missing_columns(insp, 'users', USER_ADDED_COLUMNS)
+    # SQLite does not reflect expression indexes, so checkfirst cannot be used here
+    for index in UserDB.__table__.indexes:
+        try:
+            index.create(db.engine)
+        except Exception as e:
+            if 'already exists' not in str(e):
+                print(f'[WARN] Unable to create index {index.name}:', e)
+
 def migrate_tasks_to_items(db_session):
     insp = inspect(db.engine)
     tables = insp.get_table_names()
     if 'tasks' in tables and 'items' not in tables:
         # create items table
         ItemDB.__table__.create(db.engine)
-    # Ensure pdf_file column exists (schema evolution) for existing deployments
+    # Ensure later columns and indexes exist (schema evolution) for existing deployments
     if 'items' in tables:
-        cols = [c['name'] for c in insp.get_columns('items')]
-        if 'pdf_file' not in cols:
-            try:
-                with db.engine.connect() as conn:
-                    conn.execute(db.text('ALTER TABLE items ADD COLUMN pdf_file VARCHAR(400)'))
-            except Exception as e:
-                print('[WARN] Unable to add pdf_file column (may already exist):', e)
+        missing = _add_missing_columns(insp, 'items', ITEM_ADDED_COLUMNS)
+        for index in ItemDB.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+        if 'start_date' in missing:
+            from item_sync import backfill_item_columns  # item_sync imports this module
+            backfill_item_columns(db_session)
     if 'tasks' in tables and 'items' in tables:
         # copy rows if items empty
         if db_session.query(ItemDB).count() == 0:
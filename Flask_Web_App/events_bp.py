@@ -0,0 +1,234 @@
+"""Server-Sent Events feed of item changes (``/events``).
+
+Every write to ``items`` and their dependency links is already logged to
+``item_changes`` by db.py, whichever worker process made it. One
+``ChangeBroker`` per process tails that log on a background thread and fans
+new rows out to the connected clients, so any number of open boards costs one
+indexed query per poll interval instead of a refetch each.
+
+Events only carry ``{id, op, fields, version}``; clients pull the row content
+through the endpoints they already read (``/gantt_data?since=``,
+``/tasks_json``). A stream only gets the changes of items its user owns or has
+been shared, before or after the change (``item_changes.audience``); admins
+get everything. That filter only narrows the notifications: ``/gantt_data``
+and ``/tasks_json`` are not user scoped and return every row, as the board
+pages always have. ``/api/items`` is the scoped read.
+
+An open stream holds a request thread for its whole life, so streams end
+after STREAM_MAX_AGE (the browser reconnects with ``Last-Event-ID``) and each
+process serves at most MAX_STREAMS at once, answering 503 past that. Run
+threaded or async workers (gunicorn ``-k gthread --threads N`` or gevent)
+with more threads than MAX_STREAMS; under sync workers set
+``EVENTS_MAX_STREAMS=0`` so ``/events`` never occupies a worker.
+"""
+import json, os, queue, threading, time
+from flask import Blueprint, Response, current_app, request
+from flask_login import login_required, current_user
+from db import ItemChangeDB
+from item_cache import current_version, oldest_replayable
+
+events_bp = Blueprint('events', __name__)
+
+POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', '1.0'))
+HEARTBEAT = 15.0  # seconds between keepalive comments on an idle stream
+STREAM_MAX_AGE = float(os.environ.get('EVENTS_STREAM_MAX_AGE', '55'))  # then browsers reconnect with Last-Event-ID
+MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', '8'))  # open streams per process
+REPLAY_LIMIT = 500  # more missed changes than this and the client resyncs instead
+SUBSCRIBER_QUEUE = 256
+
+
+def change_events(since, limit=REPLAY_LIMIT):
+    """``(event, audience)`` for the logged item changes after version ``since``, oldest first."""
+    rows = (ItemChangeDB.query.filter(ItemChangeDB.version > since)
+            .order_by(ItemChangeDB.version.asc()).limit(limit).all())
+    return [({'id': r.item_id, 'op': r.op, 'fields': r.fields.split(',') if r.fields else [],
+              'version': r.version}, frozenset((r.audience or '').split(','))) for r in rows]
+
+
+def can_see(viewer, audience):
+    """Whether ``viewer`` (``(user_id, is_admin)``, None for everyone) may see a change for ``audience``."""
+    return viewer is None or viewer[1] or viewer[0] in audience
+
+
+def format_event(event):
+    return f"id: {event['version']}\nevent: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+RESET_EVENT = 'event: reset\ndata: {}\n\n'
+
+
+class ChangeBroker:
+    """Fans item_changes rows out to subscriber queues.
+
+    The polling thread only runs while someone is subscribed. A subscriber
+    whose queue fills up is dropped and handed ``None``, which its stream turns
+    into a ``reset`` event telling the client to reload from scratch.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL, queue_size=SUBSCRIBER_QUEUE):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.version = None  # last change version broadcast
+        self._app = None
+        self._subscribers = {}  # queue -> viewer
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, app, version, viewer=None):
+        """Queue of the changes ``viewer`` may see after ``version`` (the subscriber's current change version)."""
+        q = queue.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers[q] = viewer
+            self._app = app
+            # Rewind so nothing between the subscriber's version and the next
+            # poll is skipped; other subscribers drop the repeats by version.
+            if self.version is None or version < self.version:
+                self.version = version
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='change-broker', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def publish(self, events):
+        """Queue each ``(event, audience)`` for the subscribers allowed to see it."""
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for q, viewer in subscribers:
+            try:
+                for event, audience in events:
+                    if can_see(viewer, audience):
+                        q.put_nowait(event)
+            except queue.Full:
+                self._reset(q)
+
+    def _reset(self, q):
+        self.unsubscribe(q)
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        q.put_nowait(None)
+
+    def poll(self):
+        """Broadcast whatever was logged since the last poll."""
+        with self._app.app_context():
+            latest = current_version()
+            with self._lock:
+                start = self.version
+            if start is None or latest == start:
+                return
+            if latest < start:
+                # Change log was reset (tables recreated): everyone resyncs
+                with self._lock:
+                    self.version = latest
+                    subscribers = list(self._subscribers)
+                for q in subscribers:
+                    self._reset(q)
+                return
+            while start < latest:
+                events = change_events(start)
+                if not events:
+                    break
+                with self._lock:
+                    if self.version != start:
+                        break  # rewound by a new subscriber; the next poll resends
+                    self.version = start = events[-1][0]['version']
+                self.publish(events)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll()
+            except Exception as e:
+                print('[ERROR] change broker:', e)
+            time.sleep(self.poll_interval)
+
+
+broker = ChangeBroker()
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS) if MAX_STREAMS > 0 else None
+
+
+@events_bp.route('/events')
+@login_required
+def item_events():
+    """``text/event-stream`` of item changes.
+
+    Resumes after ``Last-Event-ID`` (or ``?since=<version>``); a client that
+    missed more than REPLAY_LIMIT changes, or changes already pruned from the
+    log, gets a ``reset`` event instead. 503 once this process already
+    serves MAX_STREAMS streams.
+    """
+    slots = _stream_slots
+    if slots is None or not slots.acquire(blocking=False):
+        resp = Response('Too many open event streams', status=503, mimetype='text/plain')
+        resp.headers['Retry-After'] = '30'
+        return resp
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since not in (None, '') else None
+    except ValueError:
+        since = None
+    viewer = (current_user.get_id(), bool(getattr(current_user, 'is_admin', False)))
+    q = None
+    try:
+        latest = current_version()
+        # Anything older than latest is replayed from the log right here
+        q = broker.subscribe(current_app._get_current_object(), latest, viewer)
+        pruned = since is not None and since < oldest_replayable()
+        if since is None or since > latest or pruned:
+            backlog, last = [], latest
+        else:
+            backlog = change_events(since)
+            last = backlog[-1][0]['version'] if backlog else since
+    except Exception:
+        if q is not None:
+            broker.unsubscribe(q)
+        slots.release()
+        raise
+    resync = pruned or len(backlog) >= REPLAY_LIMIT
+
+    def stream():
+        yield 'retry: 2000\n\n'
+        if resync:
+            yield RESET_EVENT
+            return
+        for event, audience in backlog:
+            if can_see(viewer, audience):
+                yield format_event(event)
+        newest = last
+        deadline = time.monotonic() + STREAM_MAX_AGE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = q.get(timeout=min(HEARTBEAT, remaining))
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                yield RESET_EVENT
+                return
+            if event['version'] <= newest:
+                continue  # already replayed from the backlog
+            newest = event['version']
+            yield format_event(event)
+
+    def close():
+        # Runs once the response is closed, even if the stream never started
+        broker.unsubscribe(q)
+        slots.release()
+
+    resp = Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resp.call_on_close(close)
+    return resp
@@ -0,0 +1,213 @@
+"""Versioned in-memory cache of items.
+
+Every ItemDB write appends a row to ``item_changes`` (see ``db._log_item_changes``),
+so the highest change version tells us whether the cached task dicts are stale.
+``ItemCache.refresh()`` costs a single ``MAX(version)`` query when nothing moved and
+only re-reads the changed rows when something did.
+
+Dependency links (``dependencies`` table) are cached alongside, keyed by item
+id in both directions; every link change is logged against its successor.
+So is each item's Gantt row (``gantt_projection``), built from the typed
+columns once per write instead of being re-parsed on every ``/gantt_data``.
+
+The change log is pruned (``prune_change_log``) down to the newest
+CHANGE_LOG_KEEP rows, or further back when a recent export snapshot still
+needs them. Readers asking for changes older than what is left
+(``oldest_replayable``) fall back to a full reload.
+"""
+import threading, time
+from db import db, ItemDB, ItemChangeDB, DependencyDB, SnapshotDB
+from task_store import TaskStore
+from task_record import TaskRecord
+
+# Beyond this many changed ids a full reload is cheaper than an IN (...) query
+FULL_RELOAD_THRESHOLD = 500
+CHANGE_LOG_KEEP = 10000  # newest change rows always kept (well above every replay limit)
+SNAPSHOT_MAX_AGE = 30 * 86400  # snapshots younger than this keep their diff base in the log
+PRUNE_INTERVAL = 600
+
+_prune_lock = threading.Lock()
+_last_prune = [0.0]
+
+
+def item_to_task(t):
+    """Build the task record used by templates and JSON routes from an ItemDB row."""
+    return TaskRecord.from_item(t)
+
+
+def gantt_projection(t):
+    """Interactive Gantt row for an ItemDB row (finish derived on write, see item_sync.derive_item_columns)."""
+    start = t.start or ''
+    return {
+        'id': t.id,
+        'name': t.name,
+        'phase': t.phase or 'No Phase',
+        'start': start,
+        'finish': t.finish_date.isoformat() if t.finish_date else (start or None),
+        'duration': t.duration_days or 0,
+        'percent_complete': t.percent or 0.0,
+        'status': t.status or 'Not Started',
+        'milestone': bool(t.milestone) or bool(t.external_milestone),
+        'external_task': bool(t.external_item),
+        'external_milestone': bool(t.external_milestone),
+        'depends_on': t.depends_on or '',
+        'parent': t.parent,
+        'responsible': t.responsible or '',
+        'notes': t.notes or '',
+        'resources': t.resources or '',
+    }
+
+
+def current_version():
+    """Latest items change version (0 when nothing was ever written)."""
+    return db.session.query(db.func.max(ItemChangeDB.version)).scalar() or 0
+
+
+def oldest_replayable():
+    """Lowest ``since`` version the change log can still answer; older ones were pruned."""
+    return (db.session.query(db.func.min(ItemChangeDB.version)).scalar() or 1) - 1
+
+
+def prune_change_log(keep=CHANGE_LOG_KEEP, snapshot_max_age=SNAPSHOT_MAX_AGE, now=None):
+    """Delete change rows nobody can need any more and commit; returns how many went.
+
+    The newest ``keep`` rows stay (so MAX(version) never goes backwards), and
+    so does everything after the oldest complete snapshot younger than
+    ``snapshot_max_age``, which ``?since=`` exports diff against.
+    """
+    now = now or time.time()
+    floor = current_version() - keep
+    oldest_base = (db.session.query(db.func.min(SnapshotDB.version))
+                   .filter(SnapshotDB.complete.is_(True), SnapshotDB.created_at >= now - snapshot_max_age).scalar())
+    if oldest_base is not None:
+        floor = min(floor, oldest_base)
+    if floor <= 0:
+        return 0
+    deleted = ItemChangeDB.query.filter(ItemChangeDB.version <= floor).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def maybe_prune_change_log(now=None):
+    """Run ``prune_change_log`` if this process has not done so for PRUNE_INTERVAL."""
+    now = now or time.time()
+    with _prune_lock:
+        if now - _last_prune[0] < PRUNE_INTERVAL:
+            return 0
+        _last_prune[0] = now
+    try:
+        return prune_change_log(now=now)
+    except Exception as e:
+        db.session.rollback()
+        print('[ERROR] change log prune:', e)
+        return 0
+
+
+def changed_since(version, latest):
+    """Ids of items written in ``(version, latest]``; None when a full reload is cheaper or required."""
+    if version is None or version > latest or version < oldest_replayable():
+        return None
+    ids = [row[0] for row in db.session.query(ItemChangeDB.item_id)
+           .filter(ItemChangeDB.version > version)
+           .filter(ItemChangeDB.version <= latest)
+           .distinct()]
+    return None if len(ids) > FULL_RELOAD_THRESHOLD else ids
+
+
+class ItemCache:
+    """Task records held in an indexed ``TaskStore`` exposed as ``tasks``.
+
+    ``tasks`` keeps its identity across refreshes so module level aliases
+    (``app.tasks``) always see the current data.
+    """
+
+    def __init__(self):
+        self.tasks = TaskStore()
+        self.version = None  # None until the first full load
+        self._preds = {}  # successor id -> [(predecessor id, type, lag), ...]
+        self._succs = {}  # predecessor id -> {successor id, ...}
+        self._gantt = {}  # item id -> gantt_projection row
+
+    @property
+    def max_id(self):
+        # Rows are id ordered with id-less legacy rows last
+        for t in reversed(self.tasks):
+            if isinstance(t.get('id'), int):
+                return t['id']
+        return 0
+
+    def get(self, item_id):
+        return self.tasks.get(item_id)
+
+    def predecessors(self, item_id):
+        """``(predecessor_id, type, lag)`` links into ``item_id``."""
+        return self._preds.get(item_id, [])
+
+    def successors(self, item_id):
+        """Ids of the items linked after ``item_id``."""
+        return sorted(self._succs.get(item_id, ()))
+
+    def gantt_row(self, item_id):
+        """Precomputed Gantt row for ``item_id`` (None for rows not loaded from the DB)."""
+        return self._gantt.get(item_id)
+
+    def invalidate(self):
+        self.version = None
+
+    def refresh(self):
+        """Bring the cache up to date. Returns True when anything was reloaded."""
+        latest = current_version()
+        if self.version is not None and latest == self.version:
+            return False
+        if self.version is None or latest < self.version:
+            # First load, or the change log was reset (e.g. tables recreated)
+            self._full_reload(latest)
+            return True
+        changed_ids = changed_since(self.version, latest)
+        if changed_ids is None:
+            self._full_reload(latest)
+            return True
+        fresh = {r.id: r for r in ItemDB.query.filter(ItemDB.id.in_(changed_ids)).all()} if changed_ids else {}
+        for item_id in changed_ids:
+            rec = fresh.get(item_id)
+            if rec is None:
+                self.tasks.remove(item_id)
+                self._gantt.pop(item_id, None)
+                self._drop_links(item_id)
+                for succ in self._succs.pop(item_id, ()):
+                    self._preds[succ] = [l for l in self._preds.get(succ, []) if l[0] != item_id]
+            else:
+                self.tasks.upsert(item_to_task(rec))
+                self._gantt[item_id] = gantt_projection(rec)
+        self._load_links([i for i in changed_ids if i in fresh])
+        self.version = latest
+        return True
+
+    def _full_reload(self, version):
+        rows = ItemDB.query.order_by(ItemDB.id.asc()).all()
+        self.tasks.replace_all([item_to_task(t) for t in rows])
+        self._gantt = {t.id: gantt_projection(t) for t in rows}
+        self._preds.clear()
+        self._succs.clear()
+        self._load_links()
+        self.version = version
+
+    def _drop_links(self, successor_id):
+        for pred, _, _ in self._preds.pop(successor_id, []):
+            succs = self._succs.get(pred)
+            if succs:
+                succs.discard(successor_id)
+
+    def _load_links(self, successor_ids=None):
+        """(Re)load the incoming links of ``successor_ids`` (all links when None)."""
+        query = db.session.query(DependencyDB.predecessor_id, DependencyDB.successor_id,
+                                 DependencyDB.type, DependencyDB.lag)
+        if successor_ids is not None:
+            if not successor_ids:
+                return
+            for item_id in successor_ids:
+                self._drop_links(item_id)
+            query = query.filter(DependencyDB.successor_id.in_(successor_ids))
+        for pred, succ, kind, lag in query.order_by(DependencyDB.id):
+            self._preds.setdefault(succ, []).append((pred, kind or 'FS', lag or 0))
+            self._succs.setdefault(pred, set()).add(succ)
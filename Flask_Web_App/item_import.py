@@ -0,0 +1,208 @@
+"""Streaming bulk import of items from CSV or XLSX uploads.
+
+Rows are read lazily (``csv.reader`` over the upload, openpyxl in read-only
+mode), validated one by one and inserted CHUNK_SIZE at a time with one
+multi-row INSERT ... RETURNING per chunk (SQLAlchemy's insertmanyvalues; SQLite
+3.35+), so the new ids come straight back instead of being guessed from the
+table. At most MAX_ROWS data rows are accepted. The flush listeners do not see
+bulk inserts, so ``item_sync.record_item_inserts`` does their bookkeeping
+(change log, dependency edges, generation bump) once for the whole import.
+
+Invalid rows are skipped and reported as ``(row number, message)``, numbered
+like the spreadsheet: the header is row 1.
+"""
+import csv, io, re
+from collections import namedtuple
+from datetime import date, datetime
+from sqlalchemy import insert
+from db import db, ItemDB, ITEM_STATUSES
+from item_sync import record_item_inserts
+from scheduling import parse_date, task_duration
+
+CHUNK_SIZE = 2000
+MAX_ROWS = 100000  # data rows per upload; larger files should be split
+MAX_REPORTED_ERRORS = 1000
+
+# Normalized header (lowercase, single spaces, see _normalize) -> ItemDB column
+COLUMN_ALIASES = {
+    'name': 'name', 'task': 'name', 'task name': 'name', 'item': 'name', 'item name': 'name', 'title': 'name',
+    'phase': 'phase',
+    'start': 'start', 'start date': 'start', 'install date': 'start',
+    'duration': 'duration', 'duration days': 'duration', 'days': 'duration',
+    'responsible': 'responsible', 'owner': 'responsible', 'assigned to': 'responsible', 'assignee': 'responsible',
+    'status': 'status',
+    'percent complete': 'percent_complete', 'percent': 'percent_complete', 'progress': 'percent_complete',
+    'milestone': 'milestone',
+    'parent': 'parent',
+    'depends on': 'depends_on', 'dependencies': 'depends_on', 'predecessors': 'depends_on',
+    'resources': 'resources',
+    'notes': 'notes', 'description': 'notes', 'comments': 'notes',
+    'pdf page': 'pdf_page',
+    'external': 'external_item', 'external item': 'external_item', 'external task': 'external_item',
+    'external milestone': 'external_milestone',
+}
+_FLAGS = ('external_item', 'external_milestone')
+_TRUE = {'1', 'y', 'yes', 'true', 'x'}
+_FALSE = {'', '0', 'n', 'no', 'false'}
+# Column length limits, checked here because SQLite does not enforce them
+_MAX_LENGTH = {c.name: c.type.length for c in ItemDB.__table__.columns if getattr(c.type, 'length', None)}
+
+ImportResult = namedtuple('ImportResult', 'inserted errors truncated')
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be imported (unknown format, no name column...)."""
+
+
+def _normalize(header):
+    return re.sub(r'[\s_()]+', ' ', str(header or '').replace('%', ' percent ')).strip().lower()
+
+
+def _text(value):
+    # XLSX cells arrive typed; CSV cells are already strings
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        for fmt in ('%m/%d/%Y', '%m/%d/%y', '%Y-%m-%d %H:%M:%S'):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                pass
+    return parsed
+
+
+def item_row(values, user_id):
+    """Validated ItemDB insert mapping for one row of ``{column: text}``; raises ValueError."""
+    if not values.get('name'):
+        raise ValueError('name is required')
+    row = {'user_id': user_id, 'status': 'Not Started', 'external_item': False, 'external_milestone': False}
+    for column, value in values.items():
+        if column in _FLAGS:
+            flag = value.lower()
+            if flag not in _TRUE and flag not in _FALSE:
+                raise ValueError(f'{column} must be yes/no')
+            row[column] = flag in _TRUE
+            continue
+        if not value:
+            continue
+        limit = _MAX_LENGTH.get(column)
+        if limit and len(value) > limit:
+            raise ValueError(f'{column} longer than {limit} characters')
+        row[column] = value
+    if row['status'] not in ITEM_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(ITEM_STATUSES)}")
+    start = row.get('start')
+    row['start_date'] = _date(start) if start else None
+    if start and row['start_date'] is None:
+        raise ValueError(f"start '{start}' is not a date")
+    if start:
+        row['start'] = row['start_date'].isoformat()
+    try:
+        row['duration_days'] = int(row['duration']) if 'duration' in row else None
+    except ValueError:
+        raise ValueError(f"duration '{row['duration']}' is not a whole number of days")
+    if row['duration_days'] is not None and row['duration_days'] < 0:
+        raise ValueError('duration cannot be negative')
+    try:
+        row['percent'] = float(row['percent_complete']) if 'percent_complete' in row else None
+    except ValueError:
+        raise ValueError(f"percent_complete '{row['percent_complete']}' is not a number")
+    if row['percent'] is not None and not 0 <= row['percent'] <= 100:
+        raise ValueError('percent_complete must be between 0 and 100')
+    if 'milestone' in row and row['milestone'].lower() in _FALSE:
+        del row['milestone']
+    row['finish_date'] = None
+    if row['start_date'] is not None:
+        row['finish_date'] = date.fromordinal(row['start_date'].toordinal() + task_duration(row))
+    return row
+
+
+def csv_rows(stream):
+    """Rows of an uploaded CSV (binary stream; UTF-8, optional BOM)."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def xlsx_rows(stream):
+    """Rows of the first sheet of an uploaded workbook, as cell values."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportFormatError('XLSX import needs openpyxl (see requirements.txt)')
+    try:
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f'Not a readable XLSX file: {e}')
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def rows_for_upload(filename, stream):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return csv_rows(stream)
+    if name.endswith(('.xlsx', '.xlsm')):
+        return xlsx_rows(stream)
+    raise ImportFormatError('Upload a .csv or .xlsx file')
+
+
+def import_items(rows, user_id, chunk_size=CHUNK_SIZE, max_rows=MAX_ROWS):
+    """Insert the items in ``rows`` (header first) for ``user_id``; the caller commits.
+
+    Raises ImportFormatError past ``max_rows`` data rows (the caller rolls back).
+    Returns ``ImportResult(inserted, errors, truncated)``; ``errors`` holds the
+    first MAX_REPORTED_ERRORS ``(row number, message)`` pairs and ``truncated``
+    says whether more were dropped.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError('The file is empty')
+    columns = [COLUMN_ALIASES.get(_normalize(h)) for h in header]
+    if 'name' not in columns:
+        raise ImportFormatError('No name column (expected one of: name, task, task name, item, title)')
+    used = [(i, c) for i, c in enumerate(columns) if c]
+    session = db.session
+    stmt = insert(ItemDB).returning(ItemDB.id, ItemDB.user_id, ItemDB.name, ItemDB.depends_on)
+    errors, error_count, pending, inserted = [], 0, [], []
+
+    def flush():
+        inserted.extend(session.execute(stmt, pending).all())
+        pending.clear()
+
+    for number, raw in enumerate(rows, start=2):
+        if number - 1 > max_rows:
+            raise ImportFormatError(f'More than {max_rows} rows; split the file')
+        if not any(_text(v) for v in raw):
+            continue  # blank line
+        values = {c: _text(raw[i]) if i < len(raw) else '' for i, c in used}
+        try:
+            pending.append(item_row(values, user_id))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((number, str(e)))
+            continue
+        if len(pending) >= chunk_size:
+            flush()
+    if pending:
+        flush()
+    inserted.sort(key=lambda r: r[0])
+    record_item_inserts(session.connection(), inserted)
+    return ImportResult(len(inserted), errors, error_count > len(errors))
@@ -0,0 +1,263 @@
+"""Flush listeners that keep derived item state in step with the editable fields.
+
+* Typed columns (``start_date``, ``duration_days``, ``percent``,
+  ``finish_date``) are derived from the string fields before each flush.
+* ``dependencies`` edges follow the ``depends_on`` names. A name that matches
+  no item yet is parked in ``pending_dependencies``; when an item takes that
+  name (insert or rename) the waiting successors are found by an indexed
+  lookup on it and linked.
+* ``item_shares`` holds one row per user id in ``shared_with``, which is what
+  the visibility filters join on.
+
+The listeners are registered on import; app.py imports this module, and any
+other entry point writing items must too. Bulk Core inserts bypass them and
+call ``record_item_inserts`` instead.
+"""
+import time
+from datetime import timedelta
+from sqlalchemy import inspect, event, select, or_
+from sqlalchemy.orm import Session
+from db import (
+    ItemDB, ItemShareDB, DependencyDB, PendingDependencyDB, ItemChangeDB, bump_generations, item_audience,
+    share_user_ids,
+)
+from scheduling import dependency_names, parse_date, task_duration
+
+# Source columns the typed mirrors are derived from
+ITEM_TYPED_SOURCES = ('start', 'duration', 'percent_complete', 'milestone', 'external_milestone')
+
+def derive_item_columns(item):
+    """Fill ``item``'s typed columns from its string fields."""
+    item.start_date = parse_date(item.start)
+    try:
+        item.duration_days = int(str(item.duration).strip()) if item.duration not in (None, '') else None
+    except ValueError:
+        item.duration_days = None
+    try:
+        item.percent = float(item.percent_complete) if item.percent_complete not in (None, '') else None
+    except (TypeError, ValueError):
+        item.percent = None
+    if item.start_date is None:
+        item.finish_date = None
+    else:
+        days = task_duration({'duration': item.duration, 'milestone': item.milestone,
+                              'external_milestone': item.external_milestone})
+        item.finish_date = item.start_date + timedelta(days=days)
+
+@event.listens_for(Session, 'before_flush')
+def _derive_item_columns(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, ItemDB):
+            derive_item_columns(obj)
+    for obj in session.dirty:
+        if isinstance(obj, ItemDB):
+            state = inspect(obj)
+            if any(state.attrs[f].history.has_changes() for f in ITEM_TYPED_SOURCES):
+                derive_item_columns(obj)
+
+def backfill_item_columns(db_session, batch=1000):
+    # Derive typed columns for rows written before they existed
+    last_id = 0
+    while True:
+        rows = (db_session.query(ItemDB).filter(ItemDB.id > last_id)
+                .order_by(ItemDB.id).limit(batch).all())
+        if not rows:
+            break
+        for item in rows:
+            derive_item_columns(item)
+        last_id = rows[-1].id
+        db_session.commit()
+
+_CHUNK = 500  # keep IN (...) lists under SQLite's bound parameter limit
+
+def _chunks(seq):
+    seq = list(seq)
+    for i in range(0, len(seq), _CHUNK):
+        yield seq[i:i + _CHUNK]
+
+# --- shares ----------------------------------------------------------------
+@event.listens_for(Session, 'after_flush')
+def _sync_item_shares(session, flush_context):
+    gone = [obj.id for obj in session.deleted if isinstance(obj, ItemDB)]
+    changed = [obj for obj in session.new if isinstance(obj, ItemDB)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, ItemDB) and inspect(obj).attrs.shared_with.history.has_changes()]
+    if gone or changed:
+        sync_item_shares(session.connection(), [(obj.id, obj.shared_with) for obj in changed], gone)
+
+def sync_item_shares(conn, rows, gone=()):
+    """Replace the share rows of each ``(item_id, shared_with)`` in ``rows`` and drop those of ``gone`` ids."""
+    shares = ItemShareDB.__table__
+    for chunk in _chunks([r[0] for r in rows] + list(gone)):
+        conn.execute(shares.delete().where(shares.c.item_id.in_(chunk)))
+    inserts = [{'item_id': item_id, 'user_id': uid} for item_id, shared_with in rows
+               for uid in share_user_ids(shared_with)]
+    if inserts:
+        conn.execute(shares.insert(), inserts)
+
+def migrate_item_shares(db_session):
+    # One-off backfill of item_shares from the shared_with column
+    rows = db_session.query(ItemDB.id, ItemDB.shared_with).filter(
+        ItemDB.shared_with.isnot(None), ItemDB.shared_with != '').all()
+    if rows:
+        sync_item_shares(db_session.connection(), [tuple(r) for r in rows])
+        db_session.commit()
+
+# --- dependency edges ----------------------------------------------------
+def sync_dependency_edges(conn, rows):
+    """Make the edges of each ``(item_id, user_id, depends_on)`` in ``rows`` match its names.
+
+    A name resolves to the owner's item of that name if there is one, else the
+    lowest id with that name; self links are skipped and unknown names are
+    parked in ``pending_dependencies``. Surviving edges keep their type and
+    lag. Returns the ids whose edges changed.
+    """
+    rows = [r for r in rows if r[0] is not None]
+    if not rows:
+        return set()
+    edges = DependencyDB.__table__
+    items = ItemDB.__table__
+    pending = PendingDependencyDB.__table__
+    wanted_names = {n for r in rows for n in dependency_names(r[2])}
+    by_name = {}
+    for chunk in _chunks(wanted_names):
+        for item_id, name, user_id in conn.execute(select(items.c.id, items.c.name, items.c.user_id)
+                                                   .where(items.c.name.in_(chunk)).order_by(items.c.id)):
+            by_name.setdefault(name, []).append((item_id, user_id))
+    existing = {}
+    for chunk in _chunks(r[0] for r in rows):
+        for pred_id, succ_id in conn.execute(select(edges.c.predecessor_id, edges.c.successor_id)
+                                             .where(edges.c.successor_id.in_(chunk))):
+            existing.setdefault(succ_id, set()).add(pred_id)
+    inserts, deletes, waiting = [], [], []
+    for item_id, user_id, depends_on in rows:
+        wanted = set()
+        for name in dict.fromkeys(dependency_names(depends_on)):
+            candidates = [c for c in by_name.get(name, ()) if c[0] != item_id]
+            if candidates:
+                own = next((c for c in candidates if c[1] == user_id), candidates[0])
+                wanted.add(own[0])
+            else:
+                waiting.append({'successor_id': item_id, 'name': name})
+        have = existing.get(item_id, set())
+        inserts.extend({'predecessor_id': p, 'successor_id': item_id, 'type': 'FS', 'lag': 0} for p in wanted - have)
+        deletes.extend((p, item_id) for p in have - wanted)
+    for pred_id, succ_id in deletes:
+        conn.execute(edges.delete().where(edges.c.predecessor_id == pred_id).where(edges.c.successor_id == succ_id))
+    if inserts:
+        conn.execute(edges.insert(), inserts)
+    for chunk in _chunks(r[0] for r in rows):
+        conn.execute(pending.delete().where(pending.c.successor_id.in_(chunk)))
+    if waiting:
+        conn.execute(pending.insert(), waiting)
+    return {r['successor_id'] for r in inserts} | {succ for _, succ in deletes}
+
+@event.listens_for(Session, 'before_flush')
+def _follow_renamed_predecessors(session, flush_context, instances):
+    # Rewrite successors' depends_on names when a predecessor is renamed or deleted,
+    # so the name list never drifts from the id based edges
+    renamed, removed = {}, {}
+    for obj in session.dirty:
+        if isinstance(obj, ItemDB) and obj.id is not None and inspect(obj).attrs.name.history.has_changes():
+            renamed[obj.id] = obj.name
+    for obj in session.deleted:
+        if isinstance(obj, ItemDB) and obj.id is not None:
+            removed[obj.id] = obj.name
+    if not renamed and not removed:
+        return
+    with session.no_autoflush:
+        if renamed:
+            # Old names come from the table: an expired attribute has no history to compare
+            stored = dict(session.execute(select(ItemDB.id, ItemDB.name).where(ItemDB.id.in_(renamed))).all())
+            renamed = {i: (stored[i], new) for i, new in renamed.items() if i in stored and stored[i] != new}
+        links = session.query(DependencyDB.predecessor_id, DependencyDB.successor_id).filter(
+            DependencyDB.predecessor_id.in_(list(renamed) + list(removed))).all()
+        if not links:
+            return
+        successors = {i.id: i for i in session.query(ItemDB).filter(ItemDB.id.in_({s for _, s in links}))}
+    for pred_id, succ_id in links:
+        succ = successors.get(succ_id)
+        if succ is None or succ in session.deleted:
+            continue
+        names = dependency_names(succ.depends_on)
+        if pred_id in renamed:
+            old, new = renamed[pred_id]
+            names = [new if n == old else n for n in names]
+        else:
+            names = [n for n in names if n != removed[pred_id]]
+        succ.depends_on = ','.join(names)
+
+@event.listens_for(Session, 'after_flush')
+def _sync_item_dependencies(session, flush_context):
+    gone = [obj.id for obj in session.deleted if isinstance(obj, ItemDB)]
+    new = [obj for obj in session.new if isinstance(obj, ItemDB)]
+    dirty = [obj for obj in session.dirty if isinstance(obj, ItemDB)]
+    changed = new + [obj for obj in dirty if inspect(obj).attrs.depends_on.history.has_changes()]
+    # Items that now carry a name others were already waiting on
+    named = {obj.name for obj in new} | {obj.name for obj in dirty if inspect(obj).attrs.name.history.has_changes()}
+    if not gone and not changed and not named:
+        return
+    conn = session.connection()
+    edges = DependencyDB.__table__
+    pending = PendingDependencyDB.__table__
+    for chunk in _chunks(gone):
+        conn.execute(edges.delete().where(or_(edges.c.predecessor_id.in_(chunk), edges.c.successor_id.in_(chunk))))
+        conn.execute(pending.delete().where(pending.c.successor_id.in_(chunk)))
+    sync_dependency_edges(conn, [(obj.id, obj.user_id, obj.depends_on) for obj in changed])
+    _adopt_waiting(conn, named, {obj.id for obj in changed} | set(gone))
+
+def _adopt_waiting(conn, named, handled):
+    # Link items (other than ``handled``) parked in pending_dependencies on one
+    # of the ``named`` names
+    named = set(named)
+    named.discard(None)
+    if not named:
+        return
+    items = ItemDB.__table__
+    pending = PendingDependencyDB.__table__
+    ids = set()
+    for chunk in _chunks(named):
+        ids.update(conn.execute(select(pending.c.successor_id).where(pending.c.name.in_(chunk))).scalars())
+    waiting, audiences = [], {}
+    for chunk in _chunks(ids - set(handled)):
+        for item_id, user_id, depends_on, shared_with in conn.execute(
+                select(items.c.id, items.c.user_id, items.c.depends_on, items.c.shared_with)
+                .where(items.c.id.in_(chunk))):
+            waiting.append((item_id, user_id, depends_on))
+            audiences[item_id] = item_audience(user_id, shared_with)
+    adopted = sync_dependency_edges(conn, waiting)
+    if adopted:
+        # Their links changed without a row write; log it so item caches pick it up
+        now = time.time()
+        conn.execute(ItemChangeDB.__table__.insert(),
+                     [{'item_id': i, 'op': 'update', 'fields': 'dependencies', 'changed_at': now,
+                       'audience': audiences.get(i)} for i in sorted(adopted)])
+
+def record_item_inserts(conn, rows):
+    """Do the flush listeners' bookkeeping for items inserted in bulk (Core/executemany).
+
+    ``rows`` are ``(id, user_id, name, depends_on)`` of the new (unshared) items:
+    they are logged to item_changes, their dependency edges are created (including items
+    that were already waiting on their names) and the items generation moves.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    now = time.time()
+    conn.execute(ItemChangeDB.__table__.insert(),
+                 [{'item_id': r[0], 'op': 'insert', 'fields': None, 'changed_at': now,
+                   'audience': item_audience(r[1], None)} for r in rows])
+    sync_dependency_edges(conn, [(r[0], r[1], r[3]) for r in rows if r[3]])
+    _adopt_waiting(conn, {r[2] for r in rows}, {r[0] for r in rows})
+    bump_generations(conn, ['items'])
+
+def migrate_dependency_edges(db_session):
+    # One-off backfill of the dependencies (and pending_dependencies) tables from
+    # the legacy depends_on names
+    if db_session.query(DependencyDB.id).first() is not None:
+        return
+    rows = db_session.query(ItemDB.id, ItemDB.user_id, ItemDB.depends_on).filter(
+        ItemDB.depends_on.isnot(None), ItemDB.depends_on != '').all()
+    if rows:
+        sync_dependency_edges(db_session.connection(), [tuple(r) for r in rows])
+        db_session.commit()
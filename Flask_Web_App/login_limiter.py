@@ -0,0 +1,178 @@
+"""Failed-login rate limiting.
+
+Each key (remote address + lowercased username) owns a token bucket holding
+LOGIN_RATE_LIMIT_MAX attempts that refills over LOGIN_RATE_LIMIT_WINDOW, so
+every attempt is O(1) and a key's state is two numbers. A bucket left alone
+for a whole window is full again and indistinguishable from no row at all,
+which is what lets pruning stay cheap.
+
+A login spends its token with ``attempt`` *before* the password is checked
+and gets it back with ``refund`` once it succeeds, or when the password could
+not be checked at all (hashing pool busy). Checking first and
+recording the failure afterwards let a burst of parallel guesses all pass
+the check before any of them was counted.
+
+Two backends share that arithmetic:
+
+* ``DatabaseLimiter`` (default) keeps buckets in ``login_attempts`` in the app
+  database, so every worker process enforces the same limit. An attempt is
+  one UPSERT returning the new level. Idle buckets are pruned and the table
+  is capped at ``max_keys`` rows.
+* ``MemoryLimiter`` keeps them in a bounded per-process LRU (tests, single
+  process setups).
+
+Set ``LOGIN_LIMITER=memory`` to pick the latter. Another shared store only
+needs the same four methods: ``check``, ``attempt``, ``refund`` and ``reset``.
+"""
+import os, threading, time
+from collections import OrderedDict
+from sqlalchemy import case
+from db import db, LoginAttemptDB
+
+LOGIN_RATE_LIMIT_WINDOW = 600  # seconds for an empty bucket to refill
+LOGIN_RATE_LIMIT_MAX = 5
+MAX_KEYS = 10000
+PRUNE_EVERY = 256  # attempts between prunes of the shared table
+
+
+def limiter_key(remote_addr, username):
+    return ((remote_addr or 'unknown') + '|' + username.lower())[:255]
+
+
+class _Buckets:
+    def __init__(self, capacity=LOGIN_RATE_LIMIT_MAX, window=LOGIN_RATE_LIMIT_WINDOW, max_keys=MAX_KEYS):
+        self.capacity = capacity
+        self.window = window
+        self.rate = capacity / window  # attempts regained per second
+        self.max_keys = max_keys
+
+    def _level(self, tokens, updated, now):
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _verdict(self, level):
+        # (limited, seconds until the next attempt is allowed)
+        if level >= 1:
+            return False, 0
+        return True, int((1 - level) / self.rate) + 1
+
+
+class MemoryLimiter(_Buckets):
+    """Per-process buckets in an LRU of at most ``max_keys`` entries."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def check(self, key, now=None):
+        now = now or time.time()
+        with self._lock:
+            state = self._buckets.get(key)
+        return self._verdict(self._level(*state, now) if state else self.capacity)
+
+    def _spend(self, key, now, amount):
+        with self._lock:
+            state = self._buckets.pop(key, None)
+            level = self._level(*state, now) if state else self.capacity
+            if amount > 0 and level < amount:
+                amount = 0  # refused: nothing is taken
+            self._buckets[key] = (min(self.capacity, level - amount), now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return level
+
+    def attempt(self, key, now=None):
+        """Take one attempt from ``key``; ``(limited, wait)`` as ``check``, nothing taken when limited."""
+        return self._verdict(self._spend(key, now or time.time(), 1))
+
+    def refund(self, key, now=None):
+        """Hand back the attempt taken for a login that succeeded or was never checked."""
+        self._spend(key, now or time.time(), -1)
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class DatabaseLimiter(_Buckets):
+    """Buckets in the ``login_attempts`` table, shared by every worker."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._attempts = 0
+        self._lock = threading.Lock()
+
+    def check(self, key, now=None):
+        now = now or time.time()
+        row = db.session.get(LoginAttemptDB, key)
+        return self._verdict(self._level(row.tokens, row.updated, now) if row else self.capacity)
+
+    def _spend(self, key, now, amount):
+        """Refill ``key``, take ``amount`` (negative to give back) and return the new level; commits."""
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            # Refill and spend in one statement so concurrent workers each see
+            # the level their own attempt left behind
+            level = LoginAttemptDB.tokens + (now - LoginAttemptDB.updated) * self.rate
+            level = case((level > self.capacity, self.capacity), else_=level) - amount
+            level = case((level > self.capacity, self.capacity), else_=level)
+            stmt = insert(LoginAttemptDB).values(key=key, tokens=min(self.capacity, self.capacity - amount), updated=now)
+            stmt = stmt.on_conflict_do_update(index_elements=[LoginAttemptDB.key], set_={'tokens': level, 'updated': now})
+            left = db.session.execute(stmt.returning(LoginAttemptDB.tokens)).scalar_one()
+        else:
+            row = db.session.query(LoginAttemptDB).filter_by(key=key).with_for_update().first()
+            if row is None:
+                row = LoginAttemptDB(key=key, tokens=self.capacity, updated=now)
+                db.session.add(row)
+            left = min(self.capacity, self._level(row.tokens, row.updated, now) - amount)
+            row.tokens, row.updated = left, now
+        db.session.commit()
+        return left
+
+    def attempt(self, key, now=None):
+        """Take one attempt from ``key``; ``(limited, wait)`` as ``check``, nothing taken when limited."""
+        now = now or time.time()
+        left = self._spend(key, now, 1)
+        if left < 0:
+            # Refused: give it straight back so hammering does not extend the lockout
+            self._spend(key, now, -1)
+            return self._verdict(left + 1)
+        with self._lock:
+            self._attempts += 1
+            due = self._attempts % PRUNE_EVERY == 0
+        if due:
+            self.prune(now)
+        return False, 0
+
+    def refund(self, key, now=None):
+        """Hand back the attempt taken for a login that succeeded or was never checked."""
+        self._spend(key, now or time.time(), -1)
+
+    def reset(self, key):
+        LoginAttemptDB.query.filter_by(key=key).delete()
+        db.session.commit()
+
+    def prune(self, now=None):
+        """Drop refilled buckets, then the least recently used beyond ``max_keys``."""
+        now = now or time.time()
+        LoginAttemptDB.query.filter(LoginAttemptDB.updated < now - self.window).delete()
+        cutoff = (db.session.query(LoginAttemptDB.updated).order_by(LoginAttemptDB.updated.desc())
+                  .offset(self.max_keys).limit(1).scalar())
+        if cutoff is not None:
+            LoginAttemptDB.query.filter(LoginAttemptDB.updated <= cutoff).delete()
+        db.session.commit()
+
+
+def make_limiter(backend=None):
+    backend = backend or os.environ.get('LOGIN_LIMITER', 'database')
+    return MemoryLimiter() if backend == 'memory' else DatabaseLimiter()
+
+
+limiter = make_limiter()
@@ -0,0 +1,128 @@
+"""Password hashing on a bounded thread pool.
+
+scrypt is deliberately slow, and a burst of logins used to hash inside every
+web thread at once, starving the other pages. ``PasswordHasher`` runs hashes
+on at most ``workers`` threads (hashlib's scrypt and pbkdf2 release the GIL)
+with at most ``queue_size`` more waiting. Past that ``HashBusy`` is raised
+straight away, so auth load cannot take over the workers.
+
+The calling request thread still waits for its own hash, so this only keeps
+other pages responsive under a threaded worker (``gunicorn --threads N``,
+gthread, waitress) or an async one. A sync worker serves one request at a
+time and cannot queue more than one hash per process anyway. Keep the queue
+short, at most the server's thread count minus the hashing workers: every
+queued login holds a web thread while it waits, which is what the limit is
+there to prevent. ``PASSWORD_HASH_QUEUE`` defaults to ``DEFAULT_QUEUE``.
+
+The cost is the werkzeug method string, e.g. ``scrypt:32768:8:1`` (the
+werkzeug default) or ``pbkdf2:sha256:600000``, set with
+``PASSWORD_HASH_METHOD``. Hashes made with any other method still verify,
+and ``needs_rehash`` tells the login routes to upgrade them.
+
+``workers=0`` hashes inline in the calling thread (tests, single process dev).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+DEFAULT_QUEUE = 2  # logins allowed to wait for a hashing thread
+
+
+class HashBusy(Exception):
+    """Every hashing thread is busy and the wait queue is full."""
+
+
+def hash_method(password_hash):
+    """The method part (before the salt) of a werkzeug password hash."""
+    return (password_hash or '').split('$', 1)[0]
+
+
+def full_method(method):
+    """``method`` with werkzeug's defaults filled in, as it is written into a hash.
+
+    ``'scrypt'`` becomes ``'scrypt:32768:8:1'`` and ``'pbkdf2'``
+    ``'pbkdf2:sha256:<werkzeug default iterations>'``; anything unparseable is
+    returned unchanged.
+    """
+    name, *args = (method or '').split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+            return f'scrypt:{n}:{r}:{p}'
+        if name == 'pbkdf2' and len(args) <= 2:
+            hash_name = args[0] if args else 'sha256'
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f'pbkdf2:{hash_name}:{iterations}'
+    except ValueError:
+        pass
+    return method
+
+
+class PasswordHasher:
+
+    def __init__(self, method=DEFAULT_METHOD, workers=2, queue_size=DEFAULT_QUEUE):
+        self.method = method
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(method=os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+                   workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+                   queue_size=int(os.environ.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE)))
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashBusy('password hashing queue is full')
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pwhash')
+                executor = self._executor
+            return executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """A new hash of ``password`` with the configured method; may raise HashBusy."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Whether ``password`` matches ``password_hash``; may raise HashBusy."""
+        if not password_hash or not password:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Compare full methods: a configured 'scrypt' writes 'scrypt:32768:8:1' into the hash
+        return full_method(hash_method(password_hash)) != full_method(self.method)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+hasher = PasswordHasher.from_env()
+
+
+def rehash_if_needed(user, password):
+    """After a successful login, move ``user`` (a UserDB row) to the configured method.
+
+    The caller commits. Skipped when the pool is busy; the next login retries.
+    """
+    if not hasher.needs_rehash(user.password_hash):
+        return False
+    try:
+        user.password_hash = hasher.hash(password)
+    except HashBusy:
+        return False
+    return True
@@ -0,0 +1,137 @@
+"""Content-addressed cache for rendered Gantt images and exports.
+
+Keys are SHA-256 digests of everything that affects the output (the task
+fields drawn plus the render parameters), so an unchanged chart is served from
+memory or disk and the key doubles as the HTTP ETag.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Task fields that influence a Gantt rendering; edits to anything else
+# (notes, attachments, ...) keep the cached image valid.
+GANTT_FIELDS = (
+    'id', 'name', 'phase', 'start', 'duration', 'percent_complete', 'milestone',
+    'parent', 'depends_on', 'external_item', 'external_milestone',
+)
+
+
+def render_key(*parts):
+    """Stable digest for any JSON-serialisable parts."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(json.dumps(p, sort_keys=True, default=str).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def tasks_fingerprint(tasks):
+    """Digest of the Gantt relevant fields of every task."""
+    h = hashlib.sha256()
+    for t in tasks:
+        h.update(json.dumps([t.get(f) for f in GANTT_FIELDS], default=str).encode('utf-8'))
+    return h.hexdigest()
+
+
+class RenderCache:
+    """Bounded in-memory LRU that spills evicted entries to ``directory``."""
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024, directory=None, max_disk_entries=256):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._mem = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        return data
+
+    def get_or_render(self, key, render):
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, render())
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+
+    def _remember(self, key, data):
+        spill = []
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return
+            self._mem[key] = data
+            self._bytes += len(data)
+            while self._mem and (len(self._mem) > self.max_entries or self._bytes > self.max_bytes):
+                old_key, old_data = self._mem.popitem(last=False)
+                self._bytes -= len(old_data)
+                spill.append((old_key, old_data))
+        for old_key, old_data in spill:
+            self._write_disk(old_key, old_data)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.bin')
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))  # keep recently used files from being pruned
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            if not os.path.exists(path):
+                tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self._prune_disk()
+        except OSError as e:
+            print('[WARN] render cache spill failed:', e)
+
+    def _prune_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                p = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(p), p))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort()
+        for _, p in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
@@ -0,0 +1,189 @@
+"""Bounded worker pool for matplotlib renders.
+
+Gantt images are drawn in separate processes so a slow chart never blocks a
+web worker's GIL and a runaway render can be killed. Admission is bounded:
+at most ``workers`` renders run plus ``queue_size`` wait; beyond that
+``run`` raises ``RenderBusy`` straight away instead of queueing without limit.
+The ``timeout`` clock starts when a worker picks the render up (it
+signals the parent), so time spent queued behind other renders never counts
+against it. Queue wait has its own bound, ``queue_timeout``: a render not
+started by then is withdrawn and ``run`` raises ``RenderBusy``; the pool is
+healthy, only busy, and is left alone. A render that runs longer than
+``timeout`` raises ``RenderTimeout``. Its pool is retired: new renders go to
+a fresh pool, the other renders already on the old one are given up to
+``timeout`` to finish, and then the old workers (the hung one among them)
+are killed. If a worker dies mid-render the pool is broken,
+``run`` raises ``BrokenProcessPool`` and the next render starts a fresh pool;
+callers should treat it like ``RenderBusy`` and ask the client to retry.
+
+``workers=0`` renders inline in the calling thread (tests, single process dev).
+"""
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _mp_context():
+    # Workers must not inherit the web process's threads, DB connections or
+    # locks, so never plain fork. forkserver forks each worker from a clean
+    # server with gantt_render (and matplotlib) already imported; spawn is the
+    # fallback where forkserver is unavailable (Windows). Both re-import the
+    # main script in workers, so it needs an ``if __name__ == '__main__'`` guard.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(['gantt_render'])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+_started = None  # in a worker: the queue its renders report their start on
+
+
+def _init_worker(pids, started):
+    # Worker initializer: tell the parent which process to kill if it hangs
+    global _started
+    _started = started
+    pids.put(os.getpid())
+
+
+def _call(token, fn, args, kwargs):
+    # Runs in the worker: report the start so the parent's timeout begins now
+    _started.put(token)
+    return fn(*args, **kwargs)
+
+
+class _Workers:
+    """One ProcessPoolExecutor plus the pids of its workers and its in-flight futures."""
+
+    def __init__(self, workers):
+        ctx = _mp_context()
+        self._pids = ctx.SimpleQueue()
+        self._started = ctx.SimpleQueue()
+        self._events = {}
+        self._tokens = itertools.count()
+        self.futures = set()
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                            initializer=_init_worker, initargs=(self._pids, self._started))
+        threading.Thread(target=self._watch, name='render-started', daemon=True).start()
+
+    def submit(self, fn, args, kwargs):
+        """``(future, started)``: ``started`` is set once a worker begins the call (or it ends)."""
+        token = next(self._tokens)
+        started = self._events[token] = threading.Event()
+        future = self.executor.submit(_call, token, fn, args, kwargs)
+
+        def done(_):
+            self._events.pop(token, None)
+            started.set()
+        future.add_done_callback(done)
+        self.futures.add(future)
+        return future, started
+
+    def _watch(self):
+        # Relay worker start reports to the waiting threads until kill() sends None
+        while True:
+            token = self._started.get()
+            if token is None:
+                return
+            started = self._events.get(token)
+            if started is not None:
+                started.set()
+
+    def kill(self):
+        self._started.put(None)
+        while not self._pids.empty():
+            try:
+                os.kill(self._pids.get(), signal.SIGTERM)
+            except OSError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RenderBusy(Exception):
+    """All workers are busy and the wait queue is full."""
+
+
+class RenderTimeout(Exception):
+    """A render did not finish within the configured timeout."""
+
+
+class RenderPool:
+
+    def __init__(self, workers=2, queue_size=8, timeout=30.0, queue_timeout=None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.queue_timeout = timeout if queue_timeout is None else queue_timeout
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._lock = threading.Lock()
+        self._current = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(workers=int(os.environ.get('GANTT_RENDER_WORKERS', '2')),
+                   queue_size=int(os.environ.get('GANTT_RENDER_QUEUE', '8')),
+                   timeout=float(os.environ.get('GANTT_RENDER_TIMEOUT', '30')),
+                   queue_timeout=float(os.environ.get('GANTT_RENDER_QUEUE_TIMEOUT', '30')))
+
+    def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in a worker and return its result.
+
+        ``fn`` and its arguments must be picklable (module level function,
+        plain dicts/lists).
+        """
+        if not self._slots.acquire(blocking=False):
+            raise RenderBusy('render queue is full')
+        try:
+            if self.workers <= 0:
+                return fn(*args, **kwargs)
+            pool, future, started = self._submit(fn, args, kwargs)
+            try:
+                if not started.wait(self.queue_timeout):
+                    # Only queued: withdraw it, the workers themselves are fine
+                    future.cancel()
+                    raise RenderBusy(f'render waited over {self.queue_timeout:g}s to start')
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                self._retire(pool, hung=future)
+                raise RenderTimeout(f'render exceeded {self.timeout:g}s')
+            except BrokenProcessPool:
+                self._retire(pool)
+                raise
+            finally:
+                with self._lock:
+                    pool.futures.discard(future)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._current = self._current, None
+        if pool is not None:
+            pool.kill()
+
+    def _submit(self, fn, args, kwargs):
+        with self._lock:
+            if self._current is None:
+                self._current = _Workers(self.workers)
+            pool = self._current
+            future, started = pool.submit(fn, args, kwargs)
+        return pool, future, started
+
+    def _retire(self, pool, hung=None):
+        """Send new renders to a fresh pool and kill ``pool`` once its other renders are done."""
+        with self._lock:
+            if self._current is pool:
+                self._current = None
+            others = pool.futures - {hung}
+        if hung is None or not others:
+            pool.kill()
+            return
+
+        def reap():
+            wait(others, timeout=self.timeout)
+            pool.kill()
+        threading.Thread(target=reap, name='render-reaper', daemon=True).start()
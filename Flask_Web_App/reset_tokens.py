@@ -0,0 +1,68 @@
+"""Password reset tokens.
+
+Only the SHA-256 digest of a token is stored in ``users.reset_token``, so
+verifying one is a single lookup on that indexed column and a leaked
+database does not hand out usable reset links. Tokens are 256 random bits,
+so an unsalted digest is enough.
+
+Expired tokens are cleared by ``sweep_expired``, which the reset routes run
+through ``maybe_sweep`` at most once per SWEEP_INTERVAL per process.
+"""
+import hashlib, secrets, threading, time
+from db import db, UserDB
+
+RESET_EXPIRY_SECONDS = 3600  # 1 hour
+SWEEP_INTERVAL = 600
+
+_sweep_lock = threading.Lock()
+_last_sweep = [0.0]
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_reset_token(user, now=None):
+    """Give ``user`` (a UserDB row) a fresh token; returns the plain token. The caller commits."""
+    token = secrets.token_urlsafe(32)
+    user.reset_token = token_digest(token)
+    user.reset_expires = (now or time.time()) + RESET_EXPIRY_SECONDS
+    return token
+
+
+def find_user_by_reset_token(token, now=None):
+    """The UserDB row holding an unexpired ``token``, or None."""
+    if not token:
+        return None
+    user = UserDB.query.filter_by(reset_token=token_digest(token)).first()
+    if user is None or (user.reset_expires or 0) < (now or time.time()):
+        return None
+    return user
+
+
+def clear_reset_token(user):
+    user.reset_token = None
+    user.reset_expires = None
+
+
+def sweep_expired(now=None):
+    """Clear every expired token and commit; returns how many were cleared."""
+    cleared = (UserDB.query.filter(UserDB.reset_token.isnot(None), UserDB.reset_expires < (now or time.time()))
+               .update({UserDB.reset_token: None, UserDB.reset_expires: None}, synchronize_session=False))
+    db.session.commit()
+    return cleared
+
+
+def maybe_sweep(now=None):
+    """Run ``sweep_expired`` if this process has not done so for SWEEP_INTERVAL."""
+    now = now or time.time()
+    with _sweep_lock:
+        if now - _last_sweep[0] < SWEEP_INTERVAL:
+            return 0
+        _last_sweep[0] = now
+    try:
+        return sweep_expired(now)
+    except Exception as e:
+        db.session.rollback()
+        print('[ERROR] reset token sweep:', e)
+        return 0
@@ -0,0 +1,296 @@
+"""Critical path (CPM) scheduling shared by the web app and the desktop viewer.
+
+``critical_path`` works on integer node indexes: a topological sort (Kahn)
+followed by a forward pass for early start/finish and a backward pass for
+late start/finish, all O(V + E) without recursion, so 100k-task chains are
+fine. ``schedule_tasks`` adapts task dicts linked by ``depends_on`` names.
+``propagate`` pushes start dates through just the downstream subgraph of an
+edit (Gantt drag, form save) instead of iterating the whole list to a fixed
+point.
+
+Only the standard library is used so the desktop viewer can import this file
+without pulling in Flask or SQLAlchemy.
+"""
+from collections import namedtuple
+from datetime import date, datetime
+
+ScheduleRow = namedtuple('ScheduleRow', 'early_start early_finish late_start late_finish total_float free_float critical')
+
+
+class CycleError(ValueError):
+    """The dependency graph is not a DAG; ``nodes`` lists the tasks left on cycles."""
+
+    def __init__(self, nodes):
+        super().__init__(f'dependency cycle among {len(nodes)} task(s)')
+        self.nodes = nodes
+
+
+class Schedule:
+    """Result of ``critical_path``; every list is indexed by node."""
+
+    __slots__ = ('order', 'early_start', 'early_finish', 'late_start', 'late_finish',
+                 'total_float', 'free_float', 'finish')
+
+    def __init__(self, order, es, ef, ls, lf, tf, ff, finish):
+        self.order = order
+        self.early_start = es
+        self.early_finish = ef
+        self.late_start = ls
+        self.late_finish = lf
+        self.total_float = tf
+        self.free_float = ff
+        self.finish = finish
+
+    @property
+    def critical(self):
+        """Indexes of zero total float nodes, in topological order."""
+        tf = self.total_float
+        return [i for i in self.order if tf[i] <= 0]
+
+    def row(self, i):
+        return ScheduleRow(self.early_start[i], self.early_finish[i], self.late_start[i], self.late_finish[i],
+                           self.total_float[i], self.free_float[i], self.total_float[i] <= 0)
+
+
+def topological_order(n, successors):
+    """Kahn's algorithm over ``successors[i]`` lists; raises ``CycleError``."""
+    indegree = [0] * n
+    for succ in successors:
+        for j in succ:
+            indegree[j] += 1
+    order = [i for i in range(n) if not indegree[i]]
+    # ``order`` doubles as the FIFO queue
+    k = 0
+    while k < len(order):
+        for j in successors[order[k]]:
+            indegree[j] -= 1
+            if not indegree[j]:
+                order.append(j)
+        k += 1
+    if len(order) != n:
+        raise CycleError([i for i in range(n) if indegree[i]])
+    return order
+
+
+def link_bound(kind, lag, pred_start, pred_finish, duration):
+    """Earliest start a successor of length ``duration`` may have under one link.
+
+    ``kind`` is FS (default), SS, FF or SF; ``lag`` is in days and may be negative.
+    """
+    if kind == 'SS':
+        return pred_start + lag
+    if kind == 'FF':
+        return pred_finish + lag - duration
+    if kind == 'SF':
+        return pred_start + lag - duration
+    return pred_finish + lag
+
+
+def _latest_finish(kind, lag, succ_start, succ_finish, duration):
+    # Backward-pass mirror of link_bound: latest finish of a predecessor of length ``duration``
+    if kind == 'SS':
+        return succ_start - lag + duration
+    if kind == 'FF':
+        return succ_finish - lag
+    if kind == 'SF':
+        return succ_finish - lag + duration
+    return succ_start - lag
+
+
+def critical_path(durations, edges, earliest=None):
+    """Forward/backward CPM pass.
+
+    ``durations[i]`` is node i's length and ``edges`` are ``(pred, succ)``
+    finish-to-start index pairs or ``(pred, succ, kind, lag)`` typed links.
+    ``earliest[i]`` (optional) is a start-no-earlier-than bound, e.g. the
+    task's planned start offset.
+    """
+    n = len(durations)
+    successors = [[] for _ in range(n)]
+    out_links = [[] for _ in range(n)]
+    in_links = [[] for _ in range(n)]
+    for edge in edges:
+        p, s = edge[0], edge[1]
+        kind, lag = (edge[2] or 'FS', edge[3] or 0) if len(edge) > 2 else ('FS', 0)
+        successors[p].append(s)
+        out_links[p].append((s, kind, lag))
+        in_links[s].append((p, kind, lag))
+    order = topological_order(n, successors)
+
+    es = list(earliest) if earliest is not None else [0] * n
+    ef = [0] * n
+    for i in order:
+        start = es[i]
+        d = durations[i]
+        for p, kind, lag in in_links[i]:
+            bound = link_bound(kind, lag, es[p], ef[p], d)
+            if bound > start:
+                start = bound
+        es[i] = start
+        ef[i] = start + d
+    finish = max(ef) if n else 0
+
+    lf = [finish] * n
+    ls = [0] * n
+    for i in reversed(order):
+        late = lf[i]
+        d = durations[i]
+        for s, kind, lag in out_links[i]:
+            bound = _latest_finish(kind, lag, ls[s], lf[s], d)
+            if bound < late:
+                late = bound
+        lf[i] = late
+        ls[i] = late - d
+
+    tf = [ls[i] - es[i] for i in range(n)]
+    ff = [0] * n
+    for i in range(n):
+        slack = finish - ef[i]
+        for s, kind, lag in out_links[i]:
+            # How far i can slip before this link would push s
+            slack = min(slack, es[s] - link_bound(kind, lag, es[i], ef[i], durations[s]))
+        ff[i] = slack
+    return Schedule(order, es, ef, ls, lf, tf, ff, finish)
+
+
+def parse_date(value):
+    """``date`` from a date/datetime or ``YYYY-MM-DD`` string; None if missing or invalid."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        try:
+            return date.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+    return None
+
+
+def _day(value):
+    d = parse_date(value)
+    return None if d is None else d.toordinal()
+
+
+def task_duration(task):
+    """Length in days; milestones are 0 and unparsable durations count as 0."""
+    if task.get('milestone') or task.get('external_milestone'):
+        return 0
+    try:
+        return max(int(task.get('duration') or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def task_span(task):
+    """``(start, finish)`` as ordinal days, or ``(None, None)`` for an undated task."""
+    start = _day(task.get('start'))
+    return (None, None) if start is None else (start, start + task_duration(task))
+
+
+def dependency_names(value):
+    """Predecessor names from a ``depends_on`` value (one name or comma separated)."""
+    if not value:
+        return ()
+    return [v.strip() for v in str(value).split(',') if v.strip()]
+
+
+def schedule_tasks(tasks, key=None, edges=None):
+    """CPM over task dicts; returns one ``ScheduleRow`` per task, in input order.
+
+    Tasks are linked by ``edges`` (``(pred, succ, kind, lag)`` index tuples)
+    when given, otherwise by ``depends_on`` (a name, or comma separated names)
+    matched against ``key(task)`` (default: the task name). Planned ``start``
+    dates act as start-no-earlier-than bounds; offsets are days from the
+    earliest planned start. Unknown and self references are ignored.
+    """
+    parsed = {}
+    days = []
+    for t in tasks:
+        start = t.get('start')
+        if start not in parsed:
+            parsed[start] = _day(start)
+        days.append(parsed[start])
+    origin = min((d for d in days if d is not None), default=0)
+    earliest = [d - origin if d is not None else 0 for d in days]
+    if edges is None:
+        key = key or (lambda t: t.get('name'))
+        index = {}
+        for i, t in enumerate(tasks):
+            index.setdefault(key(t), i)
+        edges = []
+        for i, t in enumerate(tasks):
+            for name in dependency_names(t.get('depends_on')):
+                p = index.get(name)
+                if p is not None and p != i:
+                    edges.append((p, i))
+    sched = critical_path([task_duration(t) for t in tasks], edges, earliest)
+    return [sched.row(i) for i in range(len(tasks))]
+
+
+def propagate(changes, dependents, predecessors, sources=()):
+    """Push start dates downstream of edited tasks so no task starts before a predecessor finishes.
+
+    ``changes`` is a list of ``(task, overrides)`` pairs: the overrides (new
+    ``start``/``duration``) are applied virtually and those tasks are pinned.
+    ``sources`` are extra, unpinned, tasks to re-check (the desktop viewer
+    passes all of them). ``dependents(task)`` returns linked task dicts and
+    ``predecessors(task)`` task dicts or ``(task, kind, lag)`` typed links, so
+    only the affected subgraph is visited.
+
+    The affected subgraph is checked for cycles (``CycleError`` listing its
+    tasks) before anything moves. Returns ``[(task, new_start_date), ...]``
+    for the tasks that have to move, in topological order; inputs are not
+    modified.
+    """
+    view = {}
+    for task, overrides in changes:
+        row = dict(task)
+        row.update(overrides)
+        view[id(task)] = row
+    affected = {}
+    stack = [t for t, _ in changes] + list(sources)
+    for t in stack:
+        affected[id(t)] = t
+    while stack:
+        for d in dependents(stack.pop()):
+            if id(d) not in affected:
+                affected[id(d)] = d
+                stack.append(d)
+
+    keys = list(affected)
+    pos = {k: i for i, k in enumerate(keys)}
+    successors = [[pos[id(d)] for d in dependents(affected[k]) if id(d) in pos] for k in keys]
+    try:
+        order = topological_order(len(keys), successors)
+    except CycleError as e:
+        raise CycleError([affected[keys[i]] for i in e.nodes]) from None
+
+    moved = {}
+
+    def span(task):
+        row = view.get(id(task), task)
+        start = moved.get(id(task))
+        if start is None:
+            return task_span(row)
+        return start, start + task_duration(row)
+
+    result = []
+    for i in order:
+        task = affected[keys[i]]
+        if id(task) in view:
+            continue
+        start = _day(task.get('start'))
+        if start is None:
+            continue
+        duration = task_duration(task)
+        bound = start
+        for link in predecessors(task):
+            pred, kind, lag = link if isinstance(link, tuple) else (link, 'FS', 0)
+            pred_start, pred_finish = span(pred)
+            if pred_start is not None:
+                bound = max(bound, link_bound(kind, lag, pred_start, pred_finish, duration))
+        if bound > start:
+            moved[id(task)] = bound
+            result.append((task, date.fromordinal(bound)))
+    return result
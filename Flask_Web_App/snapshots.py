@@ -0,0 +1,212 @@
+"""Incremental project exports (snapshots) and restoring them.
+
+Every ``/download_project`` and ``/download_project_zip`` records a
+``SnapshotDB`` row holding the items change version it reflects and, for ZIP
+bundles, a manifest of the attachments it carried (``{name: [sha256, size,
+mtime_ns]}``). An export with ``?since=<snapshot id>`` then holds only:
+
+* items written after that snapshot's version (read from ``item_changes``),
+  plus the ids deleted since;
+* attachments that are new or whose size/mtime moved, so unchanged files are
+  neither read nor hashed and a diff costs time proportional to the churn.
+
+Each ZIP bundle carries ``snapshot.json`` (``{snapshot, base, version,
+deleted, removed_attachments}``); a JSON export is that same object with the
+rows under ``items``. ``restore_chain`` replays a full export followed by the
+diffs taken on top of it, in order, ZIP or JSON. Restored attachments are staged in a
+scratch directory and only moved into the upload folder (``publish_files``)
+once the database transaction has committed.
+"""
+import hashlib, json, os, shutil, zipfile
+from collections import namedtuple
+from db import db, ItemDB, ItemChangeDB, SnapshotDB
+from zip_stream import READ_CHUNK
+from item_cache import oldest_replayable
+
+Bundle = namedtuple('Bundle', 'snapshot base rows deleted files removed')
+
+
+class SnapshotError(ValueError):
+    """Unknown or unusable snapshot, or a restore chain that does not line up."""
+
+
+def base_snapshot(since):
+    """The SnapshotDB a ``?since=`` value refers to (None when no since was given)."""
+    if since in (None, ''):
+        return None
+    try:
+        snap = db.session.get(SnapshotDB, int(since))
+    except ValueError:
+        snap = None
+    if snap is None:
+        raise SnapshotError(f'Unknown snapshot {since}')
+    if not snap.complete:
+        raise SnapshotError(f'Snapshot {snap.id} did not finish exporting')
+    if snap.version < oldest_replayable():
+        raise SnapshotError(f'Snapshot {snap.id} is too old to diff against; take a full export')
+    return snap
+
+
+def changed_item_ids(since_version, version):
+    """Ids of items written in ``(since_version, version]``, in id order."""
+    return [row[0] for row in db.session.query(ItemChangeDB.item_id)
+            .filter(ItemChangeDB.version > since_version, ItemChangeDB.version <= version)
+            .distinct().order_by(ItemChangeDB.item_id)]
+
+
+def manifest_of(snap):
+    return json.loads(snap.attachments) if snap is not None and snap.attachments else {}
+
+
+def file_state(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def hashed_chunks(path, name, manifest, chunk_size=READ_CHUNK):
+    """Read ``path`` in chunks, recording its hash in ``manifest[name]`` once fully read."""
+    size, mtime = file_state(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            yield chunk
+    manifest[name] = [digest.hexdigest(), size, mtime]
+
+
+# --- restore -----------------------------------------------------------------
+
+def _is_int(value):
+    return type(value) is int
+
+
+def _checked(filename, meta, rows, files):
+    # Validate every row up front so a bad file fails the restore before any write
+    if not isinstance(meta, dict) or not isinstance(rows, list):
+        raise SnapshotError(f'{filename}: not a project bundle')
+    for key in ('snapshot', 'base'):
+        if meta.get(key) is not None and not _is_int(meta[key]):
+            raise SnapshotError(f'{filename}: {key} must be a snapshot id')
+    deleted = meta.get('deleted') or []
+    removed = meta.get('removed_attachments') or []
+    if not isinstance(deleted, list) or not all(_is_int(i) for i in deleted):
+        raise SnapshotError(f'{filename}: deleted must be a list of item ids')
+    if not isinstance(removed, list) or not all(isinstance(n, str) for n in removed):
+        raise SnapshotError(f'{filename}: removed_attachments must be a list of file names')
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise SnapshotError(f'{filename}: item {n} is not an object')
+        if not isinstance(row.get('name'), str) or not row['name'].strip():
+            raise SnapshotError(f'{filename}: item {n} has no name')
+        if row.get('id') is not None and not _is_int(row['id']):
+            raise SnapshotError(f'{filename}: item {n} has a non-integer id')
+    return Bundle(meta.get('snapshot'), meta.get('base'), rows, deleted, files, removed)
+
+
+def read_bundle(filename, stream):
+    """Parse and validate an uploaded export: a ZIP bundle, a JSON export or a legacy JSON item list."""
+    if (filename or '').lower().endswith('.zip'):
+        try:
+            zf = zipfile.ZipFile(stream)
+            meta = json.loads(zf.read('snapshot.json')) if 'snapshot.json' in zf.namelist() else {}
+            rows = json.loads(zf.read('project.json'))
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise SnapshotError(f'{filename}: not a project bundle ({e})')
+        files = {n[len('attachments/'):]: (zf, n) for n in zf.namelist() if n.startswith('attachments/')}
+        return _checked(filename, meta, rows, files)
+    try:
+        data = json.load(stream)
+    except ValueError as e:
+        raise SnapshotError(f'{filename}: not JSON ({e})')
+    if isinstance(data, list):
+        return _checked(filename, {}, data, {})
+    if not isinstance(data, dict):
+        raise SnapshotError(f'{filename}: not a project export')
+    return _checked(filename, data, data.get('items', []), {})
+
+
+def _item_fields(row):
+    # Export rows are TaskRecord dicts; list columns go back to comma strings
+    fields = {c: row.get(c) for c in ('user_id', 'name', 'phase', 'start', 'duration', 'responsible', 'status',
+                                       'percent_complete', 'milestone', 'parent', 'depends_on', 'resources',
+                                       'notes', 'pdf_page', 'pdf_file')}
+    fields['external_item'] = bool(row.get('external_item', row.get('external_task', False)))
+    fields['external_milestone'] = bool(row.get('external_milestone', False))
+    for c in ('document_links', 'attachments', 'shared_with'):
+        value = row.get(c) or []
+        fields[c] = ','.join(value) if isinstance(value, list) else value
+    return fields
+
+
+def _items(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        yield from ItemDB.query.filter(ItemDB.id.in_(ids[i:i + 500]))
+
+
+def _apply(bundle, full, staging, files):
+    ids = {r['id'] for r in bundle.rows if r.get('id') is not None}
+    if full:
+        gone = {row[0] for row in db.session.query(ItemDB.id)} - ids
+    else:
+        gone = set(bundle.deleted) - ids
+    for rec in _items(gone):
+        db.session.delete(rec)
+    existing = {r.id: r for r in _items(ids)}
+    for row in bundle.rows:
+        rec = existing.get(row.get('id'))
+        if rec is None:
+            db.session.add(ItemDB(id=row.get('id'), **_item_fields(row)))
+        else:
+            for column, value in _item_fields(row).items():
+                setattr(rec, column, value)
+    for name in bundle.removed:
+        if os.path.basename(name):
+            files[os.path.basename(name)] = None
+    for name, (zf, member) in bundle.files.items():
+        name = os.path.basename(name)
+        if not name:
+            continue
+        target = os.path.join(staging, name)
+        with zf.open(member) as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, READ_CHUNK)
+        files[name] = target
+
+
+def restore_chain(bundles, staging):
+    """Replay a full export and then each diff taken on top of it; the caller commits.
+
+    Attachments are written to the ``staging`` directory. Returns ``(snapshot
+    id, files)`` where ``files`` maps each attachment name to its staged path,
+    or to None when the chain removed it; hand it to ``publish_files`` after
+    the commit.
+
+    Raises SnapshotError (before writing anything) when the chain is broken:
+    the first bundle must be a full export and each diff's base must be the
+    snapshot before it.
+    """
+    if not bundles:
+        raise SnapshotError('No bundles to restore')
+    if bundles[0].base is not None:
+        raise SnapshotError(f'Restore has to start from a full export, not a diff on snapshot {bundles[0].base}')
+    for prev, cur in zip(bundles, bundles[1:]):
+        if cur.base is None or cur.base != prev.snapshot:
+            raise SnapshotError(f'Snapshot {cur.snapshot} is based on {cur.base}, not on {prev.snapshot}')
+    files = {}
+    for i, bundle in enumerate(bundles):
+        _apply(bundle, i == 0, staging, files)
+        db.session.flush()
+    return bundles[-1].snapshot, files
+
+
+def publish_files(files, upload_folder):
+    """Move staged attachments into ``upload_folder`` and delete the removed ones."""
+    for name, staged in files.items():
+        target = os.path.join(upload_folder, name)
+        if staged is not None:
+            os.replace(staged, target)
+        elif os.path.exists(target):
+            os.remove(target)
@@ -0,0 +1,128 @@
+"""Compact task record used by the item cache.
+
+A ``TaskRecord`` behaves like the legacy 22-key task dict (``t['name']``,
+``t.get('attachments')``, ``dict(t)``, Jinja ``task.start``) but stores its
+fields in ``__slots__``. Repeated values (status, phase, responsible, ...) are
+interned so thousands of rows share one string object, and the comma separated
+list columns are only split the first time they are read.
+"""
+import sys
+from collections.abc import MutableMapping
+
+# Public keys in the order the legacy dict exposed them
+KEYS = (
+    'id', 'user_id', 'name', 'phase', 'start', 'duration', 'responsible', 'status',
+    'percent_complete', 'milestone', 'parent', 'depends_on', 'resources', 'notes',
+    'pdf_page', 'pdf_file', 'external_item', 'external_task', 'external_milestone',
+    'document_links', 'attachments', 'shared_with',
+)
+LIST_KEYS = ('document_links', 'attachments', 'shared_with')
+ALIASES = {'external_task': 'external_item'}
+# Low-cardinality columns worth interning
+INTERNED = ('user_id', 'phase', 'start', 'duration', 'responsible', 'status',
+            'percent_complete', 'milestone', 'parent', 'depends_on', 'pdf_file')
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _slot(key):
+    key = ALIASES.get(key, key)
+    return '_' + key if key in LIST_KEYS else key
+
+
+_SLOT_KEYS = frozenset(KEYS)
+
+
+class TaskRecord(MutableMapping):
+    __slots__ = (
+        'id', 'user_id', 'name', 'phase', 'start', 'duration', 'responsible', 'status',
+        'percent_complete', 'milestone', 'parent', 'depends_on', 'resources', 'notes',
+        'pdf_page', 'pdf_file', 'external_item', 'external_milestone',
+        '_document_links', '_attachments', '_shared_with', '_extra',
+    )
+
+    def __init__(self, data=None, **kwargs):
+        for key in KEYS:
+            if key not in ALIASES:
+                setattr(self, _slot(key), None)
+        self._extra = None
+        if data:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_item(cls, t):
+        """Build a record straight from an ItemDB row without an intermediate dict."""
+        rec = cls.__new__(cls)
+        rec.id = t.id
+        rec.user_id = _intern(t.user_id)
+        rec.name = t.name
+        rec.phase = _intern(t.phase)
+        rec.start = _intern(t.start or '')
+        rec.duration = _intern(t.duration or '')
+        rec.responsible = _intern(t.responsible or '')
+        rec.status = _intern(t.status or 'Not Started')
+        rec.percent_complete = _intern(t.percent_complete or '0')
+        rec.milestone = _intern(t.milestone or '')
+        rec.parent = _intern(t.parent)
+        rec.depends_on = _intern(t.depends_on or '')
+        rec.resources = t.resources or ''
+        rec.notes = t.notes or ''
+        rec.pdf_page = t.pdf_page or ''
+        rec.pdf_file = _intern(getattr(t, 'pdf_file', '') or '')
+        rec.external_item = getattr(t, 'external_item', False)
+        rec.external_milestone = t.external_milestone
+        # Raw comma strings; split lazily on first access
+        rec._document_links = t.document_links or ''
+        rec._attachments = t.attachments or ''
+        rec._shared_with = t.shared_with or ''
+        rec._extra = None
+        return rec
+
+    def __getitem__(self, key):
+        if key in _SLOT_KEYS:
+            slot = _slot(key)
+            value = getattr(self, slot)
+            if key in LIST_KEYS and not isinstance(value, list):
+                value = [v for v in value.split(',') if v] if value else []
+                setattr(self, slot, value)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _SLOT_KEYS:
+            setattr(self, _slot(key), _intern(value) if key in INTERNED else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if self._extra is not None and key in self._extra:
+            del self._extra[key]
+            return
+        if key in _SLOT_KEYS:
+            raise KeyError(f'{key} is a fixed task field')
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from KEYS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(KEYS) + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, key):
+        return key in _SLOT_KEYS or (self._extra is not None and key in self._extra)
+
+    def __repr__(self):
+        return f'TaskRecord(id={self.id!r}, name={self.name!r})'
+
+    def copy(self):
+        return dict(self)
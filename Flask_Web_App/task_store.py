@@ -0,0 +1,196 @@
+"""Indexed in-memory task store.
+
+Drop-in replacement for the plain ``tasks`` list: it still iterates, indexes and
+supports the list mutations legacy routes use, but also keeps hash indexes on
+id, name, user_id, phase, parent, shared_with membership and each name listed
+in depends_on so lookups no longer scan every task.
+
+Indexes are maintained by the store's own mutators. Task dicts mutated in place
+must be passed back through ``upsert()`` if an indexed field changed.
+"""
+from scheduling import dependency_names
+
+# Single-valued fields with a secondary index (value -> bucket of tasks)
+INDEXED_FIELDS = ('user_id', 'phase', 'parent')
+
+
+def _order_key(task):
+    tid = task.get('id')
+    return (0, tid) if isinstance(tid, int) else (1, 0)
+
+
+class TaskStore:
+    """Id-ordered list of task dicts with secondary hash indexes.
+
+    Buckets are dicts keyed by ``id(task)`` so removal is O(1) and iteration
+    keeps insertion (i.e. id) order.
+    """
+
+    def __init__(self, tasks=None):
+        self._rows = []
+        self._by_id = {}
+        self._by_name = {}
+        self._by_field = {f: {} for f in INDEXED_FIELDS}
+        self._shared = {}
+        self._dependents = {}
+        if tasks:
+            self.extend(tasks)
+
+    # --- list protocol -------------------------------------------------
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __getitem__(self, idx):
+        return self._rows[idx]
+
+    def __setitem__(self, idx, task):
+        self._unindex(self._rows[idx])
+        self._rows[idx] = task
+        self._index(task)
+
+    def __repr__(self):
+        return f'TaskStore({len(self._rows)} tasks)'
+
+    def append(self, task):
+        self._rows.append(task)
+        self._index(task)
+
+    def extend(self, tasks):
+        for t in tasks:
+            self.append(t)
+
+    def pop(self, idx=-1):
+        task = self._rows.pop(idx)
+        self._unindex(task)
+        return task
+
+    def clear(self):
+        self._rows.clear()
+        self._by_id.clear()
+        self._by_name.clear()
+        for idx in self._by_field.values():
+            idx.clear()
+        self._shared.clear()
+        self._dependents.clear()
+
+    # --- keyed mutations -----------------------------------------------
+    def upsert(self, task):
+        """Insert or replace the task with ``task['id']`` keeping id order."""
+        old = self._by_id.get(task.get('id'))
+        if old is not None:
+            pos = self._position(old)
+            self._unindex(old)
+            self._rows[pos] = task
+        elif self._rows and _order_key(task) < _order_key(self._rows[-1]):
+            self._rows.append(task)
+            self._rows.sort(key=_order_key)
+        else:
+            self._rows.append(task)
+        self._index(task)
+        return task
+
+    def remove(self, task_id):
+        """Remove the task with this id. Returns the removed dict or None."""
+        old = self._by_id.get(task_id)
+        if old is None:
+            return None
+        del self._rows[self._position(old)]
+        self._unindex(old)
+        return old
+
+    def replace_all(self, tasks):
+        self.clear()
+        self.extend(sorted(tasks, key=_order_key))
+
+    # --- lookups -------------------------------------------------------
+    def get(self, task_id):
+        return self._by_id.get(task_id)
+
+    def by_name(self, name):
+        return list(self._by_name.get(name, {}).values())
+
+    def first_by_name(self, name, user_id=None):
+        for t in self._by_name.get(name, {}).values():
+            if user_id is None or t.get('user_id') == user_id:
+                return t
+        return None
+
+    def by_field(self, field, value):
+        return list(self._by_field[field].get(value, {}).values())
+
+    def by_user(self, user_id):
+        return self.by_field('user_id', user_id)
+
+    def by_phase(self, phase):
+        return self.by_field('phase', phase)
+
+    def children_of(self, parent_name):
+        return self.by_field('parent', parent_name)
+
+    def dependents_of(self, name):
+        """Tasks whose depends_on lists ``name`` (alone or among comma separated names)."""
+        return list(self._dependents.get(name, {}).values())
+
+    def shared_with(self, user_id):
+        return list(self._shared.get(user_id, {}).values())
+
+    def visible_to(self, user_id):
+        """Tasks owned by or shared with ``user_id`` in id order."""
+        seen = dict(self._by_field['user_id'].get(user_id, {}))
+        seen.update(self._shared.get(user_id, {}))
+        return sorted(seen.values(), key=_order_key)
+
+    # --- internals -----------------------------------------------------
+    def _position(self, task):
+        # Rows are id ordered, so bisect first and fall back to identity scan
+        lo, hi = 0, len(self._rows)
+        key = _order_key(task)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _order_key(self._rows[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._rows) and self._rows[lo] is task:
+            return lo
+        for i, t in enumerate(self._rows):
+            if t is task:
+                return i
+        raise ValueError('task not in store')
+
+    def _index(self, task):
+        key = id(task)
+        tid = task.get('id')
+        if tid is not None:
+            self._by_id[tid] = task
+        self._by_name.setdefault(task.get('name'), {})[key] = task
+        for field, idx in self._by_field.items():
+            idx.setdefault(task.get(field), {})[key] = task
+        for uid in task.get('shared_with') or []:
+            self._shared.setdefault(uid, {})[key] = task
+        for name in dependency_names(task.get('depends_on')):
+            self._dependents.setdefault(name, {})[key] = task
+
+    def _unindex(self, task):
+        key = id(task)
+        tid = task.get('id')
+        if tid is not None and self._by_id.get(tid) is task:
+            del self._by_id[tid]
+        self._drop(self._by_name, task.get('name'), key)
+        for field, idx in self._by_field.items():
+            self._drop(idx, task.get(field), key)
+        for uid in task.get('shared_with') or []:
+            self._drop(self._shared, uid, key)
+        for name in dependency_names(task.get('depends_on')):
+            self._drop(self._dependents, name, key)
+
+    @staticmethod
+    def _drop(index, value, key):
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del index[value]
@@ -0,0 +1,37 @@
+"""Shared test setup.
+
+The app reads its database URL when ``app.py`` is imported, and Flask-SQLAlchemy
+creates the engine from it right there, so changing
+``SQLALCHEMY_DATABASE_URI`` inside a fixture is too late. ``DATABASE_URL`` is
+therefore pointed at a throwaway SQLite file before any test imports the app,
+so test runs never touch ``instance/app.db``.
+"""
+import os, sys, shutil, pathlib, tempfile, pytest
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+_db_dir = tempfile.mkdtemp(prefix='tu-viewer-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+
+@pytest.fixture()
+def fresh_db():
+    """The app, inside an app context, with empty tables and cold per-process caches."""
+    import app as app_module
+    from db import db
+    from user_directory import directory
+    app = app_module.app
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all(); db.create_all()
+        # Versions and generations restart with the recreated tables
+        app_module.item_cache.invalidate(); app_module.cache_sync.invalidate()
+        app_module._gantt_data['version'] = None
+        directory.invalidate()
+        yield app
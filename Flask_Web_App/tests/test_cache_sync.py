@@ -0,0 +1,80 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = UserDB = PhaseDB = ItemDB = SettingDB = None  # placeholders
+try:
+    from app import app, db, UserDB, PhaseDB, ItemDB, SettingDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        UserDB = module.UserDB
+        PhaseDB = module.PhaseDB
+        ItemDB = module.ItemDB
+        SettingDB = module.SettingDB
+    else:
+        raise
+from werkzeug.security import generate_password_hash
+from db import ensure_data_generations
+from cache_sync import CacheSync, current_generations
+
+@pytest.fixture()
+def client(fresh_db):
+    ensure_data_generations(db.session)
+    yield fresh_db.test_client()
+
+def test_writes_bump_only_their_namespace(client):
+    before = current_generations()
+    assert before == {'users': 0, 'phases': 0, 'settings': 0, 'items': 0}
+    db.session.add(PhaseDB(name='Design')); db.session.commit()
+    db.session.add(SettingDB(key='open_editing', value='1')); db.session.commit()
+    after = current_generations()
+    assert after['phases'] == 1 and after['settings'] == 1
+    assert after['users'] == 0 and after['items'] == 0
+    # Re-assigning an identical value is not a write
+    s = db.session.get(SettingDB, 'open_editing'); s.value = '1'; db.session.commit()
+    assert current_generations()['settings'] == 1
+
+def test_sync_reloads_only_stale_namespaces(client):
+    calls = []
+    sync = CacheSync()
+    sync.register('users', lambda: calls.append('users'))
+    sync.register('items', lambda: calls.append('items'))
+    assert sorted(sync.sync()) == ['items', 'users']
+    assert sync.sync() == []
+    db.session.add(UserDB(id='u1', username='gen', password_hash=generate_password_hash('GenPass1!')))
+    db.session.commit()
+    assert sync.sync() == ['users']
+    db.session.add(ItemDB(name='Item', user_id='u1')); db.session.commit()
+    assert sync.sync() == ['items']
+    sync.invalidate('users')
+    assert sync.sync() == ['users']
+    assert calls == ['users', 'items', 'users', 'items', 'users']
+
+def test_saves_write_only_what_changed(client):
+    import app as app_module
+    db.session.add_all([ItemDB(id=1, name='Mine', user_id='u1'), ItemDB(id=2, name='Other', user_id='u1'),
+                        SettingDB(key='theme', value='dark')])
+    db.session.commit()
+    app_module.load_tasks(); app_module.load_settings()
+    # Another worker edits item 2 and a setting after this worker loaded its caches
+    db.session.get(ItemDB, 2).notes = 'edited elsewhere'
+    db.session.get(SettingDB, 'theme').value = 'light'
+    db.session.commit()
+    mine = app_module.tasks.get(1)
+    mine['notes'] = 'edited here'
+    app_module.save_tasks([mine])
+    app_module.settings['open_editing'] = True
+    app_module.save_settings('open_editing')
+    db.session.expire_all()
+    assert [i.notes for i in ItemDB.query.order_by(ItemDB.id)] == ['edited here', 'edited elsewhere']
+    assert db.session.get(SettingDB, 'theme').value == 'light' and db.session.get(SettingDB, 'open_editing').value == '1'
+    app_module.save_tasks([], deleted=[2])
+    assert [i.id for i in ItemDB.query] == [1]
@@ -25,14 +25,8 @@ except ModuleNotFoundError:
 from werkzeug.security import generate_password_hash
 
 @pytest.fixture()
-def client():
-    app.config['TESTING'] = True
-    # Use in-memory sqlite for tests
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        yield app.test_client()
+def client(fresh_db):
+    yield fresh_db.test_client()
 
 def test_user_crud(client):
     with app.app_context():
@@ -0,0 +1,105 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = ItemDB = None  # placeholders
+try:
+    from app import app, db, ItemDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+    else:
+        raise
+from db import DependencyDB, PendingDependencyDB
+from item_sync import migrate_dependency_edges
+from item_cache import ItemCache
+from scheduling import critical_path
+
+@pytest.fixture()
+def client(fresh_db):
+    yield fresh_db.test_client()
+
+def edges():
+    return sorted((e.predecessor_id, e.successor_id) for e in DependencyDB.query.all())
+
+def test_edges_follow_depends_on(client):
+    a = ItemDB(name='A'); b = ItemDB(name='B', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    assert edges() == [(a.id, b.id)]
+    # Forward reference resolves once the predecessor exists
+    c = ItemDB(name='C', depends_on='A, D')
+    db.session.add(c); db.session.commit()
+    d = ItemDB(name='D'); db.session.add(d); db.session.commit()
+    assert edges() == sorted([(a.id, b.id), (a.id, c.id), (d.id, c.id)])
+    b.depends_on = ''; db.session.commit()
+    assert edges() == sorted([(a.id, c.id), (d.id, c.id)])
+
+def test_unresolved_names_wait_in_pending_table(client):
+    def pending():
+        return sorted((p.successor_id, p.name) for p in PendingDependencyDB.query.all())
+    c = ItemDB(name='C', depends_on='D, Later'); db.session.add(c); db.session.commit()
+    assert pending() == [(c.id, 'D'), (c.id, 'Later')]
+    # A longer name containing "D" is not what C waits on
+    dx = ItemDB(name='DX'); db.session.add(dx); db.session.commit()
+    assert edges() == [] and len(pending()) == 2
+    dx.name = 'D'; db.session.commit()
+    assert edges() == [(dx.id, c.id)] and pending() == [(c.id, 'Later')]
+    db.session.delete(c); db.session.commit()
+    assert pending() == []
+
+def test_rename_and_delete_keep_names_in_step(client):
+    a = ItemDB(name='A'); b = ItemDB(name='B', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    link = DependencyDB.query.one()
+    link.type, link.lag = 'SS', 2
+    db.session.commit()
+    a.name = 'Alpha'; db.session.commit()
+    assert b.depends_on == 'Alpha'
+    link = DependencyDB.query.one()
+    assert (link.predecessor_id, link.type, link.lag) == (a.id, 'SS', 2)
+    db.session.delete(a); db.session.commit()
+    assert b.depends_on == '' and edges() == []
+
+def test_cache_links_and_backfill(client):
+    a = ItemDB(name='A'); b = ItemDB(name='B', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    cache = ItemCache(); cache.refresh()
+    assert cache.predecessors(b.id) == [(a.id, 'FS', 0)] and cache.successors(a.id) == [b.id]
+    DependencyDB.query.one().lag = 3; db.session.commit()
+    assert cache.refresh() is True
+    assert cache.predecessors(b.id) == [(a.id, 'FS', 3)]
+    # Backfill only runs against an empty edge table
+    db.session.query(DependencyDB).delete(); db.session.commit()
+    migrate_dependency_edges(db.session)
+    assert edges() == [(a.id, b.id)]
+
+def test_typed_links_in_cpm():
+    # B may start 2 days after A starts (SS+2); C must finish with B (FF)
+    s = critical_path([5, 2, 1], [(0, 1, 'SS', 2), (1, 2, 'FF', 0)])
+    assert s.early_start == [0, 2, 3]
+    assert s.finish == 5 and s.total_float == [0, 1, 1]
+
+def test_shift_stops_at_other_users_items(client):
+    from db import SettingDB, UserDB
+    db.session.add(SettingDB(key='open_editing', value='1'))
+    db.session.add_all([UserDB(id='u1', username='u1', password_hash='x'),
+                        UserDB(id='u2', username='u2', password_hash='x')])
+    a = ItemDB(name='A', user_id='u1', start='2025-01-01', duration='2')
+    b = ItemDB(name='B', user_id='u2', start='2025-01-03', duration='2', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    r = client.post('/update_task_fields', json={'id': a.id, 'start': '2025-01-05'})
+    assert r.status_code == 403 and r.json['blocked'] == [b.id]
+    db.session.expire_all()
+    assert (a.start, b.start) == ('2025-01-01', '2025-01-03')
+    # Moves that stay clear of B still go through
+    assert client.post('/update_task_fields', json={'id': a.id, 'duration': 1}).status_code == 200
@@ -0,0 +1,102 @@
+import os, sys, json, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+    else:
+        raise
+from events_bp import ChangeBroker
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add(UserDB(id='u1', username='u1', password_hash='x'))
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def test_broker_fans_out_to_every_subscriber(client):
+    broker = ChangeBroker(poll_interval=0.02, queue_size=2)
+    a = ItemDB(name='A'); db.session.add(a); db.session.commit()
+    q1, q2 = broker.subscribe(app, 1), broker.subscribe(app, 1)
+    a.status = 'In Progress'; db.session.commit()
+    for q in (q1, q2):
+        assert q.get(timeout=2) == {'id': a.id, 'op': 'update', 'fields': ['status'], 'version': 2}
+    # A subscriber that cannot keep up is cut off with a reset marker
+    broker.unsubscribe(q2)
+    for i in range(3):
+        db.session.add(ItemDB(name=f'N{i}'))
+    db.session.commit()
+    item = q1.get(timeout=2)
+    while item is not None:
+        item = q1.get(timeout=2)
+    broker.unsubscribe(q1)
+
+def test_stream_replays_after_last_event_id(client):
+    a = ItemDB(name='A', user_id='u1'); db.session.add(a); db.session.commit()
+    db.session.delete(a); db.session.commit()
+    r = client.get('/events', headers={'Last-Event-ID': '0'}, buffered=False)
+    assert r.mimetype == 'text/event-stream'
+    chunks = (c.decode() for c in r.response)
+    assert next(chunks).startswith('retry:')
+    events = [next(chunks), next(chunks)]
+    r.close()
+    assert events[0].startswith('id: 1\nevent: change\n')
+    assert [json.loads(e.split('data: ', 1)[1])['op'] for e in events] == ['insert', 'delete']
+
+def test_stream_resets_when_log_was_pruned(client):
+    from item_cache import prune_change_log
+    for i in range(4):
+        db.session.add(ItemDB(name=f'T{i}', user_id='u1')); db.session.commit()
+    prune_change_log(keep=1)
+    r = client.get('/events?since=1', buffered=False)
+    chunks = (c.decode() for c in r.response)
+    assert next(chunks).startswith('retry:')
+    event = next(chunks)
+    r.close()
+    assert 'event: reset' in event
+
+def test_stream_skips_items_the_user_cannot_see(client):
+    db.session.add(UserDB(id='u2', username='u2', password_hash='x'))
+    hidden = ItemDB(name='Hidden', user_id='u2')
+    shared = ItemDB(name='Shared', user_id='u2', shared_with='u1')
+    db.session.add_all([hidden, shared]); db.session.commit()
+    hidden.status = 'Done'; db.session.commit()
+    # Unsharing still tells the old audience, so their copy can be dropped
+    shared.shared_with = ''; db.session.commit()
+    r = client.get('/events?since=0', buffered=False)
+    chunks = (c.decode() for c in r.response)
+    assert next(chunks).startswith('retry:')
+    events = [json.loads(next(chunks).split('data: ', 1)[1]) for _ in range(2)]
+    r.close()
+    assert [(e['id'], e['op']) for e in events] == [(shared.id, 'insert'), (shared.id, 'update')]
+
+def test_streams_per_process_are_capped(client, monkeypatch):
+    import threading, events_bp
+    monkeypatch.setattr(events_bp, '_stream_slots', threading.BoundedSemaphore(2))
+    open_streams = [client.get('/events', buffered=False) for _ in range(2)]
+    r = client.get('/events', buffered=False)
+    assert r.status_code == 503 and r.headers['Retry-After']
+    # Closing a stream, even one never read from, frees its slot
+    open_streams.pop().close()
+    r = client.get('/events', buffered=False)
+    assert r.status_code == 200
+    r.close()
+    for s in open_streams:
+        s.close()
+    assert not events_bp.broker._subscribers
@@ -0,0 +1,100 @@
+import os, sys, csv, io, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+    else:
+        raise
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add_all([UserDB(id='u1', username='u1', password_hash='x'),
+                        UserDB(id='u2', username='u2', password_hash='x')])
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def test_csv_streams_visible_filtered_rows(client):
+    import app as app_module
+    db.session.add_all([ItemDB(name=f'T{i}', user_id='u1', phase='P', start='2025-01-02', notes='x' * 500) for i in range(300)])
+    db.session.add_all([ItemDB(name='early', user_id='u1', phase='P', start='2024-12-01', external_item=True),
+                        ItemDB(name='other phase', user_id='u1', phase='Q', start='2025-01-02'),
+                        ItemDB(name='theirs', user_id='u2', phase='P', start='2025-01-02')])
+    db.session.commit()
+    r = client.get('/download_csv?phase=P&start_from=2025-01-01', buffered=False)
+    assert r.status_code == 200 and r.mimetype == 'text/csv' and r.content_length is None
+    chunks = list(r.response)
+    assert len(chunks) > 1 and all(len(c) < 2 * app_module.CSV_CHUNK_BYTES for c in chunks)
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert rows[0] == app_module.CSV_COLUMNS
+    assert [r[0] for r in rows[1:]] == [f'T{i}' for i in range(300)]
+    everything = list(csv.DictReader(io.StringIO(client.get('/download_csv').get_data(as_text=True))))
+    assert [r['name'] for r in everything][-2:] == ['early', 'other phase']
+    assert everything[-2]['external_task'] == 'True'
+    assert client.get('/download_csv?start_from=soon').status_code == 400
+
+def test_stream_zip_stores_compressed_formats(tmp_path):
+    import zipfile
+    from zip_stream import stream_zip
+    pdf = tmp_path / 'plan.pdf'
+    pdf.write_bytes(b'%PDF' + os.urandom(300_000))
+    notes = tmp_path / 'notes.txt'
+    notes.write_bytes(b'hello ' * 50_000)
+    opened = []
+    def entries():
+        yield 'project.json', [b'[', b']']
+        opened.append('files')
+        yield 'attachments/plan.pdf', str(pdf)
+        yield 'attachments/notes.txt', str(notes)
+    stream = stream_zip(entries(), chunk_size=64 * 1024)
+    first = next(stream)
+    # project.json is out before any attachment is touched
+    assert first.startswith(b'PK') and opened == []
+    data = first + b''.join(stream)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        info = {i.filename: i for i in zf.infolist()}
+        assert info['attachments/plan.pdf'].compress_type == zipfile.ZIP_STORED
+        assert info['attachments/notes.txt'].compress_type == zipfile.ZIP_DEFLATED
+        assert info['attachments/notes.txt'].compress_size < 10_000
+        assert zf.read('attachments/plan.pdf') == pdf.read_bytes() and zf.read('project.json') == b'[]'
+
+def test_project_zip_route(client, tmp_path, monkeypatch):
+    import zipfile, json
+    import app as app_module
+    monkeypatch.setattr(app_module, 'UPLOAD_FOLDER', str(tmp_path))
+    (tmp_path / 'a.png').write_bytes(b'\x89PNG' + b'0' * 1000)
+    db.session.add_all([ItemDB(name='A', user_id='u1', attachments='a.png,missing.pdf'), ItemDB(name='B', user_id='u1')])
+    db.session.commit()
+    app_module.item_cache.invalidate(); app_module.cache_sync.invalidate()
+    r = client.get('/download_project_zip')
+    assert r.status_code == 200 and r.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(r.data)) as zf:
+        assert zf.namelist() == ['project.json', 'attachments/a.png', 'snapshot.json']
+        assert [t['name'] for t in json.loads(zf.read('project.json'))] == ['A', 'B']
+
+def test_broken_render_pool_answers_503(client, monkeypatch):
+    import app as app_module
+    from render_pool import BrokenProcessPool
+    def broken(*a, **kw):
+        raise BrokenProcessPool('worker died')
+    monkeypatch.setattr(app_module.render_pool, 'run', broken)
+    app_module.render_cache.clear()
+    for url in ('/gantt.png', '/gantt_export/pdf'):
+        r = client.get(url)
+        assert r.status_code == 503 and r.headers['Retry-After'] == '2'
@@ -0,0 +1,60 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = item_cache = cache_sync = _gantt_data = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB, item_cache, cache_sync, _gantt_data  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+        item_cache = module.item_cache
+        cache_sync = module.cache_sync
+        _gantt_data = module._gantt_data
+    else:
+        raise
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add(UserDB(id='u1', username='u1', password_hash='x'))
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def test_delta_since_version(client):
+    a = ItemDB(name='A', start='2025-01-01', duration='2')
+    b = ItemDB(name='B', start='2025-01-03', duration='1', depends_on='A')
+    c = ItemDB(name='C', start='2025-01-01', duration='1')
+    db.session.add_all([a, b, c]); db.session.commit()
+    r = client.get('/gantt_data')
+    assert [t['name'] for t in r.json] == ['A', 'B', 'C']
+    version = int(r.headers['X-Data-Version'])
+    assert client.get(f'/gantt_data?since={version}').json == {
+        'version': version, 'full': False, 'tasks': [], 'deleted': [], 'critical': [a.id, b.id]}
+
+    c.duration = '9'
+    db.session.delete(b)
+    db.session.add(ItemDB(name='D', start='2025-01-02'))
+    db.session.commit()
+    delta = client.get(f'/gantt_data?since={version}').json
+    assert delta['version'] > version and not delta['full']
+    assert sorted(t['name'] for t in delta['tasks']) == ['C', 'D']
+    assert next(t for t in delta['tasks'] if t['name'] == 'C')['finish'] == '2025-01-10'
+    assert delta['deleted'] == [b.id]
+    assert delta['critical'] == [c.id]
+
+def test_unservable_delta_falls_back_to_full(client):
+    db.session.add(ItemDB(name='A', start='2025-01-01')); db.session.commit()
+    reply = client.get('/gantt_data?since=999').json
+    assert reply['full'] is True and [t['name'] for t in reply['tasks']] == ['A']
@@ -0,0 +1,77 @@
+import sys, pathlib
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from gantt_render import parse_tasks_for_gantt, draw_gantt, _edges, render_gantt_png, DENSE_DPI, DENSE_TICK_LABELS
+
+def _tasks(n):
+    out = []
+    for i in range(n):
+        out.append({'id': i, 'name': f'T{i}', 'phase': f'P{i % 3}', 'start': '2025-01-%02d' % (i % 28 + 1),
+                    'duration': str(i % 5 + 1), 'percent_complete': '50',
+                    'parent': f'T{i - 3}' if i >= 3 else '', 'depends_on': f'T{i - 1}' if i else ''})
+    return out
+
+def test_parse_groups_by_phase_and_indents_children():
+    tasks = [
+        {'name': 'Child', 'phase': 'Build', 'start': '2025-01-05', 'duration': '2', 'parent': 'Root'},
+        {'name': 'Root', 'phase': 'Build', 'start': '2025-01-01', 'duration': '3'},
+        {'name': 'Gate', 'phase': 'Build', 'start': '2025-01-09', 'duration': '1', 'milestone': 'Gate'},
+        {'name': 'Undated', 'phase': 'Build', 'start': ''},
+    ]
+    rows = parse_tasks_for_gantt(tasks)
+    assert [r['name'] for r in rows] == ['Build', 'Root', '    Child', 'Gate']
+    assert rows[0]['is_phase'] and rows[3]['is_milestone'] and rows[3]['duration'] == 0
+
+def test_parse_survives_parent_cycles():
+    tasks = [{'name': 'A', 'start': '2025-01-01', 'duration': '1', 'parent': 'B'},
+             {'name': 'B', 'start': '2025-01-01', 'duration': '1', 'parent': 'A'}]
+    assert sorted(r['name'].strip() for r in parse_tasks_for_gantt(tasks) if not r['is_phase']) == ['A', 'B']
+
+def test_artist_count_does_not_grow_with_rows():
+    counts = []
+    for n in (30, 600):
+        tasks = _tasks(n)
+        fig, ax = plt.subplots()
+        draw_gantt(ax, parse_tasks_for_gantt(tasks), tasks, legend=False)
+        counts.append(len(ax.collections))
+        plt.close(fig)
+    assert counts[0] >= counts[1]
+
+def test_dense_charts_render_small_with_capped_labels():
+    import struct
+    tasks = _tasks(600)
+    fig, ax = plt.subplots()
+    draw_gantt(ax, parse_tasks_for_gantt(tasks), tasks, legend=False, dense=True)
+    assert len(ax.get_yticks()) <= DENSE_TICK_LABELS
+    plt.close(fig)
+    png = render_gantt_png(tasks, dense=True)
+    width, height = struct.unpack('>II', png[16:24])
+    assert (width, height) == (24 * DENSE_DPI, 12 * DENSE_DPI)
+    width, _ = struct.unpack('>II', render_gantt_png(_tasks(20), dense=True)[16:24])
+    assert width == 2400  # small charts keep the full resolution
+
+def test_big_charts_keep_full_quality_unless_dense_is_asked_for():
+    import struct
+    tasks = _tasks(300)
+    fig, ax = plt.subplots()
+    parsed = parse_tasks_for_gantt(tasks)
+    draw_gantt(ax, parsed, tasks, legend=False)
+    assert len(ax.get_yticks()) == len(parsed)
+    plt.close(fig)
+    width, _ = struct.unpack('>II', render_gantt_png(tasks)[16:24])
+    assert width == 2400
+
+def test_dependency_arrows_for_every_predecessor():
+    tasks = [{'name': 'A', 'start': '2025-01-01', 'duration': '1'},
+             {'name': 'B', 'start': '2025-01-01', 'duration': '1'},
+             {'name': 'C', 'start': '2025-01-03', 'duration': '1', 'depends_on': 'A, B'},
+             {'name': 'D', 'start': '2025-01-03', 'duration': '1', 'depends_on': 'A,Missing'}]
+    parsed = parse_tasks_for_gantt(tasks)
+    names = [r['name'].strip() for r in parsed]
+    pairs = {(names[a], names[b]) for a, b in _edges(parsed, tasks, 'depends_on')}
+    assert pairs == {('A', 'C'), ('B', 'C'), ('A', 'D')}
@@ -0,0 +1,135 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = ItemDB = ItemChangeDB = ItemCache = None  # placeholders
+try:
+    from app import app, db, ItemDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+    else:
+        raise
+from db import ItemChangeDB
+from item_cache import ItemCache, current_version
+
+@pytest.fixture()
+def client(fresh_db):
+    yield fresh_db.test_client()
+
+def test_writes_are_logged(client):
+    a = ItemDB(name='A', start='2025-01-01', duration='2')
+    db.session.add(a); db.session.commit()
+    a.status = 'In Progress'; db.session.commit()
+    db.session.delete(a); db.session.commit()
+    ops = [(c.op, c.fields) for c in ItemChangeDB.query.order_by(ItemChangeDB.version).all()]
+    assert ops == [('insert', None), ('update', 'status'), ('delete', None)]
+    assert current_version() == 3
+
+def test_refresh_patches_only_changed_rows(client):
+    db.session.add_all([ItemDB(name='A', duration='1'), ItemDB(name='B', duration='2')])
+    db.session.commit()
+    cache = ItemCache()
+    assert cache.refresh() is True
+    assert [t['name'] for t in cache.tasks] == ['A', 'B']
+    tasks_ref = cache.tasks
+    # Nothing changed: no reload
+    assert cache.refresh() is False
+    b = ItemDB.query.filter_by(name='B').first()
+    b.duration = '7'
+    db.session.add(ItemDB(name='C'))
+    db.session.commit()
+    untouched = cache.get(ItemDB.query.filter_by(name='A').first().id)
+    assert cache.refresh() is True
+    assert [t['name'] for t in cache.tasks] == ['A', 'B', 'C']
+    assert cache.get(b.id)['duration'] == '7'
+    # Unchanged rows keep their dict, list identity is stable
+    assert cache.get(untouched['id']) is untouched
+    assert cache.tasks is tasks_ref
+    db.session.delete(b); db.session.commit()
+    cache.refresh()
+    assert [t['name'] for t in cache.tasks] == ['A', 'C']
+
+def test_refresh_after_log_reset(client):
+    db.session.add(ItemDB(name='A')); db.session.commit()
+    cache = ItemCache()
+    cache.refresh()
+    db.drop_all(); db.create_all()
+    assert cache.refresh() is True
+    assert len(cache.tasks) == 0
+
+def test_gantt_rows_maintained_on_write(client):
+    a = ItemDB(name='A', start='2025-01-01', duration='3', percent_complete='50')
+    m = ItemDB(name='M', start='2025-01-04', duration='5', milestone='Yes')
+    db.session.add_all([a, m, ItemDB(name='undated')]); db.session.commit()
+    cache = ItemCache(); cache.refresh()
+    row = cache.gantt_row(a.id)
+    assert (row['start'], row['finish'], row['duration'], row['percent_complete']) == ('2025-01-01', '2025-01-04', 3, 50.0)
+    assert cache.gantt_row(m.id)['finish'] == '2025-01-04' and cache.gantt_row(m.id)['milestone']
+    assert cache.gantt_row(m.id + 1)['finish'] is None
+    a.duration = '10'; db.session.commit()
+    cache.refresh()
+    assert cache.gantt_row(a.id)['finish'] == '2025-01-11'
+    db.session.delete(a); db.session.commit()
+    cache.refresh()
+    assert cache.gantt_row(a.id) is None
+
+def test_pruned_log_forces_full_reloads(client):
+    import time
+    from db import SnapshotDB
+    from item_cache import prune_change_log, oldest_replayable, changed_since
+    items = [ItemDB(name=f'T{i}') for i in range(6)]
+    db.session.add_all(items); db.session.commit()
+    for t in items:
+        t.status = 'Done'
+    db.session.commit()
+    # A recent snapshot at version 4 holds the log back to there
+    db.session.add(SnapshotDB(version=4, kind='zip', complete=True, created_at=time.time())); db.session.commit()
+    assert prune_change_log(keep=2) == 4 and oldest_replayable() == 4
+    db.session.query(SnapshotDB).delete(); db.session.commit()
+    assert prune_change_log(keep=2) == 6 and oldest_replayable() == 10 and current_version() == 12
+    assert changed_since(9, 12) is None and len(changed_since(10, 12)) == 2
+    cache = ItemCache(); cache.refresh()
+    items[0].notes = 'x'; db.session.commit()
+    assert cache.refresh() is True and cache.tasks.get(items[0].id)['notes'] == 'x'
+
+@pytest.fixture()
+def admin(client):
+    import app as app_module
+    from db import UserDB
+    db.session.add(UserDB(id='u1', username='u1', password_hash='x', is_admin=True)); db.session.commit()
+    app_module.item_cache.invalidate(); app_module.cache_sync.invalidate()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield client
+    # Later modules reuse the id 'u1' for a plain user
+    app_module.cache_sync.invalidate(); app_module.user_directory.invalidate()
+
+def names(client):
+    r = client.get('/tasks_json')
+    assert r.status_code == 200
+    return sorted(t['name'] for t in r.json)
+
+def test_project_upload_keeps_existing_rows(admin):
+    import io, json
+    db.session.add_all([ItemDB(name='A', user_id='u1'), ItemDB(name='B', user_id='u1')]); db.session.commit()
+    assert names(admin) == ['A', 'B']
+    upload = json.dumps([{'id': 50, 'name': 'X', 'user_id': 'u1'}]).encode()
+    r = admin.post('/', data={'project_upload': (io.BytesIO(upload), 'project.json')}, content_type='multipart/form-data')
+    assert r.status_code == 302
+    assert sorted(i.name for i in ItemDB.query) == ['A', 'B', 'X'] and names(admin) == ['A', 'B', 'X']
+
+def test_legacy_delete_goes_through_the_database(admin):
+    db.session.add_all([ItemDB(name='A', user_id='u1'), ItemDB(name='B', user_id='u1')]); db.session.commit()
+    assert names(admin) == ['A', 'B']
+    r = admin.post('/delete_task', json={'task_idx': 0})
+    assert r.status_code == 200 and r.json['legacy']
+    assert [i.name for i in ItemDB.query] == ['B'] and names(admin) == ['B']
@@ -0,0 +1,96 @@
+import os, sys, io, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+    else:
+        raise
+from db import DependencyDB, ItemChangeDB, SettingDB
+from item_import import import_items, csv_rows
+
+CSV = b'''\xef\xbb\xbfTask Name,Start Date,Duration (days),% Complete,Depends On,External
+Survey,03/01/2025,2,50,,no
+Install,2025-03-04,3,,Survey,
+,2025-03-01,1,,,
+Wire,someday,1,,,
+Late,2025-03-09,-1,,,
+Sign,2025-03-10,0,,,yes
+'''
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add_all([UserDB(id='u1', username='u1', password_hash='x'), SettingDB(key='open_editing', value='1')])
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def test_csv_upload_inserts_valid_rows_and_reports_the_rest(client):
+    db.session.add(ItemDB(name='Inspect', depends_on='Install')); db.session.commit()
+    r = client.post('/api/items/import', data={'file': (io.BytesIO(CSV), 'requests.csv')})
+    assert r.status_code == 200
+    assert r.json['inserted'] == 3 and r.json['truncated'] is False
+    assert [(e['row'], e['error'].split()[0]) for e in r.json['errors']] == [(4, 'name'), (5, 'start'), (6, 'duration')]
+    survey, install, sign = ItemDB.query.filter(ItemDB.user_id == 'u1').order_by(ItemDB.id).all()
+    assert (survey.start, survey.percent, install.finish_date.isoformat()) == ('2025-03-01', 50.0, '2025-03-07')
+    assert sign.external_item is True and survey.external_item is False
+    inspect_id = ItemDB.query.filter_by(name='Inspect').one().id
+    # Links inside the file and to an item already waiting on one of its names
+    assert sorted((e.predecessor_id, e.successor_id) for e in DependencyDB.query) == [(survey.id, install.id), (install.id, inspect_id)]
+    logged = {c.item_id for c in ItemChangeDB.query.filter(ItemChangeDB.op == 'insert')}
+    assert {survey.id, install.id, sign.id} <= logged
+
+def test_unknown_status_is_reported(client):
+    csv = b'Name,Status\nA,In Progress\nB,Done\nC,\n'
+    r = client.post('/api/items/import', data={'file': (io.BytesIO(csv), 'statuses.csv')})
+    assert r.status_code == 200 and r.json['inserted'] == 2
+    assert r.json['errors'] == [{'row': 3, 'error': 'status must be one of Not Started, In Progress, Completed'}]
+    assert sorted((i.name, i.status) for i in ItemDB.query) == [('A', 'In Progress'), ('C', 'Not Started')]
+
+def test_bad_uploads_are_rejected_whole(client):
+    assert client.post('/api/items/import', data={'file': (io.BytesIO(b'a,b\n1,2\n'), 'x.csv')}).status_code == 400
+    assert client.post('/api/items/import', data={'file': (io.BytesIO(b'{}'), 'x.json')}).status_code == 400
+    assert ItemDB.query.count() == 0
+
+def test_upload_size_and_row_caps(client, monkeypatch):
+    import api_bp
+    from item_import import ImportFormatError
+    monkeypatch.setattr(api_bp, 'MAX_IMPORT_BYTES', 64)
+    r = client.post('/api/items/import', data={'file': (io.BytesIO(b'name\n' + b'x' * 200), 'big.csv')})
+    assert r.status_code == 413 and 'error' in r.json
+    with pytest.raises(ImportFormatError):
+        import_items([['name']] + [[f'T{i}'] for i in range(11)], 'u1', max_rows=10)
+    db.session.rollback()
+    assert ItemDB.query.count() == 0
+
+def test_chunked_import(client):
+    rows = [['name', 'start']] + [[f'T{i}', '2025-01-01'] for i in range(25)]
+    result = import_items(rows, 'u1', chunk_size=10)
+    db.session.commit()
+    assert result.inserted == 25 and ItemDB.query.count() == 25
+
+def test_xlsx_upload(client):
+    openpyxl = pytest.importorskip('openpyxl')
+    from datetime import datetime
+    wb = openpyxl.Workbook()
+    wb.active.append(['Name', 'Start', 'Duration'])
+    wb.active.append(['Cell', datetime(2025, 4, 1), 2.0])
+    buf = io.BytesIO(); wb.save(buf); buf.seek(0)
+    r = client.post('/api/items/import', data={'file': (buf, 'plan.xlsx')})
+    assert r.json['inserted'] == 1
+    assert ItemDB.query.one().start == '2025-04-01'
@@ -0,0 +1,151 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+    else:
+        raise
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add_all([UserDB(id='u1', username='u1', password_hash='x'),
+                        UserDB(id='u2', username='u2', password_hash='x')])
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def walk(client, url):
+    names, cursor = [], None
+    while True:
+        r = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert r.status_code == 200
+        names += [i['name'] for i in r.json['items']]
+        cursor = r.json['next_cursor']
+        if not cursor:
+            return names
+
+def test_keyset_pages_cover_everything_once(client):
+    for i in range(7):
+        db.session.add(ItemDB(name=f'T{i}', user_id='u1', start=f'2025-01-0{7 - i}', phase='P' if i % 2 else 'Q'))
+    db.session.add(ItemDB(name='same-day', user_id='u1', start='2025-01-03'))
+    db.session.commit()
+    assert walk(client, '/api/items?limit=3') == ['T0', 'T1', 'T2', 'T3', 'T4', 'T5', 'T6', 'same-day']
+    by_start = walk(client, '/api/items?limit=2&sort=start')
+    assert by_start == ['T6', 'T5', 'T4', 'same-day', 'T3', 'T2', 'T1', 'T0']
+    assert walk(client, '/api/items?limit=2&sort=-start') == by_start[::-1]
+    assert walk(client, '/api/items?limit=2&phase=P&start_from=2025-01-03') == ['T1', 'T3']
+
+def test_scoped_to_owned_and_shared(client):
+    db.session.add_all([ItemDB(name='mine', user_id='u1'), ItemDB(name='theirs', user_id='u2'),
+                        ItemDB(name='shared', user_id='u2', shared_with='u3,u1'),
+                        ItemDB(name='lookalike', user_id='u2', shared_with='u11')])
+    db.session.commit()
+    assert walk(client, '/api/items?limit=10') == ['mine', 'shared']
+    # The share rows follow edits to shared_with
+    theirs = ItemDB.query.filter_by(name='theirs').one()
+    theirs.shared_with = 'u1'; db.session.commit()
+    assert walk(client, '/api/items?limit=10') == ['mine', 'theirs', 'shared']
+
+def test_bad_requests(client):
+    assert client.get('/api/items?sort=notes').status_code == 400
+    assert client.get('/api/items?cursor=garbage').status_code == 400
+    db.session.add_all([ItemDB(name='a', user_id='u1'), ItemDB(name='b', user_id='u1')]); db.session.commit()
+    cursor = client.get('/api/items?limit=1').json['next_cursor']
+    # A cursor only resumes the sort it was issued for
+    assert client.get(f'/api/items?sort=name&cursor={cursor}').status_code == 400
+    # The resume value must have the sort column's type
+    from api_bp import encode_cursor
+    for sort, value in (('name', 5), ('start', 'soon'), ('-start', {'x': 1}), ('responsible', [1])):
+        assert client.get(f'/api/items?sort={sort}&cursor={encode_cursor(sort, 1, value)}').status_code == 400
+
+def test_typed_columns_and_undated_rows(client):
+    from datetime import date
+    a = ItemDB(name='a', user_id='u1', start='2025-03-01', duration='4', percent_complete='25')
+    m = ItemDB(name='m', user_id='u1', start='2025-03-02', duration='9', milestone='Yes')
+    db.session.add_all([a, m, ItemDB(name='undated', user_id='u1'), ItemDB(name='undated2', user_id='u1')])
+    db.session.commit()
+    assert (a.start_date, a.duration_days, a.percent, a.finish_date) == (date(2025, 3, 1), 4, 25.0, date(2025, 3, 5))
+    assert m.finish_date == m.start_date
+    a.duration = '6'; db.session.commit()
+    assert a.finish_date == date(2025, 3, 7)
+    assert walk(client, '/api/items?limit=1&sort=start') == ['undated', 'undated2', 'a', 'm']
+    assert walk(client, '/api/items?limit=1&sort=-start') == ['m', 'a', 'undated2', 'undated']
+    assert client.get('/api/items?start_from=March').status_code == 400
+
+def test_batch_applies_patches_and_shifts_together(client):
+    from db import SettingDB
+    db.session.add(SettingDB(key='open_editing', value='1'))
+    a = ItemDB(name='A', user_id='u1', start='2025-01-01', duration='2')
+    b = ItemDB(name='B', user_id='u1', start='2025-01-03', duration='2', depends_on='A')
+    c = ItemDB(name='C', user_id='u1', start='2025-01-05', duration='1', depends_on='B')
+    db.session.add_all([a, b, c]); db.session.commit()
+    r = client.post('/api/items/batch', json={'patches': [
+        {'id': a.id, 'start': '2025-01-04'}, {'id': c.id, 'status': 'Completed'}]})
+    assert r.status_code == 200, r.json
+    assert r.json['shifted'] == [{'id': b.id, 'start': '2025-01-06'}, {'id': c.id, 'start': '2025-01-08'}]
+    assert (c.start, c.status, float(c.percent_complete)) == ('2025-01-08', 'Completed', 100.0)
+
+def test_batch_is_all_or_nothing(client):
+    from db import SettingDB
+    db.session.add(SettingDB(key='open_editing', value='1'))
+    a = ItemDB(name='A', user_id='u1', start='2025-01-01', duration='2')
+    b = ItemDB(name='B', user_id='u1', start='2025-01-03', duration='1', depends_on='A')
+    theirs = ItemDB(name='T', user_id='u2', start='2025-01-01')
+    db.session.add_all([a, b, theirs]); db.session.commit()
+    # B is pinned by its own patch, so pushing A past it is a joint violation
+    r = client.post('/api/items/batch', json=[{'id': a.id, 'duration': 5}, {'id': b.id, 'start': '2025-01-03', 'percent_complete': 10}])
+    assert r.status_code == 409 and r.json['id'] == b.id and r.json['dependency_end'] == '2025-01-06'
+    assert (a.duration, b.percent_complete) == ('2', None)
+    assert client.post('/api/items/batch', json=[{'id': a.id, 'duration': 1}, {'id': theirs.id, 'duration': 1}]).status_code == 403
+    assert client.post('/api/items/batch', json=[{'id': a.id, 'start': 'soon'}]).status_code == 400
+    for status in ('Done', 5, ['Completed']):
+        r = client.post('/api/items/batch', json=[{'id': a.id, 'duration': 1}, {'id': b.id, 'status': status}])
+        assert r.status_code == 400 and r.json['id'] == b.id
+    assert client.post('/api/items/batch', json=[{'id': 999}]).status_code == 404
+    assert a.duration == '2'
+
+def test_batch_does_not_push_other_users_items(client):
+    from db import SettingDB
+    db.session.add(SettingDB(key='open_editing', value='1'))
+    a = ItemDB(name='A', user_id='u1', start='2025-01-01', duration='2')
+    b = ItemDB(name='B', user_id='u2', start='2025-01-03', duration='2', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    r = client.post('/api/items/batch', json=[{'id': a.id, 'start': '2025-01-04'}])
+    assert r.status_code == 403 and r.json['blocked'] == [b.id]
+    assert (a.start, b.start) == ('2025-01-01', '2025-01-03')
+
+def test_batch_sets_link_type_and_lag(client):
+    from db import SettingDB, DependencyDB
+    db.session.add(SettingDB(key='open_editing', value='1'))
+    a = ItemDB(name='A', user_id='u1', start='2025-01-01', duration='4')
+    b = ItemDB(name='B', user_id='u1', start='2025-01-05', duration='2', depends_on='A')
+    db.session.add_all([a, b]); db.session.commit()
+    # SS+1: B may start a day after A starts, and is not pushed
+    r = client.post('/api/items/batch', json=[{'id': b.id, 'links': [{'predecessor': a.id, 'type': 'SS', 'lag': 1}]}])
+    assert r.status_code == 200, r.json
+    link = DependencyDB.query.one()
+    assert (link.type, link.lag) == ('SS', 1)
+    # The new lag is honoured in the same batch: FS+3 pushes B to Jan 8
+    r = client.post('/api/items/batch', json=[{'id': b.id, 'links': [{'predecessor': a.id, 'type': 'FS', 'lag': 3}]}])
+    assert r.json['shifted'] == [{'id': b.id, 'start': '2025-01-08'}]
+    for bad, status in (({'predecessor': a.id, 'type': 'XX'}, 400), ({'predecessor': a.id, 'lag': 'soon'}, 400),
+                        ({'predecessor': b.id}, 404), ({'type': 'SS'}, 400)):
+        assert client.post('/api/items/batch', json=[{'id': b.id, 'links': [bad]}]).status_code == status
+    link = DependencyDB.query.one()
+    assert (link.type, link.lag) == ('FS', 3)
@@ -0,0 +1,83 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = UserDB = None  # placeholders
+try:
+    from app import app, db, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        UserDB = module.UserDB
+    else:
+        raise
+from werkzeug.security import generate_password_hash
+from login_limiter import MemoryLimiter, DatabaseLimiter
+from db import LoginAttemptDB
+
+@pytest.fixture()
+def client(fresh_db):
+    yield fresh_db.test_client()
+
+@pytest.mark.parametrize('make', [MemoryLimiter, DatabaseLimiter])
+def test_bucket_limits_and_refills(client, make):
+    lim = make(capacity=3, window=30)  # one attempt back every 10s
+    for t in (0, 1, 2):
+        assert lim.attempt('k', now=1000 + t) == (False, 0)
+    limited, wait = lim.attempt('k', now=1003)
+    assert limited and 7 <= wait <= 8
+    # The refused attempt took nothing, so the wait did not grow
+    assert lim.check('k', now=1003) == (True, wait)
+    assert lim.attempt('k', now=1012) == (False, 0)
+    assert lim.check('k', now=1012)[0]
+    lim.refund('k', now=1012)
+    assert lim.check('k', now=1012) == (False, 0)
+    assert lim.check('other', now=1003) == (False, 0)
+    lim.reset('k')
+    assert lim.check('k', now=1003) == (False, 0)
+
+def test_workers_share_the_table_and_it_stays_bounded(client):
+    a, b = DatabaseLimiter(capacity=2, window=60, max_keys=50), DatabaseLimiter(capacity=2, window=60)
+    a.attempt('k', now=100); b.attempt('k', now=101)
+    assert a.check('k', now=102)[0] and b.check('k', now=102)[0]
+    for i in range(200):
+        a.attempt(f'flood{i}', now=200 + i)
+    a.prune(now=400)
+    # 'k' refilled long ago and went first; the flood is capped at max_keys
+    assert LoginAttemptDB.query.count() == 50 and db.session.get(LoginAttemptDB, 'k') is None
+    m = MemoryLimiter(max_keys=50)
+    for i in range(200):
+        m.attempt(f'flood{i}')
+    assert len(m) == 50
+
+def test_login_route_locks_out_after_failures(client):
+    db.session.add(UserDB(id='u1', username='victim', password_hash=generate_password_hash('Right1!x')))
+    db.session.commit()
+    for _ in range(5):
+        assert 'Invalid username' in client.post('/login', data={'username': 'victim', 'password': 'wrong'}).get_data(as_text=True)
+    r = client.post('/login', data={'username': 'Victim', 'password': 'Right1!x'})
+    assert r.status_code == 200 and 'Too many login attempts' in r.get_data(as_text=True)
+    assert db.session.get(LoginAttemptDB, '127.0.0.1|victim') is not None
+
+def test_attempts_are_spent_before_the_password_is_checked(client, monkeypatch):
+    import app as app_module
+    db.session.add(UserDB(id='u1', username='victim', password_hash=generate_password_hash('Right1!x')))
+    db.session.commit()
+    verified = []
+    def verify(password_hash, password):
+        # Every guess in flight already holds its token
+        verified.append(db.session.get(LoginAttemptDB, '127.0.0.1|victim').tokens)
+        return password == 'Right1!x'
+    monkeypatch.setattr(app_module.hasher, 'verify', verify)
+    client.post('/login', data={'username': 'victim', 'password': 'Right1!x'})
+    assert verified == [4] and db.session.get(LoginAttemptDB, '127.0.0.1|victim').tokens == 5
+    for _ in range(6):
+        client.post('/login', data={'username': 'victim', 'password': 'wrong'})
+    assert len(verified) == 6  # the sixth guess was refused without hashing
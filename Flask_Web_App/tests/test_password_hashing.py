@@ -0,0 +1,97 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = UserDB = None  # placeholders
+try:
+    from app import app, db, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        UserDB = module.UserDB
+    else:
+        raise
+import threading
+from werkzeug.security import generate_password_hash
+import password_hashing
+from password_hashing import PasswordHasher, HashBusy, hash_method, full_method
+
+@pytest.fixture()
+def client(monkeypatch, fresh_db):
+    # Cheap cost so the tests stay fast
+    monkeypatch.setattr(password_hashing.hasher, 'method', 'scrypt:1024:8:1')
+    yield fresh_db.test_client()
+
+def test_pool_sheds_load_beyond_its_queue():
+    h = PasswordHasher(method='scrypt:1024:8:1', workers=1, queue_size=0)
+    started, release = threading.Event(), threading.Event()
+    t = threading.Thread(target=h._run, args=(lambda: (started.set(), release.wait()),))
+    t.start(); started.wait()
+    try:
+        with pytest.raises(HashBusy):
+            h.hash('Another1!')
+    finally:
+        release.set(); t.join()
+    digest = h.hash('Another1!')
+    assert hash_method(digest) == 'scrypt:1024:8:1' and h.verify(digest, 'Another1!') and not h.verify(digest, 'nope')
+    assert h.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:1000')) and not h.needs_rehash(digest)
+    h.shutdown()
+
+def test_fresh_hashes_do_not_need_rehash():
+    for method in ('scrypt', 'scrypt:1024:8:1', 'pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000'):
+        h = PasswordHasher(method=method, workers=0)
+        assert not h.needs_rehash(generate_password_hash('x', method)), method
+    assert full_method('scrypt') == 'scrypt:32768:8:1'
+    assert PasswordHasher(method='scrypt', workers=0).needs_rehash(generate_password_hash('x', 'scrypt:1024:8:1'))
+
+def test_default_queue_is_short(monkeypatch):
+    # Each queued login holds a web thread, so only a couple may wait
+    monkeypatch.delenv('PASSWORD_HASH_QUEUE', raising=False)
+    assert PasswordHasher.from_env().queue_size <= 2
+    monkeypatch.setenv('PASSWORD_HASH_QUEUE', '0')
+    assert PasswordHasher.from_env().queue_size == 0
+
+def test_login_upgrades_old_hashes(client):
+    old = generate_password_hash('Legacy1!x', 'pbkdf2:sha256:1000')
+    db.session.add(UserDB(id='u1', username='old', password_hash=old)); db.session.commit()
+    assert client.post('/login', data={'username': 'old', 'password': 'Legacy1!x'}).status_code == 302
+    upgraded = db.session.get(UserDB, 'u1').password_hash
+    assert hash_method(upgraded) == 'scrypt:1024:8:1'
+    client.get('/logout')
+    # An up to date hash signs in from the cached principal without loading the row
+    from sqlalchemy import event
+    statements = []
+    def record(conn, cursor, statement, *a):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.post('/login', data={'username': 'old', 'password': 'Legacy1!x'}).status_code == 302
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert not [s for s in statements if 'FROM users' in s]
+    assert db.session.get(UserDB, 'u1').password_hash == upgraded
+
+def test_busy_hasher_answers_503(client, monkeypatch):
+    db.session.add(UserDB(id='u1', username='someone', password_hash='x')); db.session.commit()
+    def busy(*a):
+        raise HashBusy('full')
+    monkeypatch.setattr(password_hashing.hasher, '_run', busy)
+    r = client.post('/login', data={'username': 'someone', 'password': 'whatever'})
+    assert r.status_code == 503 and r.headers['Retry-After'] == '2'
+
+def test_busy_hasher_does_not_spend_login_attempts(client, monkeypatch):
+    from login_limiter import limiter, limiter_key, LOGIN_RATE_LIMIT_MAX
+    db.session.add(UserDB(id='u1', username='someone', password_hash='x')); db.session.commit()
+    def busy(*a):
+        raise HashBusy('full')
+    monkeypatch.setattr(password_hashing.hasher, '_run', busy)
+    for _ in range(LOGIN_RATE_LIMIT_MAX + 2):
+        assert client.post('/login', data={'username': 'someone', 'password': 'whatever'}).status_code == 503
+    assert limiter.check(limiter_key('127.0.0.1', 'someone')) == (False, 0)
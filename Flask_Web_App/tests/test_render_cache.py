@@ -0,0 +1,31 @@
+import sys, pathlib
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+from render_cache import RenderCache, render_key, tasks_fingerprint
+
+def test_fingerprint_ignores_non_gantt_fields():
+    a = [{'id': 1, 'name': 'A', 'start': '2025-01-01', 'notes': 'x'}]
+    b = [{'id': 1, 'name': 'A', 'start': '2025-01-01', 'notes': 'changed'}]
+    c = [{'id': 1, 'name': 'A', 'start': '2025-01-02', 'notes': 'x'}]
+    assert tasks_fingerprint(a) == tasks_fingerprint(b) != tasks_fingerprint(c)
+    assert render_key('png', 'abc', True) == render_key('png', 'abc', True) != render_key('png', 'abc', False)
+
+def test_lru_spills_to_disk_and_reloads(tmp_path):
+    cache = RenderCache(max_entries=2, directory=str(tmp_path))
+    for k in ('k1', 'k2', 'k3'):
+        cache.put(k, k.encode())
+    # k1 was evicted from memory but is served back from disk
+    assert (tmp_path / 'k1.bin').exists()
+    assert cache.get('k1') == b'k1'
+    calls = []
+    assert cache.get_or_render('k3', lambda: calls.append(1) or b'new') == b'k3'
+    assert cache.get_or_render('k4', lambda: calls.append(1) or b'k4') == b'k4'
+    assert calls == [1]
+
+def test_memory_bound_by_bytes():
+    cache = RenderCache(max_entries=10, max_bytes=10)
+    cache.put('a', b'123456')
+    cache.put('b', b'123456')
+    assert cache.get('a') is None and cache.get('b') == b'123456'
@@ -0,0 +1,95 @@
+import os, sys, pathlib, threading, time, pytest
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+from gantt_render import render_gantt_png, render_gantt_export
+from render_pool import RenderPool, RenderBusy, RenderTimeout, BrokenProcessPool
+
+TASKS = [
+    {'id': 1, 'name': 'A', 'phase': 'Design', 'start': '2025-01-01', 'duration': '3', 'percent_complete': '50'},
+    {'id': 2, 'name': 'B', 'phase': 'Design', 'start': '2025-01-04', 'duration': '2', 'depends_on': 'A'},
+    {'id': 3, 'name': 'X', 'phase': 'Design', 'start': '2025-01-02', 'duration': '1', 'external_item': True},
+]
+
+def test_figure_api_renderers():
+    assert render_gantt_png(TASKS).startswith(b'\x89PNG')
+    assert render_gantt_png(TASKS, hide_external=True) != render_gantt_png(TASKS)
+    assert render_gantt_export(TASKS, 'pdf').startswith(b'%PDF')
+
+def test_inline_pool_rejects_when_full():
+    pool = RenderPool(workers=0, queue_size=0)
+    started, release = threading.Event(), threading.Event()
+    def slow():
+        started.set(); release.wait(5); return b'ok'
+    t = threading.Thread(target=pool.run, args=(slow,))
+    t.start(); started.wait(5)
+    with pytest.raises(RenderBusy):
+        pool.run(lambda: b'second')
+    release.set(); t.join()
+    assert pool.run(lambda: b'again') == b'again'
+
+def test_process_pool_renders_and_times_out():
+    pool = RenderPool(workers=1, queue_size=1, timeout=60)
+    try:
+        assert pool.run(render_gantt_png, TASKS).startswith(b'\x89PNG')
+        pool.timeout = 0.5
+        with pytest.raises(RenderTimeout):
+            pool.run(time.sleep, 30)
+        # A fresh worker replaces the killed one
+        pool.timeout = 60
+        assert pool.run(render_gantt_export, TASKS, 'png').startswith(b'\x89PNG')
+    finally:
+        pool.shutdown()
+
+def test_timeout_lets_other_renders_finish():
+    pool = RenderPool(workers=2, queue_size=2, timeout=3)
+    try:
+        # Start both workers first so spawn time does not count against the renders
+        warm = [threading.Thread(target=pool.run, args=(time.sleep, 0.5)) for _ in range(2)]
+        for t in warm: t.start()
+        for t in warm: t.join()
+        results = []
+        def hang():
+            with pytest.raises(RenderTimeout):
+                pool.run(time.sleep, 30)
+        hung = threading.Thread(target=hang)
+        hung.start(); time.sleep(1.5)
+        # Still running on the old pool when the hung render is given up on
+        t = threading.Thread(target=lambda: results.append(pool.run(time.sleep, 2.5) or 'done'))
+        t.start(); hung.join(); t.join()
+        assert results == ['done']
+        assert pool.run(render_gantt_export, TASKS, 'png').startswith(b'\x89PNG')
+    finally:
+        pool.shutdown()
+
+def test_queue_wait_does_not_count_against_the_timeout():
+    pool = RenderPool(workers=1, queue_size=2, timeout=1.5, queue_timeout=10)
+    try:
+        pool.run(time.sleep, 0)  # start the worker
+        first = threading.Thread(target=pool.run, args=(time.sleep, 1))
+        first.start(); time.sleep(0.2)
+        # Queued for ~0.8s behind the first, then runs 1s: done in time once started
+        assert pool.run(time.sleep, 1) is None
+        first.join()
+        workers = pool._current
+        pool.queue_timeout = 0.3
+        first = threading.Thread(target=pool.run, args=(time.sleep, 1))
+        first.start(); time.sleep(0.2)
+        with pytest.raises(RenderBusy):
+            pool.run(time.sleep, 0)
+        first.join()
+        # Waiting too long to start is load, not a hang: the pool was kept
+        assert pool._current is workers
+        assert pool.run(render_gantt_png, TASKS).startswith(b'\x89PNG')
+    finally:
+        pool.shutdown()
+
+def test_dead_worker_raises_broken_pool_then_recovers():
+    pool = RenderPool(workers=1, queue_size=1, timeout=60)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.run(os._exit, 1)
+        assert pool.run(render_gantt_png, TASKS).startswith(b'\x89PNG')
+    finally:
+        pool.shutdown()
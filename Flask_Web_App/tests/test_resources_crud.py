@@ -28,12 +28,8 @@ def _seed_user(uid='uR', name='resuser'):
     return uid
 
 @pytest.fixture()
-def client():
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    with app.app_context():
-        db.drop_all(); db.create_all()
-        yield app.test_client()
+def client(fresh_db):
+    yield fresh_db.test_client()
 
 def test_contact_crud(client):
     with app.app_context():
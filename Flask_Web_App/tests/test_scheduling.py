@@ -0,0 +1,74 @@
+import sys, pathlib, time, pytest
+from datetime import datetime
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+from scheduling import critical_path, schedule_tasks, propagate, dependency_names, CycleError
+
+def test_forward_backward_pass():
+    # 0 -> 1 -> 3 and 0 -> 2 -> 3 ; the 2-branch has 3 days of slack
+    s = critical_path([2, 5, 2, 1], [(0, 1), (0, 2), (1, 3), (2, 3)])
+    assert s.early_start == [0, 2, 2, 7]
+    assert s.late_start == [0, 2, 5, 7]
+    assert s.total_float == [0, 0, 3, 0]
+    assert s.free_float == [0, 0, 3, 0]
+    assert s.critical == [0, 1, 3]
+    assert s.finish == 8
+
+def test_cycle_detected():
+    with pytest.raises(CycleError) as exc:
+        critical_path([1, 1, 1], [(0, 1), (1, 2), (2, 1)])
+    assert sorted(exc.value.nodes) == [1, 2]
+
+def test_schedule_tasks_uses_names_and_start_dates():
+    tasks = [
+        {'name': 'A', 'start': '2025-01-01', 'duration': '3'},
+        {'name': 'B', 'start': '2025-01-04', 'duration': '2', 'depends_on': 'A'},
+        {'name': 'C', 'start': datetime(2025, 1, 1), 'duration': '1'},
+        {'name': 'M', 'start': '2025-01-06', 'duration': '4', 'milestone': 'Yes', 'depends_on': 'B, missing'},
+    ]
+    rows = schedule_tasks(tasks)
+    assert [r.critical for r in rows] == [True, True, False, True]
+    assert rows[2].total_float == 4
+    assert rows[3].early_start == rows[3].early_finish == 5
+
+def test_long_chain_is_fast():
+    n = 100000
+    tasks = [{'name': f't{i}', 'start': '2025-01-01', 'duration': '1', 'depends_on': f't{i-1}' if i else ''}
+             for i in range(n)]
+    t0 = time.perf_counter()
+    rows = schedule_tasks(tasks)
+    assert time.perf_counter() - t0 < 5  # generous for slow CI; ~0.5s locally
+    assert rows[-1].early_finish == n and all(r.critical for r in rows)
+
+def _graph(tasks):
+    by_name = {t['name']: t for t in tasks}
+    deps = lambda t: [d for d in tasks if t['name'] in dependency_names(d.get('depends_on'))]
+    preds = lambda t: [by_name[n] for n in dependency_names(t.get('depends_on')) if n in by_name]
+    return deps, preds
+
+def test_propagate_shifts_downstream_only():
+    a = {'name': 'A', 'start': '2025-01-01', 'duration': '2'}
+    b = {'name': 'B', 'start': '2025-01-03', 'duration': '2', 'depends_on': 'A'}
+    c = {'name': 'C', 'start': '2025-01-05', 'duration': '1', 'depends_on': 'B'}
+    d = {'name': 'D', 'start': '2025-01-20', 'duration': '1', 'depends_on': 'A'}
+    other = {'name': 'X', 'start': '2025-01-01', 'duration': '1'}
+    tasks = [a, b, c, d, other]
+    calls = []
+    deps, preds = _graph(tasks)
+    def tracked(t):
+        calls.append(t['name'])
+        return deps(t)
+    moves = propagate([(a, {'duration': '5'})], tracked, preds)
+    assert [(t['name'], s.isoformat()) for t, s in moves] == [('B', '2025-01-06'), ('C', '2025-01-08')]
+    assert 'X' not in calls  # unrelated rows are never visited
+    assert a['duration'] == '2' and b['start'] == '2025-01-03'  # inputs untouched
+
+def test_propagate_rejects_cycles_before_moving():
+    a = {'name': 'A', 'start': '2025-01-01', 'duration': '2', 'depends_on': 'B'}
+    b = {'name': 'B', 'start': '2025-01-01', 'duration': '2', 'depends_on': 'A'}
+    deps, preds = _graph([a, b])
+    with pytest.raises(CycleError) as exc:
+        propagate([], deps, preds, sources=[a])
+    assert {t['name'] for t in exc.value.nodes} == {'A', 'B'}
@@ -0,0 +1,170 @@
+import os, sys, io, json, zipfile, importlib.util, pathlib, pytest
+
+app = db = ItemDB = UserDB = None  # placeholders
+try:
+    from app import app, db, ItemDB, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        ItemDB = module.ItemDB
+        UserDB = module.UserDB
+    else:
+        raise
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch, fresh_db):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'UPLOAD_FOLDER', str(tmp_path))
+    db.session.add_all([UserDB(id='u1', username='u1', password_hash='x', is_admin=True)])
+    db.session.commit()
+    c = fresh_db.test_client()
+    with c.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    yield c
+
+def bundle(client, url):
+    r = client.get(url)
+    assert r.status_code == 200, r.data
+    zf = zipfile.ZipFile(io.BytesIO(r.data))
+    meta = json.loads(zf.read('snapshot.json'))
+    assert meta['snapshot'] == int(r.headers['X-Snapshot-Id'])
+    return r.data, zf, meta
+
+def test_diff_bundles_carry_only_changes_and_restore(client, tmp_path):
+    (tmp_path / 'a.png').write_bytes(b'\x89PNG' + b'a' * 500)
+    (tmp_path / 'b.txt').write_text('first')
+    a = ItemDB(name='A', user_id='u1', attachments='a.png')
+    b = ItemDB(name='B', user_id='u1', attachments='b.txt')
+    gone = ItemDB(name='Gone', user_id='u1')
+    db.session.add_all([a, b, gone]); db.session.commit()
+    full, zf, meta = bundle(client, '/download_project_zip')
+    assert meta['base'] is None and sorted(zf.namelist()) == ['attachments/a.png', 'attachments/b.txt', 'project.json', 'snapshot.json']
+    first = meta['snapshot']
+
+    b.notes = 'edited'; db.session.delete(gone)
+    c = ItemDB(name='C', user_id='u1', attachments='c.txt')
+    db.session.add(c); db.session.commit()
+    (tmp_path / 'c.txt').write_text('new file')
+    os.utime(tmp_path / 'b.txt', ns=(0, 0))  # touched: re-sent although the bytes match
+    diff1, zf, meta = bundle(client, f'/download_project_zip?since={first}')
+    assert meta['base'] == first and meta['deleted'] == [gone.id]
+    assert [t['name'] for t in json.loads(zf.read('project.json'))] == ['B', 'C']
+    assert sorted(zf.namelist()) == ['attachments/b.txt', 'attachments/c.txt', 'project.json', 'snapshot.json']
+
+    diff2, zf, meta = bundle(client, f'/download_project_zip?since={meta["snapshot"]}')
+    assert json.loads(zf.read('project.json')) == [] and zf.namelist() == ['project.json', 'snapshot.json']
+    r = client.get(f'/download_project?since={first}')
+    assert [t['name'] for t in r.json['items']] == ['B', 'C'] and r.json['deleted'] == [gone.id]
+    assert client.get('/download_project_zip?since=999').status_code == 400
+
+    # Restore the chain into an empty database and upload folder
+    db.session.query(ItemDB).delete(); db.session.commit()
+    for f in ('a.png', 'b.txt', 'c.txt'):
+        (tmp_path / f).unlink()
+    files = [(io.BytesIO(data), f'bundle{i}.zip') for i, data in enumerate((full, diff1, diff2))]
+    r = client.post('/admin/restore', data={'bundles': files}, content_type='multipart/form-data')
+    assert r.status_code == 200, r.json
+    assert sorted((i.name, i.notes) for i in ItemDB.query) == [('A', ''), ('B', 'edited'), ('C', '')]
+    assert (tmp_path / 'c.txt').read_text() == 'new file' and (tmp_path / 'a.png').exists()
+
+def test_exports_need_a_login(client):
+    from db import SnapshotDB
+    anon = app.test_client()
+    for url in ('/download_project', '/download_project_zip'):
+        assert anon.get(url).status_code == 302
+    assert SnapshotDB.query.count() == 0
+
+def test_restore_rejects_broken_chains(client):
+    db.session.add(ItemDB(name='A', user_id='u1')); db.session.commit()
+    full, _, meta = bundle(client, '/download_project_zip')
+    _, _, other = bundle(client, '/download_project_zip')
+    diff, _, _ = bundle(client, f'/download_project_zip?since={other["snapshot"]}')
+    for chain in ([diff], [full, diff]):
+        files = [(io.BytesIO(data), f'b{i}.zip') for i, data in enumerate(chain)]
+        r = client.post('/admin/restore', data={'bundles': files}, content_type='multipart/form-data')
+        assert r.status_code == 400
+    assert [i.name for i in ItemDB.query] == ['A']
+
+def test_restore_stages_files_and_applies_removals(client, tmp_path, monkeypatch):
+    (tmp_path / 'a.png').write_bytes(b'\x89PNG' + b'a' * 100)
+    a = ItemDB(name='A', user_id='u1', attachments='a.png')
+    db.session.add(a); db.session.commit()
+    full, _, meta = bundle(client, '/download_project_zip')
+    a.attachments = ''; db.session.commit()
+    diff, _, diff_meta = bundle(client, f'/download_project_zip?since={meta["snapshot"]}')
+    assert diff_meta['removed_attachments'] == ['a.png']
+    chain = lambda: [(io.BytesIO(data), f'b{i}.zip') for i, data in enumerate((full, diff))]
+
+    # A failing commit leaves the upload folder as it was
+    (tmp_path / 'a.png').unlink()
+    def boom():
+        raise RuntimeError('disk full')
+    with monkeypatch.context() as m:
+        m.setattr(db.session, 'commit', boom)
+        r = client.post('/admin/restore', data={'bundles': chain()}, content_type='multipart/form-data')
+    assert r.status_code == 500 and os.listdir(tmp_path) == []
+
+    (tmp_path / 'a.png').write_bytes(b'stale')
+    r = client.post('/admin/restore', data={'bundles': chain()}, content_type='multipart/form-data')
+    assert r.status_code == 200, r.json
+    assert os.listdir(tmp_path) == []
+
+def test_restore_rejects_malformed_rows(client, tmp_path):
+    db.session.add(ItemDB(name='Keep', user_id='u1')); db.session.commit()
+    for rows in ([{'id': 1}], ['oops'], [{'id': 'x', 'name': 'A'}], {'items': 'nope'}):
+        data = json.dumps(rows).encode()
+        r = client.post('/admin/restore', data={'bundles': [(io.BytesIO(data), 'p.json')]},
+                        content_type='multipart/form-data')
+        assert r.status_code == 400, rows
+    assert [i.name for i in ItemDB.query] == ['Keep']
+
+def test_bundle_is_taken_when_the_download_starts(client, tmp_path):
+    (tmp_path / 'a.png').write_bytes(b'\x89PNG' + b'a' * 100)
+    a = ItemDB(name='A', user_id='u1', attachments='a.png')
+    db.session.add(a); db.session.commit()
+    r = client.get('/download_project_zip', buffered=False)
+    a.name, a.attachments = 'Renamed', ''
+    db.session.add(ItemDB(name='Late', user_id='u1')); db.session.commit()
+    assert client.get('/download_project').status_code == 200  # moves the task cache on
+    zf = zipfile.ZipFile(io.BytesIO(b''.join(r.response)))
+    meta = json.loads(zf.read('snapshot.json'))
+    from db import SnapshotDB
+    assert meta['version'] == db.session.get(SnapshotDB, meta['snapshot']).version
+    assert [t['name'] for t in json.loads(zf.read('project.json'))] == ['A']
+    assert 'attachments/a.png' in zf.namelist()
+
+def test_json_exports_chain_into_a_restore(client):
+    a = ItemDB(name='A', user_id='u1')
+    gone = ItemDB(name='Gone', user_id='u1')
+    db.session.add_all([a, gone]); db.session.commit()
+    full = client.get('/download_project')
+    assert full.json['base'] is None and full.json['snapshot'] == int(full.headers['X-Snapshot-Id'])
+    assert [t['name'] for t in full.json['items']] == ['A', 'Gone']
+    a.notes = 'edited'; db.session.delete(gone)
+    db.session.add(ItemDB(name='B', user_id='u1')); db.session.commit()
+    diff = client.get(f'/download_project?since={full.json["snapshot"]}')
+    assert diff.json['base'] == full.json['snapshot']
+
+    db.session.query(ItemDB).delete(); db.session.commit()
+    files = [(io.BytesIO(r.data), f'p{i}.json') for i, r in enumerate((full, diff))]
+    r = client.post('/admin/restore', data={'bundles': files}, content_type='multipart/form-data')
+    assert r.status_code == 200, r.json
+    assert sorted((i.name, i.notes) for i in ItemDB.query) == [('A', 'edited'), ('B', '')]
+    # Plain item lists from older exports still restore as a full export
+    legacy = json.dumps([{'id': 7, 'name': 'Old', 'user_id': 'u1'}]).encode()
+    r = client.post('/admin/restore', data={'bundles': [(io.BytesIO(legacy), 'old.json')]},
+                    content_type='multipart/form-data')
+    assert r.status_code == 200 and [i.name for i in ItemDB.query] == ['Old']
+    # The index page's "Load Project" takes the new export shape too
+    r = client.post('/', data={'project_upload': (io.BytesIO(full.data), 'project.json')},
+                    content_type='multipart/form-data')
+    assert r.status_code == 302 and sorted(i.name for i in ItemDB.query) == ['A', 'Gone', 'Old']
@@ -0,0 +1,46 @@
+import sys, json, pathlib
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+from task_record import TaskRecord, KEYS
+
+class _Row:
+    # Minimal stand-in for an ItemDB row
+    def __init__(self, **kw):
+        for k in ('user_id', 'phase', 'start', 'duration', 'responsible', 'status', 'percent_complete',
+                  'milestone', 'parent', 'depends_on', 'resources', 'notes', 'pdf_page', 'pdf_file',
+                  'document_links', 'attachments', 'shared_with'):
+            setattr(self, k, None)
+        self.external_item = False
+        self.external_milestone = False
+        for k, v in kw.items():
+            setattr(self, k, v)
+
+def test_record_matches_legacy_dict_shape():
+    rec = TaskRecord.from_item(_Row(id=1, name='A', start='2025-01-01', attachments='a.pdf,,b.pdf', external_item=True))
+    assert not hasattr(rec, '__dict__')
+    d = dict(rec)
+    assert tuple(d) == KEYS
+    assert d['status'] == 'Not Started' and d['percent_complete'] == '0'
+    assert d['attachments'] == ['a.pdf', 'b.pdf'] and d['shared_with'] == []
+    assert d['external_task'] is True
+    json.dumps(d)
+
+def test_lazy_lists_and_interning():
+    a = TaskRecord.from_item(_Row(id=1, name='A', status=''.join(['In ', 'Progress']), attachments='x.pdf'))
+    b = TaskRecord.from_item(_Row(id=2, name='B', status='In Progress'))
+    assert a['status'] is b['status']
+    # Lists are materialized once so in-place edits persist
+    a['attachments'].remove('x.pdf')
+    assert a.get('attachments') == []
+
+def test_mutable_mapping_behaviour():
+    rec = TaskRecord({'id': 3, 'name': 'C', 'shared_with': ['u1']})
+    rec['color'] = '#fff'
+    assert rec['color'] == '#fff' and 'color' in rec
+    assert rec.get('missing', 'x') == 'x'
+    rec['name'] = 'C2'
+    assert rec.name == 'C2'
+    del rec['color']
+    assert 'color' not in rec and len(rec) == len(KEYS)
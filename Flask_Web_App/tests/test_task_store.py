@@ -0,0 +1,51 @@
+import sys, pathlib
+
+project_root = pathlib.Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+from task_store import TaskStore
+
+def _task(tid, name, user='u1', phase='P1', parent=None, depends_on='', shared=None):
+    return {'id': tid, 'name': name, 'user_id': user, 'phase': phase, 'parent': parent,
+            'depends_on': depends_on, 'shared_with': shared or []}
+
+def test_indexes_follow_insert_update_delete():
+    store = TaskStore([_task(1, 'A'), _task(2, 'B', depends_on='A', parent='A'), _task(3, 'C', user='u2', shared=['u1'])])
+    assert store.get(2)['name'] == 'B'
+    assert store.first_by_name('A')['id'] == 1
+    assert [t['id'] for t in store.dependents_of('A')] == [2]
+    assert [t['id'] for t in store.children_of('A')] == [2]
+    assert [t['id'] for t in store.visible_to('u1')] == [1, 2, 3]
+    assert [t['id'] for t in store.by_user('u2')] == [3]
+    # Update moves the task between buckets
+    store.upsert(_task(2, 'B2', phase='P2'))
+    assert store.first_by_name('B') is None
+    assert store.dependents_of('A') == []
+    assert [t['id'] for t in store.by_phase('P2')] == [2]
+    assert [t['name'] for t in store] == ['A', 'B2', 'C']
+    # Delete clears every index
+    store.remove(3)
+    assert store.shared_with('u1') == []
+    assert store.get(3) is None and len(store) == 2
+
+def test_dependents_of_splits_comma_separated_names():
+    store = TaskStore([_task(1, 'A'), _task(2, 'B'), _task(3, 'C', depends_on='A, B'), _task(4, 'D', depends_on='B')])
+    assert [t['id'] for t in store.dependents_of('A')] == [3]
+    assert [t['id'] for t in store.dependents_of('B')] == [3, 4]
+    store.upsert(_task(3, 'C', depends_on='A'))
+    assert [t['id'] for t in store.dependents_of('B')] == [4]
+    assert store.dependents_of('A, B') == []
+
+def test_upsert_keeps_id_order_and_list_compat():
+    store = TaskStore()
+    store.upsert(_task(5, 'E'))
+    store.upsert(_task(2, 'B'))
+    store.upsert(_task(9, 'I'))
+    assert [t['id'] for t in store] == [2, 5, 9]
+    assert store[1]['name'] == 'E'
+    store[1] = _task(5, 'E2')
+    assert store.first_by_name('E') is None and store.get(5)['name'] == 'E2'
+    popped = store.pop(0)
+    assert popped['id'] == 2 and store.get(2) is None
+    store.clear()
+    assert len(store) == 0 and store.by_user('u1') == []
@@ -0,0 +1,157 @@
+import os, sys, importlib.util, pathlib, pytest
+
+app = db = UserDB = None  # placeholders
+try:
+    from app import app, db, UserDB  # type: ignore
+except ModuleNotFoundError:
+    project_root = pathlib.Path(__file__).parent.parent
+    app_path = project_root / 'app.py'
+    if app_path.exists():
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+        spec = importlib.util.spec_from_file_location('app', str(app_path))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        assert spec and spec.loader
+        spec.loader.exec_module(module)  # type: ignore
+        app = module.app
+        db = module.db
+        UserDB = module.UserDB
+    else:
+        raise
+from werkzeug.security import generate_password_hash
+from user_directory import UserDirectory
+
+@pytest.fixture()
+def client(fresh_db):
+    db.session.add(UserDB(id='admin', username='Admin', password_hash='x', is_admin=True))
+    db.session.commit()
+    yield fresh_db.test_client()
+
+def test_lookups_are_case_insensitive_and_bounded(client):
+    db.session.add_all([UserDB(id=f'u{i}', username=f'User{i}', password_hash='x') for i in range(20)])
+    db.session.commit()
+    d = UserDirectory(max_entries=5)
+    assert d.by_username('  user3 ')['id'] == 'u3' and d.get('u3')['username'] == 'User3'
+    assert d.by_username('nobody') is None and d.get('missing') is None
+    assert d.is_admin('admin') and not d.is_admin('u3') and not d.is_admin(None)
+    assert d.ids_for_usernames(['USER1', 'ghost', 'user2']) == ['u1', 'u2']
+    for i in range(20):
+        d.get(f'u{i}')
+    assert len(d) == 5
+    # Cached entries answer without touching the database
+    db.session.query(UserDB).filter_by(id='u19').delete(); db.session.commit()
+    assert d.by_username('user19')['id'] == 'u19'
+    d.invalidate()
+    assert d.by_username('user19') is None
+
+def test_username_lookup_uses_expression_index(client):
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT id FROM users WHERE lower(username) = lower(:name)"), {'name': 'Admin'}).all()
+    assert any('ix_users_username_lower' in row[-1] for row in plan), plan
+
+def test_routes_see_user_writes_from_other_workers(client):
+    import app as app_module
+    from werkzeug.security import generate_password_hash
+    from user_directory import revoke_sessions
+    r = client.post('/register', data={'username': 'Newbie', 'password': 'GoodPass1!'})
+    assert r.status_code == 302
+    assert client.post('/register', data={'username': 'NEWBIE', 'password': 'GoodPass1!'}).status_code == 200
+    # Another process changes the password behind this worker's cache
+    client.post('/login', data={'username': 'newbie', 'password': 'GoodPass1!'})
+    client.get('/logout')
+    rec = UserDB.query.filter_by(username='Newbie').one()
+    rec.password_hash = generate_password_hash('Changed1!'); revoke_sessions(rec); db.session.commit()
+    r = client.post('/login', data={'username': 'newbie', 'password': 'Changed1!'})
+    assert r.status_code == 302 and r.headers['Location'].endswith('/tasks')
+    assert [u['username'] for u in app_module.all_users()] == ['Admin', 'Newbie']
+
+def test_reset_tokens_are_stored_hashed_and_swept(client):
+    import re, reset_tokens
+    from reset_tokens import token_digest, sweep_expired
+    db.session.add(UserDB(id='u1', username='Forgetful', password_hash='x')); db.session.commit()
+    page = client.post('/forgot', data={'username': 'forgetful'}).get_data(as_text=True)
+    rec = db.session.get(UserDB, 'u1')
+    token = next(t for t in re.findall(r'[\w-]{43}', page) if token_digest(t) == rec.reset_token)
+    assert rec.reset_token != token
+    assert client.get('/reset/' + rec.reset_token).get_data(as_text=True).count('Invalid or expired') == 1
+    r = client.post('/reset/' + token, data={'password': 'NewPass1!', 'confirm_password': 'NewPass1!'})
+    assert r.status_code == 302 and rec.reset_token is None
+    assert client.post('/login', data={'username': 'forgetful', 'password': 'NewPass1!'}).status_code == 302
+    # Expired tokens stop working and are cleared by the sweep
+    stale = reset_tokens.issue_reset_token(rec, now=1000.0); db.session.commit()
+    assert reset_tokens.find_user_by_reset_token(stale) is None
+    assert sweep_expired() == 1 and rec.reset_token is None and rec.reset_expires is None
+
+def get(client, url):
+    from flask import g
+    # The fixture's app context is reused by every request, so drop the user
+    # Flask-Login memoized in g to make each request load its own principal
+    g.pop('_login_user', None)
+    return client.get(url)
+
+def user_queries(fn):
+    from sqlalchemy import event
+    seen = []
+    def count(conn, cursor, statement, *args):
+        if 'FROM users' in statement:
+            seen.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return len(seen)
+
+def test_authenticated_requests_skip_user_queries(client):
+    from user_directory import UserDirectory
+    db.session.add(UserDB(id='u1', username='Busy', password_hash='x')); db.session.commit()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = 'u1'
+    get(client, '/api/items')  # first request loads the principal
+    assert user_queries(lambda: [get(client, '/api/items') for _ in range(5)]) == 0
+    d = UserDirectory(ttl=0)
+    d.get('u1')
+    assert user_queries(lambda: d.get('u1')) == 1  # expired entries are reloaded
+
+def test_admin_changes_revoke_existing_sessions(client):
+    import password_hashing
+    password_hashing.hasher.method = 'scrypt:1024:8:1'
+    try:
+        db.session.add(UserDB(id='u1', username='member', password_hash=password_hashing.hasher.hash('Member1!x')))
+        db.session.commit()
+        member, admin = app.test_client(), app.test_client()
+        assert member.post('/login', data={'username': 'member', 'password': 'Member1!x'}).status_code == 302
+        with member.session_transaction() as sess:
+            assert sess['auth_version'] == 0
+        assert get(member, '/api/items').status_code == 200
+        with admin.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+        from flask import g
+        g.pop('_login_user', None)
+        r = admin.post('/admin/reset_password', json={'user_id': 'u1', 'new_password': 'Fresh1!x'})
+        assert r.status_code == 200 and r.json['success'], (r.status_code, r.headers.get('Location'))
+        assert get(member, '/api/items').status_code in (302, 401)
+        assert member.post('/login', data={'username': 'member', 'password': 'Fresh1!x'}).status_code == 302
+        assert get(member, '/api/items').status_code == 200
+    finally:
+        password_hashing.hasher.method = password_hashing.DEFAULT_METHOD
+
+def test_only_principal_changes_move_the_users_generation(client):
+    import reset_tokens
+    from cache_sync import current_generations
+    from password_hashing import rehash_if_needed
+    from user_directory import revoke_sessions
+    generation = lambda: current_generations()['users']
+    rec = db.session.get(UserDB, 'admin')
+    start = generation()
+    reset_tokens.issue_reset_token(rec); db.session.commit()
+    reset_tokens.clear_reset_token(rec); db.session.commit()
+    reset_tokens.issue_reset_token(rec, now=1000.0); db.session.commit()
+    reset_tokens.sweep_expired()
+    rehash_if_needed(rec, 'whatever'); db.session.commit()
+    assert generation() == start
+    for change in (lambda: setattr(rec, 'username', 'Boss'), lambda: setattr(rec, 'is_admin', False),
+                   lambda: revoke_sessions(rec), lambda: db.session.delete(rec)):
+        change(); db.session.commit()
+        assert generation() == start + 1
+        start += 1
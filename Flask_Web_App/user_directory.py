@@ -0,0 +1,157 @@
+"""Indexed user lookups for login, registration, sharing and admin checks.
+
+The routes used to scan the module level ``users`` list (and auth_bp pulled
+``UserDB.query.all()`` on every login). ``UserDirectory`` instead answers by
+primary key or by case-folded username, the latter through the functional
+index ``ix_users_username_lower``, and keeps recent answers in a bounded LRU.
+
+Entries have the same shape as the legacy ``users`` list dicts, minus the
+reset token columns. The cache is dropped whenever the ``users`` generation
+moves (app.py registers ``directory.invalidate`` with ``cache_sync``), so
+renames, admin flag changes, deletions and password changes from any worker
+show up on the next request; entries also expire after ``ttl`` seconds. Reset
+token writes and password rehashes leave the generation alone (see
+``db.USER_CACHED_FIELDS``), so /forgot and logins do not empty every cache.
+
+The same cache backs Flask-Login's ``load_user`` (``principal``), so an
+authenticated request normally runs no user query at all. Logging in stamps
+the session with the account's ``auth_version``; promoting, demoting or
+changing the password bumps it (``revoke_sessions``) and every session holding
+the old stamp stops loading.
+"""
+import threading, time
+from collections import OrderedDict
+from flask import session
+from flask_login import UserMixin, login_user
+from db import db, UserDB
+
+MAX_CACHED_USERS = 4096
+PRINCIPAL_TTL = 300.0  # seconds a cached user is trusted without a generation change
+
+
+def user_dict(u):
+    return {
+        'id': u.id,
+        'username': u.username,
+        'password_hash': u.password_hash,
+        'is_admin': bool(u.is_admin),
+        'auth_version': u.auth_version or 0,
+    }
+
+
+class User(UserMixin):
+    def __init__(self, id, username, password_hash, is_admin=False):
+        self.id = id
+        self.username = username
+        self.password_hash = password_hash
+        self.is_admin = is_admin
+
+    @classmethod
+    def from_dict(cls, u):
+        return cls(u['id'], u['username'], u['password_hash'], u.get('is_admin', False))
+
+
+def sign_in(user):
+    """Log ``user`` (a directory dict) in and stamp the session with its auth_version."""
+    login_user(User.from_dict(user))
+    session['auth_version'] = user.get('auth_version', 0)
+
+
+def revoke_sessions(rec):
+    """Invalidate every existing session of UserDB row ``rec``; the caller commits."""
+    rec.auth_version = (rec.auth_version or 0) + 1
+
+
+def username_key(username):
+    return (username or '').strip().lower()
+
+
+class UserDirectory:
+    """LRU of user dicts keyed by id, with a case-folded username index.
+
+    Misses are not cached, so probing unknown names (failed logins, sign-up
+    checks) cannot crowd real accounts out of the cache.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_USERS, ttl=PRINCIPAL_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._by_id = OrderedDict()
+        self._by_name = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_name.clear()
+
+    def _remember(self, user):
+        user['cached_until'] = time.monotonic() + self.ttl
+        with self._lock:
+            old = self._by_id.pop(user['id'], None)
+            if old is not None:
+                self._by_name.pop(username_key(old['username']), None)
+            self._by_id[user['id']] = user
+            self._by_name[username_key(user['username'])] = user['id']
+            while len(self._by_id) > self.max_entries:
+                _, evicted = self._by_id.popitem(last=False)
+                self._by_name.pop(username_key(evicted['username']), None)
+        return user
+
+    def get(self, user_id):
+        """User dict for ``user_id`` or None."""
+        if user_id is None:
+            return None
+        user_id = str(user_id)
+        with self._lock:
+            user = self._by_id.get(user_id)
+            if user is not None and user['cached_until'] > time.monotonic():
+                self._by_id.move_to_end(user_id)
+                return user
+        rec = db.session.get(UserDB, user_id)
+        return self._remember(user_dict(rec)) if rec else None
+
+    def by_username(self, username):
+        """User dict whose username matches case-insensitively, or None."""
+        key = username_key(username)
+        if not key:
+            return None
+        with self._lock:
+            user_id = self._by_name.get(key)
+            user = self._by_id.get(user_id) if user_id is not None else None
+            if user is not None and user['cached_until'] > time.monotonic():
+                self._by_id.move_to_end(user_id)
+                return user
+        # Both sides go through SQL lower() so the expression index applies
+        rec = UserDB.query.filter(db.func.lower(UserDB.username) == db.func.lower(username.strip())).first()
+        return self._remember(user_dict(rec)) if rec else None
+
+    def refresh(self, rec):
+        """Re-cache UserDB row ``rec`` after a write that leaves the users generation alone (rehash)."""
+        return self._remember(user_dict(rec))
+
+    def principal(self, user_id, auth_version=0):
+        """Flask-Login user for ``user_id``, or None if gone or ``auth_version`` was revoked."""
+        user = self.get(user_id)
+        if user is None or user['auth_version'] != auth_version:
+            return None
+        return User.from_dict(user)
+
+    def is_admin(self, user_id):
+        user = self.get(user_id)
+        return bool(user and user['is_admin'])
+
+    def ids_for_usernames(self, usernames):
+        """Ids of the existing users among ``usernames`` (unknown names are skipped)."""
+        ids = []
+        for name in usernames:
+            user = self.by_username(name)
+            if user is not None:
+                ids.append(user['id'])
+        return ids
+
+
+directory = UserDirectory()
@@ -0,0 +1,84 @@
+"""Streaming ZIP archives for project bundle downloads.
+
+``zipfile`` writes to a sink that cannot seek, so every entry gets a data
+descriptor instead of a patched local header and bytes can leave as soon as
+they are compressed. Memory stays at one read chunk per entry regardless of
+archive size, and the first bytes go out before any attachment is opened.
+"""
+import os, time, zipfile
+
+READ_CHUNK = 1024 * 1024
+# Formats that are already compressed: deflating them again only burns CPU
+STORED_EXTENSIONS = frozenset({
+    '.pdf', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.heic', '.tif', '.tiff',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods',
+    '.mp3', '.mp4', '.mov', '.avi',
+})
+
+
+def compression_for(name):
+    """ZIP_STORED for already compressed file types, ZIP_DEFLATED for the rest."""
+    ext = os.path.splitext(name)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class _Sink:
+    # Write-only, unseekable target; the generator drains it after each write
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _chunks_of(source, chunk_size):
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source)
+    elif isinstance(source, str):
+        with open(source, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    else:
+        yield from source
+
+
+def stream_zip(entries, chunk_size=READ_CHUNK):
+    """Yield the bytes of a ZIP archive holding ``entries``.
+
+    ``entries`` are ``(arcname, source)`` pairs where ``source`` is bytes, a
+    file path, or an iterable of byte chunks, optionally followed by the
+    entry's mtime (file paths default to the file's own, the rest to now).
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w') as zf:
+        for arcname, source, *mtime in entries:
+            if mtime:
+                mtime = mtime[0]
+            else:
+                mtime = os.path.getmtime(source) if isinstance(source, str) else time.time()
+            # ZIP dates start in 1980; older mtimes are clamped like zipfile's strict_timestamps=False
+            info = zipfile.ZipInfo(arcname, date_time=max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+            info.compress_type = compression_for(arcname)
+            with zf.open(info, 'w', force_zip64=True) as dest:
+                for chunk in _chunks_of(source, chunk_size):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
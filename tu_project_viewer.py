@@ -1,3 +1,4 @@
+import os
 from PyQt5.QtWidgets import QStyledItemDelegate, QDateEdit
 
 # Delegate for Start Date column
@@ -38,6 +39,10 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
+# Scheduling is shared with the web app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Flask_Web_App'))
+from scheduling import schedule_tasks, propagate, dependency_names, CycleError
+
 def _safe_date(s):
     try:
         return datetime.strptime(s, '%Y-%m-%d')
@@ -114,41 +119,14 @@ class GanttChartWidget(QWidget):
                 colors.append('#FFB366')  # lighter orange
             else:
                 colors.append('#FFE0B2')  # even lighter
+        # Critical path via the shared CPM engine; dependencies name the
+        # un-indented task name
         try:
-            graph = {t['name']: [] for t in tasks}
-            for t in tasks:
-                dep = t.get('depends_on', '')
-                if dep and dep in name_to_idx:
-                    graph[dep].append(t['name'])
-
-            # Compute longest path to each node (dynamic programming)
-            longest = {}
-            pred = {}
-            def dfs(node):
-                if node in longest:
-                    return longest[node]
-                idx = name_to_idx[node]
-                maxlen = durations[idx]
-                maxpred = None
-                # Find all predecessors (tasks that this node depends on)
-                for prev in [t['name'] for t in tasks if node == t.get('depends_on', '')]:
-                    plen = dfs(prev) + durations[idx]
-                    if plen > maxlen:
-                        maxlen = plen
-                        maxpred = prev
-                longest[node] = maxlen
-                pred[node] = maxpred
-                return maxlen
-            for n in names:
-                dfs(n)
-            if longest:
-                end_node = max(names, key=lambda n: longest[n])
-                n = end_node
-                while n is not None:
-                    critical_path.add(n)
-                    n = pred[n]
+            rows = schedule_tasks(tasks, key=lambda t: t['name'].strip())
+            critical_path = {t['name'] for t, row in zip(tasks, rows) if row.critical}
         except Exception as e:
-            # If any error, just don't highlight critical path
+            # A cycle or a bad row must not stop the chart; draw it without highlighting
+            print('Critical path skipped:', e)
             critical_path = set()
 
         # Debug: print bar data
@@ -587,18 +565,25 @@ class ProjectViewer(QMainWindow):
         all_tasks = []
         for i in range(self.task_tree.topLevelItemCount()):
             collect(self.task_tree.topLevelItem(i), all_tasks, 0)
-        name_to_task = {t['name']: t for t in all_tasks}
-        changed = True
-        while changed:
-            changed = False
-            for t in all_tasks:
-                dep = t.get('depends_on', '')
-                if dep and dep in name_to_task:
-                    dep_task = name_to_task[dep]
-                    dep_end = dep_task['start'] + timedelta(days=dep_task['duration'])
-                    if t['start'] < dep_end:
-                        t['start'] = dep_end
-                        changed = True
+        # Push dependent tasks after their predecessors in one topological pass;
+        # depends_on holds the un-indented task name
+        name_to_task = {}
+        dependents = {}
+        for t in all_tasks:
+            name_to_task.setdefault(t['name'].strip(), t)
+        for t in all_tasks:
+            for dep in dependency_names(t.get('depends_on')):
+                if dep in name_to_task:
+                    dependents.setdefault(dep, []).append(t)
+        try:
+            moves = propagate([], lambda t: dependents.get(t['name'].strip(), ()),
+                              lambda t: [name_to_task[d] for d in dependency_names(t.get('depends_on')) if d in name_to_task],
+                              sources=all_tasks)
+        except CycleError as e:
+            QMessageBox.warning(self, 'Dependency cycle', f'Dates were not adjusted: {e}')
+            moves = []
+        for t, new_start in moves:
+            t['start'] = datetime.combine(new_start, datetime.min.time())
         self.gantt_chart.plot_gantt(all_tasks)
 
     def serialize_tree(self):